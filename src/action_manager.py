@@ -1,6 +1,7 @@
 import os
 import json
 import logging
+import numpy as np
 
 class ActionManager:
     def __init__(self, filepath="all_actions.json"):
@@ -8,6 +9,9 @@ class ActionManager:
         self.filepath = filepath
         self.actions = []
         self.discovered_actions = []
+        # O(1) lookups: command -> index in self.actions, and discovered commands
+        self.action_index = {}
+        self.discovered_set = set()
 
         if os.path.exists(self.filepath):
             with open(self.filepath, "r", encoding="utf-8") as f:
@@ -19,17 +23,34 @@ class ActionManager:
         else:
             self.logger.warning(f"File {self.filepath} not found, initialized empty list")
             self.actions = []
+        self.action_index = {action: i for i, action in enumerate(self.actions)}
+
+    def index_of(self, action):
+        # index of a command in self.actions, None if unknown
+        return self.action_index.get(action)
+
+    def mark_discovered(self, action):
+        if action not in self.discovered_set:
+            self.discovered_set.add(action)
+            self.discovered_actions.append(action)
 
     def update_actions(self, new_actions):
         for action in new_actions:
-            if action not in self.actions:
+            if action not in self.action_index:
                 self.logger.info(f"New action detected: {action}")
-            if action not in self.discovered_actions:
-                self.discovered_actions.append(action)
+            self.mark_discovered(action)
+
+    @staticmethod
+    def _write_json(path, data):
+        # temp file + rename: a process reading the file at the same time sees
+        # either the old or the new content, never a truncated one
+        tmp = f"{path}.tmp-{os.getpid()}"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=4)
+        os.replace(tmp, path)
 
     def save(self):
-        with open(self.filepath, "w", encoding="utf-8") as f:
-            json.dump(self.actions, f, indent=4)
+        self._write_json(self.filepath, self.actions)
         self.logger.info(f"File {self.filepath} updated with {len(self.actions)} actions")
 
         discovered_path = os.path.splitext(self.filepath)[0] + "_discovered.json"
@@ -43,12 +64,100 @@ class ActionManager:
 
         new_elements = 0
         merged = list(existing)
+        merged_set = set(existing)
         for a in self.discovered_actions:
-            if a not in merged:
+            if a not in merged_set:
                 merged.append(a)
+                merged_set.add(a)
                 new_elements += 1
 
-        with open(discovered_path, "w", encoding="utf-8") as f:
-            json.dump(merged, f, indent=4)
+        self._write_json(discovered_path, merged)
         self.discovered_actions = merged
+        self.discovered_set = merged_set
         self.logger.info(f"File {discovered_path} updated with {new_elements} discovered actions")
+
+
+class FactoredActions:
+    # Factored view of ActionManager.actions: each command becomes a
+    # (verb, slot, target) triple, e.g. "play 3 1" -> ("play", 3, 1 + 1),
+    # "potion use 0" -> ("potion use", 0, 0), "end" -> ("end", 0, 0).
+    # Target 0 means "no target", target t + 1 is monster t.
+    # Used as a MultiDiscrete([verbs, slots, targets]) space: ~70 logits
+    # instead of one per flat command.
+    def __init__(self, action_manager: ActionManager, disabled=("return",)):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.action_manager = action_manager
+        self.verbs = []
+        self.parts = {}
+        for action in action_manager.actions:
+            parts = self._split(action)
+            if parts is None:
+                self.logger.warning(f"Action {action} can not be factored, ignored")
+                continue
+            verb, slot, target = parts
+            if verb not in self.verbs:
+                self.verbs.append(verb)
+            self.parts[action] = (self.verbs.index(verb), slot, target)
+        self.n_slots = max((p[1] for p in self.parts.values()), default=0) + 1
+        self.n_targets = max((p[2] for p in self.parts.values()), default=0) + 1
+        self.disabled = set(disabled)
+        self.mask = np.zeros(sum(self.nvec), dtype=np.int8)
+
+    @staticmethod
+    def _split(action):
+        tokens = action.split()
+        if not tokens:
+            return None
+        n_verb_tokens = 2 if tokens[0] == "potion" else 1
+        verb = " ".join(tokens[:n_verb_tokens])
+        args = tokens[n_verb_tokens:]
+        if len(args) > 2:
+            return None
+        try:
+            slot = int(args[0]) if args else 0
+            target = int(args[1]) + 1 if len(args) > 1 else 0
+        except ValueError:
+            return None
+        return verb, slot, target
+
+    @property
+    def nvec(self):
+        return [len(self.verbs), self.n_slots, self.n_targets]
+
+    def mask_from_commands(self, available_commands):
+        # Concatenated per-dimension masks, the layout MaskablePPO expects for
+        # MultiDiscrete spaces. Each dimension is masked independently, so a
+        # valid verb may still be paired with a slot/target that only exists
+        # for another verb: to_command resolves those. The buffer is reused.
+        mask = self.mask
+        mask.fill(0)
+        n_verbs, n_slots = len(self.verbs), self.n_slots
+        for cmd in available_commands:
+            parts = self.parts.get(cmd)
+            if parts is None or cmd in self.disabled:
+                continue
+            verb, slot, target = parts
+            mask[verb] = 1
+            mask[n_verbs + slot] = 1
+            mask[n_verbs + n_slots + target] = 1
+        return mask
+
+    def to_command(self, action, available_commands):
+        # Command for a (verb, slot, target) action. When the exact command is
+        # not available, fall back to the available command of the same verb
+        # sharing the most components (slot first, then target).
+        verb, slot, target = (int(a) for a in action)
+        best = None
+        best_score = -1
+        for cmd in available_commands:
+            parts = self.parts.get(cmd)
+            if parts is None or parts[0] != verb or cmd in self.disabled:
+                continue
+            score = 2 * (parts[1] == slot) + (parts[2] == target)
+            if score > best_score:
+                best, best_score = cmd, score
+                if score == 3:
+                    break
+        if best is None:
+            self.logger.warning(f"No available command for verb {self.verbs[verb]}")
+        return best
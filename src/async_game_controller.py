@@ -0,0 +1,176 @@
+import time
+import asyncio
+import logging
+import aiohttp
+
+from game_controller import GameController, DEFAULT_TIMEOUTS
+from json_decoder import JsonDecoder
+from readiness import has_commands, in_run, new_run, out_of_run, same_run_possible, describe_state
+
+class AsyncGameController:
+    # asyncio counterpart of GameController: same methods, awaitable, so many
+    # game servers can be driven from a single event loop
+    def __init__(self, base_url="http://localhost:8080", not_ready_limit=15, poll_initial_delay=0.005, poll_max_delay=0.5,
+                 poll_backoff=2.0, pool_size=4, timeouts=None, decoder=None,
+                 server_timeout=None, reset_timeout=30, start_timeout=60, probe_initial_delay=0.05, probe_max_delay=1.0):
+        self.base = base_url.rstrip("/")
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.timeouts = {**DEFAULT_TIMEOUTS, **(timeouts or {})}
+        self.pool_size = pool_size
+        self.session = None
+        self.decoder = decoder or JsonDecoder()
+        self.decode_time = 0.0
+        self.not_ready_limit = not_ready_limit
+        self.not_ready_counter = 0
+        self.poll_initial_delay = poll_initial_delay
+        self.poll_max_delay = poll_max_delay
+        self.poll_backoff = poll_backoff
+        self.last_wait_time = 0.0
+        self.last_poll_count = 0
+        # True when the last wait_for_ready gave up on a not-ready state
+        self.last_wait_forced = False
+        # incremented by every reset, lets envs detect that a cached state is stale
+        self.run_generation = 0
+        # readiness deadlines and probe backoff, see GameController
+        self.server_timeout = server_timeout
+        self.reset_timeout = reset_timeout
+        self.start_timeout = start_timeout
+        self.probe_initial_delay = probe_initial_delay
+        self.probe_max_delay = probe_max_delay
+        self.last_start_error = None
+
+    # readiness logic is pure, share it with the synchronous controller
+    can_send_new_action = GameController.can_send_new_action
+    _poller = GameController._poller
+
+    def _session(self):
+        # created lazily: aiohttp sessions must be opened inside the running loop
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(limit=self.pool_size)
+            self.session = aiohttp.ClientSession(connector=connector)
+        return self.session
+
+    def _timeout(self, endpoint):
+        return aiohttp.ClientTimeout(total=self.timeouts[endpoint])
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+
+    async def wait_for_server(self, timeout=None, process=None):
+        self.logger.info("Waiting for server...")
+        poller = self._poller(f"{self.base}/health", self.server_timeout if timeout is None else timeout, process)
+        while True:
+            try:
+                async with self._session().get(f"{self.base}/health", timeout=self._timeout("health")) as r:
+                    if r.status == 200:
+                        self.logger.info(f"Server ready after {poller.elapsed():.2f}s")
+                        return
+                    poller.last_error = f"HTTP {r.status}"
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                poller.last_error = str(e) or type(e).__name__
+            await asyncio.sleep(poller.next_delay())
+
+    async def wait_for_state(self, accept, timeout, what, process=None):
+        poller = self._poller(what, timeout, process)
+        while True:
+            try:
+                state = await self.get_state()
+                if accept(state):
+                    return state
+                poller.last_error = describe_state(state)
+            except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+                poller.last_error = str(e) or type(e).__name__
+            await asyncio.sleep(poller.next_delay())
+
+    async def wait_for_game(self, timeout=None, process=None):
+        poller = self._poller("game", self.server_timeout if timeout is None else timeout)
+        await self.wait_for_server(poller.remaining(), process)
+        return await self.wait_for_state(has_commands, poller.remaining(), f"commands from {self.base}", process)
+
+    async def get_state(self):
+        async with self._session().get(f"{self.base}/state", timeout=self._timeout("state")) as r:
+            body = await r.read()
+        start = time.perf_counter()
+        state = self.decoder.loads(body)
+        self.decode_time += time.perf_counter() - start
+        return state
+
+    async def reset_run(self):
+        self.run_generation += 1
+        async with self._session().post(f"{self.base}/reset", timeout=self._timeout("reset")) as r:
+            return r.status
+
+    async def start_run(self, character, ascension_level, seed=None):
+        await self.reset_run()
+        await self.wait_for_state(out_of_run, self.reset_timeout, "main menu after /reset")
+        if not await self._post_start(character, ascension_level, seed):
+            raise RuntimeError(f"/start refused: {self.last_start_error}")
+        return await self.wait_for_state(in_run, self.start_timeout, f"{character} run start")
+
+    async def restart_run(self, character, ascension_level, seed=None, previous=None):
+        # pipelined /reset + /start, see GameController.restart_run
+        if not previous:
+            previous = await self.get_state()
+        if same_run_possible(previous, character, seed):
+            return await self.start_run(character, ascension_level, seed)
+        poller = self._poller(f"{character} run restart", self.reset_timeout + self.start_timeout)
+        await self.reset_run()
+        while not await self._post_start(character, ascension_level, seed):
+            poller.last_error = self.last_start_error
+            await asyncio.sleep(poller.next_delay())
+        return await self.wait_for_state(new_run(previous, character), poller.remaining(), f"{character} run restart")
+
+    async def _post_start(self, character, ascension_level, seed=None):
+        self.logger.info(
+            f"Sending cmd > start run : character={character} - ascension_level={ascension_level}"
+            + (f" - seed={seed}" if seed is not None else "")
+        )
+        try:
+            async with self._session().post(f"{self.base}/start", json=GameController._start_body(character, ascension_level, seed),
+                                            timeout=self._timeout("start")) as r:
+                status = r.status
+                result = await r.json(content_type=None)
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            self.last_start_error = str(e) or type(e).__name__
+            return False
+        if status != 200 or not result.get("success", False):
+            self.last_start_error = result.get("error", f"HTTP {status}")
+            return False
+        return True
+
+    async def send_command(self, cmd):
+        self.logger.info(f"Sending cmd > {cmd}")
+
+        try:
+            async with self._session().post(f"{self.base}/command", data=cmd, timeout=self._timeout("command")) as r:
+                result = await r.json(content_type=None)
+        except Exception as e:
+            self.logger.error(f"HTTP error while sending command: {e}")
+            return False
+
+        if not result.get("success", False):
+            self.logger.error(
+                f"Command ({cmd}) return error : {result.get('error', 'Unknown error')}"
+            )
+            return False
+
+        return True
+
+    async def wait_for_ready(self):
+        # same adaptive backoff as GameController.wait_for_ready, sleeping without blocking the loop
+        start = time.perf_counter()
+        delay = self.poll_initial_delay
+        polls = 0
+        while True:
+            state = await self.get_state()
+            polls += 1
+            if self.can_send_new_action(state["ready_for_command"], state["available_commands"]):
+                break
+            await asyncio.sleep(delay)
+            delay = min(delay * self.poll_backoff, self.poll_max_delay)
+
+        self.last_wait_time = time.perf_counter() - start
+        self.last_poll_count = polls
+        self.last_wait_forced = not state["ready_for_command"]
+        return state
@@ -0,0 +1,120 @@
+import time
+import asyncio
+from copy import deepcopy
+from typing import List
+
+import numpy as np
+from stable_baselines3.common.vec_env.base_vec_env import VecEnv
+
+from game_env import GameEnv
+
+class AsyncGameEnv(GameEnv):
+    # GameEnv driven by an AsyncGameController: reward, masks and encoding are
+    # inherited, only the I/O is awaitable
+    def _connect(self):
+        # awaited by AsyncVecGameEnv (connect) instead of blocking in __init__
+        pass
+
+    async def connect(self):
+        await self.game_controller.wait_for_server()
+
+    def reset(self, seed=None, options=None):
+        raise RuntimeError("AsyncGameEnv must be driven through areset()/astep()")
+
+    def step(self, action):
+        raise RuntimeError("AsyncGameEnv must be driven through areset()/astep()")
+
+    def action_masks(self):
+        return self.get_action_mask()
+
+    async def areset(self):
+        start = time.perf_counter()
+        raw = None
+        if self.character is not None:
+            if self.warm_restart:
+                raw = await self.game_controller.restart_run(self.character, self.ascension_level, self.run_seeds.next())
+            else:
+                raw = await self.game_controller.start_run(self.character, self.ascension_level, self.run_seeds.next())
+            self._on_new_run()
+        if raw is None:
+            raw = await self.game_controller.get_state()
+        return self._observe_reset(raw, start)
+
+    async def astep(self, action):
+        # same phases as GameEnv.step; awaited phases include time other envs ran on the loop
+        profiler = self.profiler
+        decode_time = self.game_controller.decode_time
+        t = profiler.clock()
+        if self.is_state_stale():
+            self._refresh_state(await self.game_controller.get_state())
+            t = profiler.add("fetch", t)
+        else:
+            self.state_fetches_saved += 1
+        action_name = self._select_command(action)
+        t = profiler.add("select", t)
+
+        await self.game_controller.send_command(action_name)
+        t = profiler.add("send", t)
+
+        new_state = await self.game_controller.wait_for_ready()
+        profiler.add("wait", t)
+        profiler.add_duration("decode", self.game_controller.decode_time - decode_time)
+        return self._observe_step(new_state, action)
+
+
+class AsyncVecGameEnv(VecEnv):
+    # SB3 VecEnv stepping every AsyncGameEnv concurrently in one event loop,
+    # so waiting on one game overlaps with the others instead of adding up
+    def __init__(self, envs: List[AsyncGameEnv]):
+        self.envs = envs
+        self.loop = asyncio.new_event_loop()
+        self.actions = None
+        super().__init__(len(envs), envs[0].observation_space, envs[0].action_space)
+        self._run(env.connect() for env in self.envs)
+
+    def _run(self, coroutines):
+        async def gather():
+            return await asyncio.gather(*coroutines)
+        return self.loop.run_until_complete(gather())
+
+    async def _step_env(self, env, action):
+        obs, reward, terminated, truncated, info = await env.astep(action)
+        done = terminated or truncated
+        info["TimeLimit.truncated"] = truncated and not terminated
+        if done:
+            # same convention as DummyVecEnv: keep the final observation, then reset
+            info["terminal_observation"] = obs
+            obs, _ = await env.areset()
+        return obs, reward, done, info
+
+    def reset(self):
+        results = self._run(env.areset() for env in self.envs)
+        self.reset_infos = [info for _, info in results]
+        return np.stack([obs for obs, _ in results])
+
+    def step_async(self, actions):
+        self.actions = actions
+
+    def step_wait(self):
+        results = self._run(self._step_env(env, a) for env, a in zip(self.envs, self.actions))
+        obs, rewards, dones, infos = zip(*results)
+        return np.stack(obs), np.array(rewards, dtype=np.float32), np.array(dones, dtype=bool), deepcopy(list(infos))
+
+    def close(self):
+        for env in self.envs:
+            env.close()
+        self._run(env.game_controller.close() for env in self.envs)
+        self.loop.close()
+
+    def get_attr(self, attr_name, indices=None):
+        return [getattr(self.envs[i], attr_name) for i in self._get_indices(indices)]
+
+    def set_attr(self, attr_name, value, indices=None):
+        for i in self._get_indices(indices):
+            setattr(self.envs[i], attr_name, value)
+
+    def env_method(self, method_name, *method_args, indices=None, **method_kwargs):
+        return [getattr(self.envs[i], method_name)(*method_args, **method_kwargs) for i in self._get_indices(indices)]
+
+    def env_is_wrapped(self, wrapper_class, indices=None):
+        return [False for _ in self._get_indices(indices)]
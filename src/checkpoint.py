@@ -0,0 +1,186 @@
+import os
+import re
+import copy
+import glob
+import time
+import queue
+import shutil
+import logging
+import zipfile
+import threading
+from typing import Any, Dict, List, Optional
+
+import torch as th
+import stable_baselines3 as sb3
+from stable_baselines3.common.save_util import data_to_json
+from stable_baselines3.common.utils import get_system_info
+
+from step_profiler import Histogram
+
+
+def model_file(path: str) -> str:
+    # MaskablePPO.save/load add .zip to paths without an extension
+    return path if os.path.splitext(path)[1] else f"{path}.zip"
+
+
+def _replace_atomic(write, target: str) -> None:
+    # write(tmp) fills a temporary file next to target, which is then renamed
+    # over it; the temporary file is removed if anything fails
+    tmp = f"{target}.tmp-{os.getpid()}-{threading.get_ident()}"
+    try:
+        write(tmp)
+        os.replace(tmp, target)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def save_model_atomic(model, path: str) -> str:
+    # Saves to a temporary file next to the target, then renames it over the
+    # target: readers (MaskablePPO.load, the policy server's hot reload) never
+    # see a half-written zip, even if the process dies during the save.
+    target = model_file(path)
+    _replace_atomic(model.save, target)
+    return target
+
+
+class ModelSnapshot:
+    # What model.save() writes, captured on the training thread so the zip can
+    # be written from another one while training goes on: the pickled
+    # attributes are serialized right away (the episode buffers keep changing)
+    # and the parameters and optimizer states are copied.
+    def __init__(self, model):
+        data = model.__dict__.copy()
+        state_dicts_names, torch_variable_names = model._get_torch_save_params()
+        exclude = set(model._excluded_save_params())
+        exclude.update(name.split(".")[0] for name in state_dicts_names + torch_variable_names)
+        for name in exclude:
+            data.pop(name, None)
+        self.num_timesteps = model.num_timesteps
+        self.data = data_to_json(data)
+        with th.no_grad():
+            self.params = copy.deepcopy(model.get_parameters())
+            self.pytorch_variables = {
+                name: copy.deepcopy(_recursive_getattr(model, name)) for name in torch_variable_names
+            }
+
+    def write(self, path: str) -> None:
+        # same archive as stable_baselines3.common.save_util.save_to_zip_file
+        with zipfile.ZipFile(path, mode="w") as archive:
+            archive.writestr("data", self.data)
+            with archive.open("pytorch_variables.pth", mode="w", force_zip64=True) as f:
+                th.save(self.pytorch_variables, f)
+            for name, state_dict in self.params.items():
+                with archive.open(f"{name}.pth", mode="w", force_zip64=True) as f:
+                    th.save(state_dict, f)
+            archive.writestr("_stable_baselines3_version", sb3.__version__)
+            archive.writestr("system_info.txt", get_system_info(print_info=False)[1])
+
+
+def _recursive_getattr(obj, name: str):
+    for attr in name.split("."):
+        obj = getattr(obj, attr)
+    return obj
+
+
+class CheckpointWriter:
+    # Writes ModelSnapshots to disk on a background thread. Every snapshot goes
+    # to "<prefix>_<timesteps>_steps.zip" (temp file + rename) and only the
+    # keep_last most recent of these files are kept; with latest_path, the model
+    # file itself is also replaced by the new checkpoint. When snapshots come in
+    # faster than they are written, a waiting snapshot is replaced by the newer
+    # one (counted in `skipped`) instead of piling up.
+    def __init__(self, prefix: str, keep_last: int = 3, latest_path: Optional[str] = None):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.prefix = prefix
+        self.keep_last = max(1, keep_last)
+        self.latest_path = model_file(latest_path) if latest_path else None
+        directory = os.path.dirname(prefix)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.pending: "queue.Queue[Optional[ModelSnapshot]]" = queue.Queue(maxsize=1)
+        self.lock = threading.Lock()
+        self.idle = threading.Event()
+        self.idle.set()
+        # durations (training thread stall, background write) and counters
+        self.snapshot_times = Histogram()
+        self.write_times = Histogram()
+        self.saved = 0
+        self.skipped = 0
+        self.errors = 0
+        self.last_path: Optional[str] = None
+        self.thread = threading.Thread(target=self._loop, name="checkpoint-writer", daemon=True)
+        self.thread.start()
+
+    def checkpoints(self) -> List[str]:
+        # checkpoint files of this prefix on disk, oldest first
+        pattern = re.compile(re.escape(os.path.basename(self.prefix)) + r"_(\d+)_steps\.zip$")
+        found = []
+        for path in glob.glob(f"{glob.escape(self.prefix)}_*_steps.zip"):
+            match = pattern.match(os.path.basename(path))
+            if match:
+                found.append((int(match.group(1)), path))
+        return [path for _, path in sorted(found)]
+
+    def submit(self, model) -> ModelSnapshot:
+        # snapshots the model (on the calling thread) and queues it for writing
+        start = time.perf_counter()
+        snapshot = ModelSnapshot(model)
+        self.snapshot_times.add(time.perf_counter() - start)
+        with self.lock:
+            self.idle.clear()
+            try:
+                self.pending.get_nowait()
+                self.skipped += 1
+            except queue.Empty:
+                pass
+            self.pending.put_nowait(snapshot)
+        return snapshot
+
+    def _loop(self):
+        while True:
+            snapshot = self.pending.get()
+            if snapshot is None:
+                return
+            try:
+                self._write(snapshot)
+            except Exception as e:
+                self.errors += 1
+                self.logger.error(f"Could not write the checkpoint at {snapshot.num_timesteps} timesteps: {e}")
+            finally:
+                with self.lock:
+                    if self.pending.empty():
+                        self.idle.set()
+
+    def _write(self, snapshot: ModelSnapshot) -> None:
+        start = time.perf_counter()
+        path = f"{self.prefix}_{snapshot.num_timesteps}_steps.zip"
+        _replace_atomic(snapshot.write, path)
+        if self.latest_path:
+            _replace_atomic(lambda tmp: shutil.copyfile(path, tmp), self.latest_path)
+        for old in self.checkpoints()[:-self.keep_last]:
+            os.remove(old)
+        elapsed = time.perf_counter() - start
+        self.write_times.add(elapsed)
+        self.saved += 1
+        self.last_path = path
+        self.logger.info(f"Checkpoint {path} written in {elapsed * 1e3:.0f}ms")
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        # waits until every submitted snapshot is written, False on timeout
+        return self.idle.wait(timeout)
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        if not self.thread.is_alive():
+            return
+        self.flush(timeout)
+        self.pending.put(None)
+        self.thread.join(timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        out: Dict[str, Any] = {"saved": self.saved, "skipped": self.skipped, "errors": self.errors}
+        for name, hist in (("snapshot", self.snapshot_times), ("write", self.write_times)):
+            for key, value in hist.summary().items():
+                if key != "count":
+                    out[f"{name}_{key}"] = value
+        return out
@@ -0,0 +1,51 @@
+from typing import Optional
+
+from stable_baselines3.common.callbacks import BaseCallback
+
+from action_manager import ActionManager
+from checkpoint import CheckpointWriter
+from env_factory import collect_discovered_actions
+
+class AsyncCheckpointCallback(BaseCallback):
+    # Checkpoints the model every save_freq timesteps without stopping the
+    # training for the write: the training thread only snapshots the model,
+    # a CheckpointWriter writes "<prefix>_<timesteps>_steps.zip" in the
+    # background and keeps the keep_last most recent ones (see CheckpointWriter
+    # for latest_path). The discovered actions are saved along with each
+    # checkpoint when an action_manager is given. Snapshot and write durations
+    # are recorded in the training logs under "checkpoint/".
+    def __init__(self, prefix: str, save_freq: int, keep_last: int = 3, latest_path: Optional[str] = None,
+                 action_manager: Optional[ActionManager] = None, verbose=0):
+        super().__init__(verbose)
+        self.save_freq = save_freq
+        self.action_manager = action_manager
+        self.writer = CheckpointWriter(prefix, keep_last=keep_last, latest_path=latest_path)
+        self.last_save = None
+
+    def _on_training_start(self) -> None:
+        # learn() is called once per round with reset_num_timesteps=False
+        if self.last_save is None:
+            self.last_save = self.num_timesteps
+
+    def _on_step(self) -> bool:
+        if self.num_timesteps - self.last_save >= self.save_freq:
+            self.save()
+        return True
+
+    def save(self) -> None:
+        self.last_save = self.num_timesteps
+        self.writer.submit(self.model)
+        if self.action_manager is not None:
+            collect_discovered_actions(self.training_env, self.action_manager)
+            self.action_manager.save()
+
+    def _on_rollout_end(self) -> None:
+        for key, value in self.writer.stats().items():
+            self.logger.record(f"checkpoint/{key}", value)
+
+    def _on_training_end(self) -> None:
+        # the last checkpoint is on disk when learn() returns
+        self.writer.flush()
+
+    def close(self) -> None:
+        self.writer.close()
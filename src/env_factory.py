@@ -0,0 +1,29 @@
+from sb3_contrib.common.wrappers import ActionMasker
+
+from action_manager import ActionManager
+from game_controller import GameController
+from game_env import GameEnv
+
+def mask_fn(env):
+    return env.get_action_mask()
+
+def make_env(character, base_url, actions_path="ressources/actions/all_actions.json", ascension_level=0, factored_actions=False,
+             map_features=False, record_dir=None, record_raw_dir=None, profile=False, profile_log_every=0,
+             warm_restart=True, seeds=None):
+    # Picklable factory for SubprocVecEnv: each worker process builds its own
+    # controller and action manager, and restarts runs itself on reset.
+    def _init():
+        action_manager = ActionManager(filepath=actions_path)
+        game_controller = GameController(base_url)
+        env = GameEnv(action_manager, game_controller, character=character, ascension_level=ascension_level,
+                      factored_actions=factored_actions, map_features=map_features,
+                      record_dir=record_dir, record_raw_dir=record_raw_dir, profile=profile,
+                      profile_log_every=profile_log_every, warm_restart=warm_restart, seeds=seeds)
+        return ActionMasker(env, mask_fn)
+    return _init
+
+def collect_discovered_actions(vec_env, action_manager: ActionManager):
+    # merge actions discovered in worker processes so action_manager.save() keeps them
+    for worker_manager in vec_env.get_attr("action_manager"):
+        for action in worker_manager.discovered_actions:
+            action_manager.mark_discovered(action)
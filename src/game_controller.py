@@ -1,52 +1,190 @@
 import time
 import logging
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from json_decoder import JsonDecoder
+from readiness import Poller, has_commands, in_run, new_run, out_of_run, same_run_possible, describe_state
+
+# per-endpoint request timeouts in seconds (None = wait forever)
+DEFAULT_TIMEOUTS = {
+    "health": 1,
+    "state": None,
+    "command": 2,
+    "reset": None,
+    "start": None,
+}
 
 class GameController:
-    def __init__(self, not_ready_limit=15):
-        self.base = "http://localhost:8080"
+    def __init__(self, base_url="http://localhost:8080", not_ready_limit=15, poll_initial_delay=0.005, poll_max_delay=0.5,
+                 poll_backoff=2.0, pool_size=4, timeouts=None, retries=3, retry_backoff=0.05, decoder=None,
+                 server_timeout=None, reset_timeout=30, start_timeout=60, probe_initial_delay=0.05, probe_max_delay=1.0):
+        self.base = base_url.rstrip("/")
         self.logger = logging.getLogger(self.__class__.__name__)
+        self.timeouts = {**DEFAULT_TIMEOUTS, **(timeouts or {})}
+        self.session = self._create_session(pool_size, retries, retry_backoff)
+        # parses /state bodies (orjson when installed, see json_decoder)
+        self.decoder = decoder or JsonDecoder()
+        # total seconds spent decoding /state bodies, read by StepProfiler
+        self.decode_time = 0.0
         self.not_ready_limit = not_ready_limit
         self.not_ready_counter = 0
+        # adaptive polling used by wait_for_ready
+        self.poll_initial_delay = poll_initial_delay
+        self.poll_max_delay = poll_max_delay
+        self.poll_backoff = poll_backoff
+        self.last_wait_time = 0.0
+        self.last_poll_count = 0
+        # True when the last wait_for_ready gave up on a not-ready state
+        self.last_wait_forced = False
+        # incremented by every reset, lets envs detect that a cached state is stale
+        self.run_generation = 0
+        # deadlines in seconds for the server to answer (None = wait forever), the
+        # game to leave the run after /reset and the new run to be playable after
+        # /start; probes back off from probe_initial_delay to probe_max_delay
+        self.server_timeout = server_timeout
+        self.reset_timeout = reset_timeout
+        self.start_timeout = start_timeout
+        self.probe_initial_delay = probe_initial_delay
+        self.probe_max_delay = probe_max_delay
+        self.last_start_error = None
+
+    @staticmethod
+    def _create_session(pool_size, retries, retry_backoff):
+        # Keep-alive session: one TCP connection reused for every poll.
+        # Connection errors are retried for every method (the request never
+        # reached the game); read errors and 5xx only for GET, so a command
+        # is never sent twice.
+        retry = Retry(
+            total=retries,
+            connect=retries,
+            read=retries,
+            status=retries,
+            backoff_factor=retry_backoff,
+            status_forcelist=(500, 502, 503, 504),
+            allowed_methods=frozenset({"GET"}),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        session = requests.Session()
+        session.mount("http://", adapter)
+        return session
+
+    def close(self):
+        self.session.close()
+
+    def _poller(self, what, timeout, process=None):
+        return Poller(what, timeout, self.probe_initial_delay, self.probe_max_delay, process=process)
 
-    def wait_for_server(self):
+    def wait_for_server(self, timeout=None, process=None):
+        # Polls /health until it answers, with a backoff and a deadline (timeout,
+        # else server_timeout). Raises ReadinessTimeout, or GameProcessExited when
+        # `process` (the game's Popen) exits first.
         self.logger.info("Waiting for server...")
+        poller = self._poller(f"{self.base}/health", self.server_timeout if timeout is None else timeout, process)
         while True:
             try:
-                r = requests.get(f"{self.base}/health", timeout=1)
+                r = self.session.get(f"{self.base}/health", timeout=self.timeouts["health"])
                 if r.status_code == 200:
-                    self.logger.info("Server ready")
+                    self.logger.info(f"Server ready after {poller.elapsed():.2f}s")
                     return
-            except:
-                pass
-            time.sleep(1)
+                poller.last_error = f"HTTP {r.status_code}"
+            except requests.RequestException as e:
+                poller.last_error = str(e)
+            time.sleep(poller.next_delay())
+
+    def wait_for_state(self, accept, timeout, what, process=None):
+        # Polls /state until accept(state) is true and returns that state.
+        # Same backoff, deadline and errors as wait_for_server.
+        poller = self._poller(what, timeout, process)
+        while True:
+            try:
+                state = self.get_state()
+                if accept(state):
+                    self.logger.debug(f"{what} after {poller.elapsed():.2f}s ({poller.polls + 1} probes)")
+                    return state
+                poller.last_error = describe_state(state)
+            except (requests.RequestException, ValueError) as e:
+                poller.last_error = str(e)
+            time.sleep(poller.next_delay())
+
+    def wait_for_game(self, timeout=None, process=None):
+        # server up and accepting commands (main menu or a run), in one deadline
+        poller = self._poller("game", self.server_timeout if timeout is None else timeout)
+        self.wait_for_server(poller.remaining(), process)
+        return self.wait_for_state(has_commands, poller.remaining(), f"commands from {self.base}", process)
 
     def get_state(self):
-        return requests.get(f"{self.base}/state").json()
-    
+        r = self.session.get(f"{self.base}/state", timeout=self.timeouts["state"])
+        start = time.perf_counter()
+        state = self.decoder.loads(r.content)
+        self.decode_time += time.perf_counter() - start
+        return state
+
     def reset_run(self):
-        return requests.post(f"{self.base}/reset")
+        self.run_generation += 1
+        return self.session.post(f"{self.base}/reset", timeout=self.timeouts["reset"])
 
-    def start_run(self, character, ascension_level):
+    def start_run(self, character, ascension_level, seed=None):
+        # Returns the first playable state of the new run: no fixed sleeps, the
+        # game is probed until it has left the previous run, then until the new
+        # one waits for a command. Raises ReadinessTimeout past the deadlines.
         self.reset_run()
-        time.sleep(3)
+        self.wait_for_state(out_of_run, self.reset_timeout, "main menu after /reset")
+        if not self._post_start(character, ascension_level, seed):
+            raise RuntimeError(f"/start refused: {self.last_start_error}")
+        return self.wait_for_state(in_run, self.start_timeout, f"{character} run start")
+
+    def restart_run(self, character, ascension_level, seed=None, previous=None):
+        # Warm restart: /reset and /start are sent back to back on the keep-alive
+        # connection instead of waiting for the main menu in between, then /state
+        # is probed until a `character` run other than `previous` (the /state of
+        # the ending run, read here when not given) is playable. /start is retried
+        # with the probe backoff while the game refuses it in the middle of the
+        # reset. When the new run could not be told from the old one (same seed
+        # replayed), the restart goes through the main menu like start_run.
+        if not previous:
+            previous = self.get_state()
+        if same_run_possible(previous, character, seed):
+            return self.start_run(character, ascension_level, seed)
+        poller = self._poller(f"{character} run restart", self.reset_timeout + self.start_timeout)
+        self.reset_run()
+        while not self._post_start(character, ascension_level, seed):
+            poller.last_error = self.last_start_error
+            time.sleep(poller.next_delay())
+        return self.wait_for_state(new_run(previous, character), poller.remaining(), f"{character} run restart")
+
+    @staticmethod
+    def _start_body(character, ascension_level, seed):
+        body = {"character": character, "ascension_level": ascension_level}
+        if seed is not None:
+            # letters and digits, as shown in the game (SeedHelper)
+            body["seed"] = seed
+        return body
+
+    def _post_start(self, character, ascension_level, seed=None):
         self.logger.info(
             f"Sending cmd > start run : character={character} - ascension_level={ascension_level}"
+            + (f" - seed={seed}" if seed is not None else "")
         )
-        requests.post(
-            f"{self.base}/start",
-            json={
-                "character": character,
-                "ascension_level": ascension_level
-            }
-        ).json()
-        time.sleep(5)
+        try:
+            r = self.session.post(f"{self.base}/start", json=self._start_body(character, ascension_level, seed),
+                                  timeout=self.timeouts["start"])
+            result = r.json()
+        except (requests.RequestException, ValueError) as e:
+            self.last_start_error = str(e)
+            return False
+        if r.status_code != 200 or not result.get("success", False):
+            self.last_start_error = result.get("error", f"HTTP {r.status_code}")
+            return False
+        return True
 
     def send_command(self, cmd):
         self.logger.info(f"Sending cmd > {cmd}")
 
         try:
-            r = requests.post(f"{self.base}/command", data=cmd, timeout=2)
+            r = self.session.post(f"{self.base}/command", data=cmd, timeout=self.timeouts["command"])
             result = r.json()
         except Exception as e:
             self.logger.error(f"HTTP error while sending command: {e}")
@@ -60,6 +198,27 @@ class GameController:
 
         return True
 
+    def wait_for_ready(self):
+        # The mod has no blocking endpoint, so poll /state with an exponential
+        # backoff: a few ms first (most transitions settle quickly), capped at
+        # poll_max_delay for long animations.
+        start = time.perf_counter()
+        delay = self.poll_initial_delay
+        polls = 0
+        while True:
+            state = self.get_state()
+            polls += 1
+            if self.can_send_new_action(state["ready_for_command"], state["available_commands"]):
+                break
+            time.sleep(delay)
+            delay = min(delay * self.poll_backoff, self.poll_max_delay)
+
+        self.last_wait_time = time.perf_counter() - start
+        self.last_poll_count = polls
+        self.last_wait_forced = not state["ready_for_command"]
+        self.logger.debug(f"State ready after {self.last_wait_time * 1000:.1f} ms ({polls} polls)")
+        return state
+
     def can_send_new_action(self, ready, cmds):
         if not cmds:
             self.logger.debug(f"No cmd available")
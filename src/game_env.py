@@ -5,72 +5,233 @@ import gymnasium as gym
 import numpy as np
 
 from game_controller import GameController
-from action_manager import ActionManager
+from action_manager import ActionManager, FactoredActions
 from state import State
+from trajectory_store import TrajectoryWriter, RawStepWriter
+from step_profiler import StepProfiler
+from run_seeds import RunSeeds
 
 class GameEnv(gym.Env):
-    def __init__(self, action_manager: ActionManager, game_controller: GameController):
+    def __init__(self, action_manager: ActionManager, game_controller: GameController, character=None, ascension_level=0,
+                 factored_actions=False, map_features=False, record_dir=None,
+                 record_raw_dir=None, profile=False, profile_log_every=0, warm_restart=True, seeds=None):
         super().__init__()
         self.logger = logging.getLogger(self.__class__.__name__)
         self.game_controller = game_controller
-        self.game_controller.wait_for_server()
+        self._connect()
         self.action_manager = action_manager
         self.stop_training = False
-        self.action_space = spaces.Discrete(len(action_manager.actions))
+        # when set, every reset starts a new run for this character (vectorized training)
+        self.character = character
+        self.ascension_level = ascension_level
+        # factored (verb, slot, target) actions, or the legacy flat list the saved models use
+        self.factored_actions = FactoredActions(action_manager) if factored_actions else None
+        if self.factored_actions is not None:
+            self.action_space = spaces.MultiDiscrete(self.factored_actions.nvec)
+        else:
+            self.action_space = spaces.Discrete(len(action_manager.actions))
+        self.action_mask = np.zeros(len(action_manager.actions), dtype=np.int8)
+        self.return_cmd_index = action_manager.index_of("return")
         self.state = State({})
-        self.observation_space = spaces.Box(low=0, high=1, shape=(self.state.get_size(),), dtype=np.float32)
+        # last observed state is reused by step() unless it may be outdated
+        self.state_stale = True
+        self.state_generation = -1
+        self.state_fetches_saved = 0
+        # appends the map routing block (reachable elites/rests/shops, best paths) to the observation
+        self.map_features = map_features
+        obs_size = State.layout(map_features).size
+        self.observation_space = spaces.Box(low=0, high=1, shape=(obs_size,), dtype=np.float32)
+        # per-phase step timings (no-ops unless profile is set), see step_profiler
+        self.profiler = StepProfiler(enabled=profile, log_every=profile_log_every)
+        # optional (obs, mask, action, reward, done) recording for offline training
+        self.recorder = None
+        if record_dir is not None:
+            action_shape = (len(self.factored_actions.nvec),) if self.factored_actions is not None else ()
+            self.recorder = TrajectoryWriter(record_dir, obs_size, len(self.get_action_mask()), action_shape)
+        # raw /state responses and the commands sent, for offline pretraining (pretrain.py)
+        self.raw_recorder = RawStepWriter(record_raw_dir) if record_raw_dir is not None else None
+        self.last_obs = None
+        self.last_mask = None
         self.player_memory = {
             "floor": 0,
             "act": 0,
         }
+        # runs are restarted with a pipelined /reset + /start (restart_run) unless
+        # warm_restart is False; seeds, if given, are replayed in turn
+        self.warm_restart = warm_restart
+        self.run_seeds = RunSeeds(seeds or ())
+        # episode turnover: from the step that ended an episode to the first
+        # observation of the next run (restart_time is the reset call alone)
+        self.episode_end_time = None
+        self.restarts = 0
+        self.turnover_total = 0.0
+        self.turnover_max = 0.0
 
-    def get_action_mask_from_commands(self, available_commands):
-        mask = np.zeros(len(self.action_manager.actions), dtype=np.int8)
-        available_set = set(available_commands)
-        return_cmd_index = 125
+    def _connect(self):
+        self.game_controller.wait_for_server()
 
-        for i, action in enumerate(self.action_manager.actions):
-            if action in available_set:
-                mask[i] = 1
+    def get_action_mask_from_commands(self, available_commands):
+        # Scatter the indices of the available commands into a reused buffer.
+        # The returned array is overwritten by the next call: copy it to keep it.
+        mask = self.action_mask
+        mask.fill(0)
+        action_index = self.action_manager.action_index
+        indices = [action_index[cmd] for cmd in available_commands if cmd in action_index]
+        mask[indices] = 1
 
-        mask[return_cmd_index] = 0 # Disable "Return" action
+        if self.return_cmd_index is not None:
+            mask[self.return_cmd_index] = 0 # Disable "Return" action
 
         return mask
 
     def get_action_mask(self):
-        return self.get_action_mask_from_commands(self.state.available_commands)
+        t = self.profiler.clock()
+        if self.factored_actions is not None:
+            mask = self.factored_actions.mask_from_commands(self.state.available_commands)
+        else:
+            mask = self.get_action_mask_from_commands(self.state.available_commands)
+        self.profiler.add("mask", t)
+        return mask
 
     def reset(self, seed=None, options=None):
-        raw = self.game_controller.get_state()
-        self.state = State(raw)
-        obs = self.state.encode_state()
-        self.logger.info("Environment reset")
-        return obs, {}
+        start = time.perf_counter()
+        raw = None
+        if self.character is not None:
+            # the restart returns the first playable state of the run; restart_run
+            # reads the ending run from /state, self.state may be from another session
+            if self.warm_restart:
+                raw = self.game_controller.restart_run(self.character, self.ascension_level, self.run_seeds.next())
+            else:
+                raw = self.game_controller.start_run(self.character, self.ascension_level, self.run_seeds.next())
+            self._on_new_run()
+        if raw is None:
+            raw = self.game_controller.get_state()
+        return self._observe_reset(raw, start)
 
     def step(self, action):
-        done = False
-        actual_state = self.game_controller.get_state()
-        self.state = State(actual_state)
-        self.action_manager.update_actions(self.state.available_commands)
-        action_name = self.action_manager.actions[action]
+        profiler = self.profiler
+        decode_time = self.game_controller.decode_time
+        t = profiler.clock()
+        if self.is_state_stale():
+            self._refresh_state(self.game_controller.get_state())
+            t = profiler.add("fetch", t)
+        else:
+            self.state_fetches_saved += 1
+        action_name = self._select_command(action)
+        t = profiler.add("select", t)
 
         self.game_controller.send_command(action_name)
+        t = profiler.add("send", t)
+
+        new_state = self.game_controller.wait_for_ready()
+        profiler.add("wait", t)
+        profiler.add_duration("decode", self.game_controller.decode_time - decode_time)
+        return self._observe_step(new_state, action)
+
+    def is_state_stale(self):
+        # The state observed at the end of the previous step/reset is what the
+        # agent acted on. It is only re-fetched when the run was reset behind
+        # the env's back or the previous wait forced a send on a not-ready state.
+        return self.state_stale or self.state_generation != self.game_controller.run_generation
+
+    # I/O-free halves of reset/step, shared with AsyncGameEnv
+
+    def _on_new_run(self):
+        self.stop_training = False
+        self.player_memory["floor"] = 0
+
+    def _refresh_state(self, raw):
+        # sections unchanged since the previous state (map, deck, ...) are not parsed again
+        self.state.update_from_json(raw, incremental=True)
+        self.state_generation = self.game_controller.run_generation
+        self.state_stale = False
+
+    def _observe_reset(self, raw, start):
+        self._refresh_state(raw)
+        obs = self.state.encode_state(map_paths=self.map_features)
+        self.last_obs = obs
+        self.logger.info("Environment reset")
+        return obs, self._turnover_info(start)
+
+    def _turnover_info(self, start):
+        # times the reset that began at `start` (perf_counter), and the whole
+        # turnover when a previous episode ended in this env
+        now = time.perf_counter()
+        info = {"restart_time": now - start}
+        if self.character is not None and self.episode_end_time is not None:
+            turnover = now - self.episode_end_time
+            self.restarts += 1
+            self.turnover_total += turnover
+            self.turnover_max = max(self.turnover_max, turnover)
+            self.profiler.add_duration("turnover", turnover)
+            info["turnover_time"] = turnover
+            self.logger.info(f"New run after {turnover:.2f}s ({info['restart_time']:.2f}s in reset)")
+        self.episode_end_time = None
+        self.profiler.add_duration("restart", info["restart_time"])
+        return info
+
+    def turnover_stats(self):
+        # restarts timed so far, mean and max turnover in seconds
+        return {
+            "restarts": self.restarts,
+            "mean_s": self.turnover_total / self.restarts if self.restarts else 0.0,
+            "max_s": self.turnover_max,
+        }
 
-        while True:
-            new_state = self.game_controller.get_state()
-            if self.game_controller.can_send_new_action(new_state["ready_for_command"], new_state["available_commands"]):
-                break
-            time.sleep(0.5)
+    def _select_command(self, action):
+        if self.recorder is not None:
+            # mask of the state the action is applied to, copied before the buffer is reused
+            self.last_mask = self.get_action_mask().copy()
+        self.action_manager.update_actions(self.state.available_commands)
+        if self.factored_actions is None:
+            cmd = self.action_manager.actions[action]
+        else:
+            cmd = self.factored_actions.to_command(action, self.state.available_commands)
+            if cmd is None and self.state.available_commands:
+                cmd = self.state.available_commands[0]
+        if self.raw_recorder is not None and cmd is not None:
+            self.raw_recorder.append(self.state.raw_json, cmd)
+        return cmd
 
+    def _observe_step(self, new_state, action=None):
+        profiler = self.profiler
+        t = profiler.clock()
+        done = False
         reward = self.compute_reward(new_state)
+        t = profiler.add("reward", t)
 
         if self.stop_training:
             done = True
 
         # update internal State and encode
-        self.state = State(new_state)
-        obs = self.state.encode_state()
-        return obs, reward, done, False, {}
+        self._refresh_state(new_state)
+        self.state_stale = self.game_controller.last_wait_forced
+        t = profiler.add("state", t)
+        obs = self.state.encode_state(map_paths=self.map_features)
+        profiler.add("encode", t)
+        profiler.end_step(self.game_controller.last_poll_count, self.game_controller.last_wait_forced)
+        if done:
+            self.episode_end_time = time.perf_counter()
+        if self.recorder is not None:
+            self.recorder.append(self.last_obs, self.last_mask, action, reward, done)
+        self.last_obs = obs
+        info = {
+            "wait_time": self.game_controller.last_wait_time,
+            "polls": self.game_controller.last_poll_count,
+            "fetches_saved": self.state_fetches_saved,
+        }
+        return obs, reward, done, False, info
+
+    def take_profile(self):
+        # timings recorded since the last call (ProfilingCallback)
+        return self.profiler.take()
+
+    def close(self):
+        if self.recorder is not None:
+            self.recorder.close()
+        if self.raw_recorder is not None:
+            self.raw_recorder.close()
+        super().close()
 
     def compute_reward(self, curr):
         reward = 0
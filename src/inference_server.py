@@ -0,0 +1,338 @@
+import os
+import json
+import time
+import queue
+import logging
+import argparse
+import threading
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional
+
+import numpy as np
+import requests
+import torch as th
+from gymnasium import spaces
+from sb3_contrib import MaskablePPO
+
+
+def mask_size(action_space) -> int:
+    # length of the flat action mask of a Discrete or MultiDiscrete action space
+    if isinstance(action_space, spaces.MultiDiscrete):
+        return int(np.sum(action_space.nvec))
+    return int(action_space.n)
+
+
+class PredictRequest:
+    __slots__ = ("obs", "masks", "future", "received")
+
+    def __init__(self, obs: np.ndarray, masks: np.ndarray):
+        self.obs = obs
+        self.masks = masks
+        self.future: Future = Future()
+        self.received = time.monotonic()
+
+
+class PolicyServer:
+    # Serves the actions of a saved MaskablePPO model to many games at once.
+    # predict() calls (from threads, or HTTP clients of /predict) are
+    # queued and run as one forward pass: a batch is closed when it holds
+    # max_batch rows or max_latency seconds after its first request, so a lone
+    # game waits at most max_latency more than an unbatched predict. The model
+    # file is checked every reload_interval seconds and reloaded in the
+    # background when it changes on disk; batches keep using the previous
+    # policy until the new one is loaded.
+    def __init__(self, model_path: str, max_batch: int = 64, max_latency: float = 0.005, deterministic: bool = False,
+                 reload_interval: float = 5.0, device: str = "cpu", num_threads: Optional[int] = None,
+                 host: str = "127.0.0.1", port: int = 0):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        # MaskablePPO.save appends .zip, accept both forms like MaskablePPO.load
+        self.model_path = model_path if model_path.endswith(".zip") else f"{model_path}.zip"
+        self.max_batch = max_batch
+        self.max_latency = max_latency
+        self.deterministic = deterministic
+        self.reload_interval = reload_interval
+        self.device = device
+        if num_threads is not None:
+            th.set_num_threads(num_threads)
+        self.requests: "queue.Queue[PredictRequest]" = queue.Queue()
+        self.stopped = threading.Event()
+        # counters, for /stats and tests
+        self.batches = 0
+        self.rows = 0
+        self.reloads = 0
+        self.model_version = 0
+        self.model_mtime = None
+        if not self._load():
+            raise ValueError(f"Could not load model {self.model_path}")
+
+        self.httpd = ThreadingHTTPServer((host, port), PolicyHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.policy_server = self
+        self.threads: List[threading.Thread] = []
+        self.serving = False
+
+    # model
+
+    def _load(self) -> bool:
+        mtime = os.stat(self.model_path).st_mtime_ns
+        try:
+            model = MaskablePPO.load(self.model_path, device=self.device)
+        except Exception as e:
+            # most likely a checkpoint still being written, tried again at the next check
+            self.logger.warning(f"Could not load {self.model_path}: {e}")
+            return False
+        model.policy.set_training_mode(False)
+        self.policy = model.policy
+        self.obs_size = int(np.prod(model.observation_space.shape))
+        self.mask_size = mask_size(model.action_space)
+        self.model_mtime = mtime
+        self.model_version += 1
+        self.logger.info(f"Loaded {self.model_path} (version {self.model_version})")
+        return True
+
+    def _watch(self):
+        while not self.stopped.wait(self.reload_interval):
+            try:
+                mtime = os.stat(self.model_path).st_mtime_ns
+            except OSError:
+                continue
+            if mtime != self.model_mtime and self._load():
+                self.reloads += 1
+
+    # batching
+
+    def predict(self, obs: np.ndarray, masks: np.ndarray) -> np.ndarray:
+        # obs (obs_size,) or (n, obs_size), masks likewise; blocks until the batch
+        # holding the request has run, returns one action per row
+        return self.submit(obs, masks).result()
+
+    def submit(self, obs: np.ndarray, masks: np.ndarray) -> Future:
+        single = np.ndim(obs) == 1
+        obs = np.asarray(obs, dtype=np.float32).reshape(-1, self.obs_size)
+        masks = np.asarray(masks, dtype=bool).reshape(-1, self.mask_size)
+        if len(obs) != len(masks):
+            raise ValueError(f"{len(obs)} observations for {len(masks)} action masks")
+        request = PredictRequest(obs, masks)
+        self.requests.put(request)
+        if single:
+            # unwrap the single row once the batch is done
+            future: Future = Future()
+            request.future.add_done_callback(lambda f: _chain(f, future, lambda actions: actions[0]))
+            return future
+        return request.future
+
+    def _next_batch(self) -> List[PredictRequest]:
+        try:
+            first = self.requests.get(timeout=0.1)
+        except queue.Empty:
+            return []
+        batch = [first]
+        rows = len(first.obs)
+        deadline = first.received + self.max_latency
+        while rows < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                request = self.requests.get(timeout=remaining) if remaining > 0 else self.requests.get_nowait()
+            except queue.Empty:
+                break
+            batch.append(request)
+            rows += len(request.obs)
+        return batch
+
+    def _run_batch(self, batch: List[PredictRequest]) -> None:
+        obs = np.concatenate([r.obs for r in batch])
+        masks = np.concatenate([r.masks for r in batch])
+        try:
+            with th.no_grad():
+                actions, _ = self.policy.predict(obs, deterministic=self.deterministic, action_masks=masks)
+        except Exception as e:
+            for r in batch:
+                r.future.set_exception(e)
+            return
+        self.batches += 1
+        self.rows += len(obs)
+        start = 0
+        for r in batch:
+            r.future.set_result(actions[start:start + len(r.obs)])
+            start += len(r.obs)
+
+    def _batch_loop(self):
+        while not self.stopped.is_set():
+            batch = self._next_batch()
+            if batch:
+                self._run_batch(batch)
+
+    def stats(self):
+        return {
+            "model_version": self.model_version,
+            "reloads": self.reloads,
+            "batches": self.batches,
+            "rows": self.rows,
+            "mean_batch": self.rows / self.batches if self.batches else 0.0,
+        }
+
+    # server
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self, http=True):
+        # batching and reload threads, plus the HTTP endpoint unless http=False
+        if any(t.is_alive() for t in self.threads):
+            return self
+        self.stopped.clear()
+        targets = [self._batch_loop, self._watch]
+        self.serving = http
+        if http:
+            targets.append(self.httpd.serve_forever)
+        self.threads = [threading.Thread(target=t, daemon=True) for t in targets]
+        for t in self.threads:
+            t.start()
+        return self
+
+    def stop(self):
+        self.stopped.set()
+        if self.serving:
+            self.httpd.shutdown()
+        self.httpd.server_close()
+        for t in self.threads:
+            t.join(timeout=5)
+        # requests queued after the last batch would wait forever
+        while True:
+            try:
+                self.requests.get_nowait().future.set_exception(RuntimeError("PolicyServer stopped"))
+            except queue.Empty:
+                break
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def _chain(source: Future, target: Future, transform):
+    if source.exception() is not None:
+        target.set_exception(source.exception())
+    else:
+        target.set_result(transform(source.result()))
+
+
+class PolicyHandler(BaseHTTPRequestHandler):
+    # POST /predict: raw float32 observations followed by uint8 action masks,
+    # n rows each, answered with {"actions": [...], "model_version": v}
+    protocol_version = "HTTP/1.1"
+    wbufsize = -1
+    disable_nagle_algorithm = True
+
+    def _send_json(self, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        server = self.server.policy_server
+        if self.path == "/stats":
+            self._send_json(server.stats())
+        elif self.path == "/spaces":
+            self._send_json({"obs_size": server.obs_size, "mask_size": server.mask_size})
+        else:
+            self.send_error(404)
+
+    def do_POST(self):
+        server = self.server.policy_server
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.path != "/predict":
+            self.send_error(404)
+            return
+        row = server.obs_size * 4 + server.mask_size
+        if not body or len(body) % row:
+            self.send_error(400, f"Body must hold rows of {server.obs_size} float32 + {server.mask_size} uint8")
+            return
+        n = len(body) // row
+        obs = np.frombuffer(body, dtype=np.float32, count=n * server.obs_size).reshape(n, server.obs_size)
+        masks = np.frombuffer(body, dtype=np.uint8, offset=n * server.obs_size * 4).reshape(n, server.mask_size)
+        actions = server.submit(obs, masks).result()
+        self._send_json({"actions": actions.tolist(), "model_version": server.model_version})
+
+    def log_message(self, format, *args):
+        pass
+
+
+class PolicyClient:
+    # HTTP client of a PolicyServer, one keep-alive connection per client:
+    # GameEnv workers in other processes get their actions with predict().
+    def __init__(self, base_url="http://127.0.0.1:8200", timeout=5):
+        self.base = base_url.rstrip("/")
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.model_version = 0
+
+    def predict(self, obs: np.ndarray, masks: np.ndarray) -> np.ndarray:
+        single = np.ndim(obs) == 1
+        body = (np.ascontiguousarray(obs, dtype=np.float32).tobytes()
+                + np.ascontiguousarray(masks, dtype=np.uint8).tobytes())
+        r = self.session.post(f"{self.base}/predict", data=body, timeout=self.timeout)
+        r.raise_for_status()
+        result = r.json()
+        self.model_version = result["model_version"]
+        actions = np.asarray(result["actions"])
+        return actions[0] if single else actions
+
+    def stats(self):
+        return self.session.get(f"{self.base}/stats", timeout=self.timeout).json()
+
+    def close(self):
+        self.session.close()
+
+
+def play(env, predictor, steps: int) -> int:
+    # plays `steps` steps of a GameEnv with actions from a PolicyServer or a
+    # PolicyClient (anything with predict(obs, mask)), returns the episodes ended
+    obs, _ = env.reset()
+    episodes = 0
+    for _ in range(steps):
+        action = predictor.predict(obs, env.get_action_mask())
+        obs, _, done, truncated, _ = env.step(action)
+        if done or truncated:
+            episodes += 1
+            obs, _ = env.reset()
+    return episodes
+
+
+def main():
+    import main as training
+    from logging_config import setup_logging
+
+    parser = argparse.ArgumentParser(description="Batched action selection for a character's saved model")
+    parser.add_argument("character")
+    parser.add_argument("--port", type=int, default=8200)
+    parser.add_argument("--max-batch", type=int, default=64)
+    parser.add_argument("--max-latency", type=float, default=0.005)
+    parser.add_argument("--reload-interval", type=float, default=5.0)
+    parser.add_argument("--deterministic", action="store_true")
+    parser.add_argument("--threads", type=int, default=None)
+    args = parser.parse_args()
+
+    setup_logging()
+    logger = logging.getLogger("PolicyServer")
+    server = PolicyServer(training.model_path(args.character), max_batch=args.max_batch, max_latency=args.max_latency,
+                          deterministic=args.deterministic, reload_interval=args.reload_interval,
+                          num_threads=args.threads, port=args.port)
+    with server:
+        logger.info(f"Serving {server.model_path} on {server.base_url}")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
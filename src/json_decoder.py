@@ -0,0 +1,62 @@
+import json
+from typing import Any, Union
+
+try:
+    import orjson
+except ImportError:  # optional, the stdlib parser is used instead
+    orjson = None
+
+# free text fields State never reads
+SKIPPED_FIELDS = frozenset({"body_text"})
+
+
+class JsonDecoder:
+    # Decodes /state responses. backend="auto" uses orjson when it is installed
+    # and the stdlib json module otherwise. With skip_fields=True the decoded
+    # tree is pruned of values the encoder never reads: SKIPPED_FIELDS of the
+    # screen state, and "name" on cards, relics, potions, powers and monsters
+    # that also carry an "id" (ids and names are only used as "id or name").
+    # Pruning keeps the raw JSON held by State smaller.
+    def __init__(self, backend: str = "auto", skip_fields: bool = False):
+        if backend == "auto":
+            backend = "orjson" if orjson is not None else "json"
+        if backend == "orjson" and orjson is None:
+            raise ImportError("orjson is not installed")
+        if backend not in ("orjson", "json"):
+            raise ValueError(f"Unknown JSON backend: {backend}")
+        self.backend = backend
+        self.skip_fields = skip_fields
+        self._loads = orjson.loads if backend == "orjson" else json.loads
+
+    def loads(self, data: Union[bytes, str]) -> Any:
+        obj = self._loads(data)
+        if self.skip_fields:
+            prune(obj)
+        return obj
+
+
+# lists of id/name objects, relative to game_state, combat_state and screen_state
+GAME_STATE_LISTS = ("deck", "relics", "potions")
+COMBAT_STATE_LISTS = ("hand", "draw_pile", "discard_pile", "exhaust_pile", "monsters")
+SCREEN_STATE_LISTS = ("cards", "relics", "potions")
+
+
+def prune(state: Any) -> None:
+    # In place removal of the fields described in JsonDecoder. Only the places
+    # the game puts names and free text are visited: walking the whole tree
+    # (the map alone is several hundred dicts) costs more than it saves.
+    gs = state.get("game_state") if isinstance(state, dict) else None
+    if not isinstance(gs, dict):
+        return
+    cs = gs.get("combat_state") or {}
+    ss = gs.get("screen_state") or {}
+    for key in SKIPPED_FIELDS:
+        ss.pop(key, None)
+    lists = [gs.get(k) for k in GAME_STATE_LISTS]
+    lists += [cs.get(k) for k in COMBAT_STATE_LISTS]
+    lists.append((cs.get("player") or {}).get("powers"))
+    lists += [ss.get(k) for k in SCREEN_STATE_LISTS]
+    for items in lists:
+        for item in items or ():
+            if isinstance(item, dict) and item.get("id"):
+                item.pop("name", None)
@@ -0,0 +1,117 @@
+import os
+import time
+import shutil
+import logging
+import subprocess
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from game_controller import GameController
+
+# per-instance game data that must not be shared between processes
+PRIVATE_DIRS = ("preferences", "saves")
+# directories the game writes to, created empty for each instance
+OUTPUT_DIRS = ("runs",)
+
+@dataclass
+class GameInstance:
+    index: int
+    port: int
+    workdir: str
+    process: Optional[subprocess.Popen] = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://localhost:{self.port}"
+
+
+class GameLauncher:
+    def __init__(self, game_dir="ressources/jar", instances_dir="ressources/instances", base_port=8080, jar=".\\ModTheSpire.jar"):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.game_dir = game_dir
+        self.instances_dir = instances_dir
+        self.base_port = base_port
+        self.jar = jar
+        self.instances: List[GameInstance] = []
+
+    def launch(self, count=1) -> List[GameInstance]:
+        # Instance i listens on base_port + i (HttpCommunicationMod reads
+        # HTTP_MOD_PORT) and runs from its own working directory.
+        for i in range(count):
+            instance = GameInstance(index=i, port=self.base_port + i, workdir=self._prepare_workdir(i))
+            env = dict(os.environ, HTTP_MOD_PORT=str(instance.port))
+            instance.process = subprocess.Popen(
+                ["java", "-jar", self.jar, "--skip-launcher"],
+                cwd=instance.workdir,
+                env=env,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL)
+            self.logger.info(f"Game instance {i} started on port {instance.port} ({instance.workdir})")
+            self.instances.append(instance)
+        return self.instances
+
+    def wait_ready(self, timeout=180.0) -> List[Dict[str, Any]]:
+        # Blocks until every launched game answers /health and accepts commands,
+        # probing with a backoff instead of a fixed sleep. All games boot at the
+        # same time, so they share one deadline. Returns their first /state;
+        # raises ReadinessTimeout, or GameProcessExited when a game dies.
+        deadline = time.monotonic() + timeout
+        states = []
+        for instance in self.instances:
+            controller = GameController(instance.base_url)
+            try:
+                states.append(controller.wait_for_game(max(0.0, deadline - time.monotonic()), instance.process))
+            finally:
+                controller.close()
+            self.logger.info(f"Game instance {instance.index} ready on port {instance.port}")
+        return states
+
+    def start(self, count=1, timeout=180.0) -> List[GameInstance]:
+        # launch() then wait_ready(); the games are stopped if one is not ready in time
+        instances = self.launch(count)
+        try:
+            self.wait_ready(timeout)
+        except Exception:
+            self.stop()
+            raise
+        return instances
+
+    def _prepare_workdir(self, index) -> str:
+        # instance 0 uses the game directory itself, the others get a copy of the
+        # private data and links to everything else (jars, mods, config)
+        if index == 0:
+            return self.game_dir
+        workdir = os.path.join(self.instances_dir, str(index))
+        os.makedirs(workdir, exist_ok=True)
+        for name in os.listdir(self.game_dir):
+            src = os.path.abspath(os.path.join(self.game_dir, name))
+            dst = os.path.join(workdir, name)
+            if os.path.lexists(dst):
+                continue
+            if name in PRIVATE_DIRS:
+                shutil.copytree(src, dst)
+                continue
+            if name in OUTPUT_DIRS:
+                os.makedirs(dst)
+                continue
+            try:
+                os.symlink(src, dst, target_is_directory=os.path.isdir(src))
+            except OSError:
+                # symlinks need extra privileges on Windows
+                if os.path.isdir(src):
+                    shutil.copytree(src, dst)
+                else:
+                    shutil.copy2(src, dst)
+        return workdir
+
+    def stop(self):
+        for instance in self.instances:
+            if instance.process is not None and instance.process.poll() is None:
+                instance.process.terminate()
+        for instance in self.instances:
+            if instance.process is not None:
+                try:
+                    instance.process.wait(timeout=10)
+                except subprocess.TimeoutExpired:
+                    instance.process.kill()
+        self.instances = []
@@ -1,80 +1,211 @@
 import os
 import logging
 import random
-import subprocess
-import time
 from sb3_contrib import MaskablePPO
 from sb3_contrib.common.wrappers import ActionMasker
 from sb3_contrib.common.maskable.policies import MaskableActorCriticPolicy
+from stable_baselines3.common.vec_env import SubprocVecEnv
 
 from logging_config import setup_logging
 from action_manager import ActionManager
 from game_controller import GameController
 from game_env import GameEnv
+from launcher import GameLauncher
+from env_factory import mask_fn, make_env, collect_discovered_actions
+from checkpoint import save_model_atomic
+from checkpoint_callback import AsyncCheckpointCallback
+from scheduler import TrainingJob, TrainingScheduler
 from stop_training_callback import StopTrainingCallback
-
-def mask_fn(env):
-    return env.get_action_mask()
+from profiling_callback import ProfilingCallback
 
 PERSOS = ["IRONCLAD", "THE_SILENT"]
-random.shuffle(PERSOS)
 MODEL_PATH = "ressources/models/sts_ppo"
+ACTIONS_PATH = "ressources/actions/all_actions.json"
+# number of game processes; above 1, rollouts are collected through a SubprocVecEnv
+N_INSTANCES = 1
+# timesteps per character before switching, when running several instances
+ROUND_TIMESTEPS = 2048
+# (verb, slot, target) MultiDiscrete actions instead of the flat list; saved
+# under their own model files since the policy heads differ
+FACTORED_ACTIONS = False
+# append the map routing features to the observation (larger observation,
+# so also saved under their own model files)
+MAP_FEATURES = False
+# directory where every step is recorded for offline training (one store per
+# character and game instance), None to disable
+RECORD_DIR = None
+# directory where raw states and sent commands are recorded, the input of
+# src/pretrain.py (same layout as RECORD_DIR), None to disable
+RECORD_RAW_DIR = None
+# per-phase step timings, recorded in the training logs under profile/ and,
+# with PROFILE_LOG_EVERY > 0, logged every PROFILE_LOG_EVERY steps per env
+PROFILE = False
+PROFILE_LOG_EVERY = 0
+# seconds the games get to load up to the main menu
+BOOT_TIMEOUT = 180
+# restart runs with /reset and /start sent back to back (GameController.restart_run)
+WARM_RESTART = True
+# seeds replayed in turn by the runs of every character, e.g.
+# run_seeds.saved_run_seeds("ressources/jar/saves"); empty for random runs
+RUN_SEEDS = []
+# train every character at once, each in its own process on N_INSTANCES games
+# of its own, instead of alternating them; THREADS_PER_MODEL torch threads each
+CONCURRENT_TRAINING = False
+THREADS_PER_MODEL = 1
+# timesteps between checkpoints, written in the background to
+# CHECKPOINT_DIR/<model>_<timesteps>_steps.zip (the KEEP_CHECKPOINTS most
+# recent are kept) and over the model file; 0 to disable
+CHECKPOINT_FREQ = 10_000
+CHECKPOINT_DIR = "ressources/models/checkpoints"
+KEEP_CHECKPOINTS = 3
+
+
+def record_dir(root, perso, index=0):
+    # one recording directory per character and game instance (index None:
+    # the character's directory)
+    if root is None:
+        return None
+    if index is None:
+        return os.path.join(root, perso)
+    return os.path.join(root, perso, str(index))
+
+
+def model_path(perso):
+    prefix = MODEL_PATH
+    if FACTORED_ACTIONS:
+        prefix += "_factored"
+    if MAP_FEATURES:
+        prefix += "_map"
+    return f"{prefix}_{perso}"
 
-setup_logging()
-logger = logging.getLogger("Main")
-game_process = subprocess.Popen(
-    ["java", "-jar", ".\\ModTheSpire.jar", "--skip-launcher"],
-    cwd="ressources/jar",
-    stdout=subprocess.DEVNULL,
-    stderr=subprocess.DEVNULL)
-time.sleep(15)
-action_manager = ActionManager(filepath="ressources/actions/all_actions.json")
-game_controller = GameController()
-models = {}
-envs = {}
-callbacks = {}
-
-for perso in PERSOS:
-    envs[perso] = GameEnv(action_manager, game_controller)
-    callbacks[perso] = StopTrainingCallback(envs[perso], verbose=1)
-    envs[perso] = ActionMasker(envs[perso], mask_fn)
-    if os.path.exists(f"{MODEL_PATH}_{perso}.zip"):
+
+def create_model(perso, env, logger, path=None):
+    path = path or model_path(perso)
+    if os.path.exists(f"{path}.zip"):
         logger.info("Loading existing model...")
-        models[perso] = MaskablePPO.load(f"{MODEL_PATH}_{perso}", env=envs[perso])
-    else:
-        logger.info("Creating new model...")
-        models[perso] = MaskablePPO(
+        return MaskablePPO.load(path, env=env)
+    logger.info("Creating new model...")
+    return MaskablePPO(
         MaskableActorCriticPolicy,
-        envs[perso],
+        env,
         verbose=1,
         n_steps=256,
         batch_size=64,
         learning_rate=3e-4,
     )
 
-current_perso = None
-current_model = None
-
-try:
-    while True:
-        for perso, model in models.items():
-            current_perso = perso
-            current_model = model
-            game_controller.start_run(perso, 0)
-            logger.info(f"Training model for {perso}...")
-            model.learn(total_timesteps=100_000_000, callback=callbacks[perso], reset_num_timesteps=False)
-            model.save(f"{MODEL_PATH}_{perso}")
-            action_manager.save()
-except KeyboardInterrupt:
-    logger.info("Training stopped by user")
-    if current_model is not None and current_perso is not None:
-        logger.info(f"Saving model for {current_perso}")
-        current_model.save(f"{MODEL_PATH}_{current_perso}")
-    action_manager.save()
-except Exception as e:
-    logger.error(f"Unexpected error: {e}")
-    if current_model is not None and current_perso is not None:
-        logger.info(f"Saving model for {current_perso}")
-        current_model.save(f"{MODEL_PATH}_{current_perso}")
-    action_manager.save()
-    raise
+
+def env_options(perso, index=0):
+    # make_env options shared by every game of a character
+    return dict(factored_actions=FACTORED_ACTIONS, map_features=MAP_FEATURES,
+                record_dir=record_dir(RECORD_DIR, perso, index),
+                record_raw_dir=record_dir(RECORD_RAW_DIR, perso, index),
+                profile=PROFILE, profile_log_every=PROFILE_LOG_EVERY,
+                warm_restart=WARM_RESTART, seeds=RUN_SEEDS)
+
+
+def train_concurrently():
+    jobs = [TrainingJob(perso, instances=N_INSTANCES, num_threads=THREADS_PER_MODEL,
+                        round_timesteps=ROUND_TIMESTEPS, env_kwargs=env_options(perso, index=None))
+            for perso in PERSOS]
+    TrainingScheduler(jobs, actions_path=ACTIONS_PATH, boot_timeout=BOOT_TIMEOUT).run()
+
+
+def main():
+    random.shuffle(PERSOS)
+    setup_logging()
+    logger = logging.getLogger("Main")
+    if CONCURRENT_TRAINING:
+        train_concurrently()
+        return
+    launcher = GameLauncher()
+    instances = launcher.start(N_INSTANCES, timeout=BOOT_TIMEOUT)
+    action_manager = ActionManager(filepath=ACTIONS_PATH)
+    game_controller = GameController(instances[0].base_url)
+    models = {}
+    envs = {}
+    callbacks = {}
+
+    for perso in PERSOS:
+        if N_INSTANCES > 1:
+            # each worker restarts its own run on reset, no stop callback needed
+            envs[perso] = SubprocVecEnv([
+                make_env(perso, instance.base_url, ACTIONS_PATH, **env_options(perso, instance.index))
+                for instance in instances
+            ])
+            callbacks[perso] = []
+        else:
+            envs[perso] = GameEnv(action_manager, game_controller, factored_actions=FACTORED_ACTIONS,
+                                   map_features=MAP_FEATURES, record_dir=record_dir(RECORD_DIR, perso),
+                                   record_raw_dir=record_dir(RECORD_RAW_DIR, perso),
+                                   profile=PROFILE, profile_log_every=PROFILE_LOG_EVERY,
+                                   warm_restart=WARM_RESTART, seeds=RUN_SEEDS)
+            callbacks[perso] = [StopTrainingCallback(envs[perso], verbose=1)]
+            envs[perso] = ActionMasker(envs[perso], mask_fn)
+        if PROFILE:
+            callbacks[perso].append(ProfilingCallback())
+        if CHECKPOINT_FREQ:
+            callbacks[perso].append(AsyncCheckpointCallback(
+                os.path.join(CHECKPOINT_DIR, os.path.basename(model_path(perso))), CHECKPOINT_FREQ,
+                keep_last=KEEP_CHECKPOINTS, latest_path=model_path(perso), action_manager=action_manager))
+        models[perso] = create_model(perso, envs[perso], logger)
+
+    current_perso = None
+    current_model = None
+
+    def close_checkpoints():
+        # a checkpoint still being written would replace the final save
+        for callback_list in callbacks.values():
+            for callback in callback_list:
+                if isinstance(callback, AsyncCheckpointCallback):
+                    callback.close()
+
+    def save_actions():
+        if N_INSTANCES > 1:
+            for env in envs.values():
+                collect_discovered_actions(env, action_manager)
+        action_manager.save()
+
+    try:
+        while True:
+            for perso, model in models.items():
+                current_perso = perso
+                current_model = model
+                logger.info(f"Training model for {perso}...")
+                if N_INSTANCES > 1:
+                    # force a reset so every worker starts a run for this character
+                    model.set_env(envs[perso], force_reset=True)
+                    model.learn(total_timesteps=ROUND_TIMESTEPS, callback=callbacks[perso] or None, reset_num_timesteps=False)
+                else:
+                    if WARM_RESTART:
+                        game_controller.restart_run(perso, 0, envs[perso].unwrapped.run_seeds.next())
+                    else:
+                        game_controller.start_run(perso, 0, envs[perso].unwrapped.run_seeds.next())
+                    model.learn(total_timesteps=100_000_000, callback=callbacks[perso], reset_num_timesteps=False)
+                save_model_atomic(model, model_path(perso))
+                save_actions()
+    except KeyboardInterrupt:
+        logger.info("Training stopped by user")
+        close_checkpoints()
+        if current_model is not None and current_perso is not None:
+            logger.info(f"Saving model for {current_perso}")
+            save_model_atomic(current_model, model_path(current_perso))
+        save_actions()
+    except Exception as e:
+        logger.error(f"Unexpected error: {e}")
+        close_checkpoints()
+        if current_model is not None and current_perso is not None:
+            logger.info(f"Saving model for {current_perso}")
+            save_model_atomic(current_model, model_path(current_perso))
+        save_actions()
+        raise
+    finally:
+        close_checkpoints()
+        # also flushes the trajectory recorders
+        for env in envs.values():
+            env.close()
+        launcher.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+import os
+import glob
+import time
+import random
+import logging
+import argparse
+
+import numpy as np
+import torch as th
+import gymnasium as gym
+from gymnasium import spaces
+from torch.utils.data import DataLoader, IterableDataset, get_worker_info
+
+from action_manager import ActionManager, FactoredActions
+from json_decoder import JsonDecoder
+from state import State, encode_states
+
+
+class RawStepDataset(IterableDataset):
+    # Streams the steps recorded by RawStepWriter (GameEnv(record_raw_dir=...))
+    # as ready-made batches: (observations, action masks, target actions).
+    # Batches are encoded with encode_states inside the DataLoader workers, and
+    # each worker reads its own share of the files, so encoding scales with the
+    # CPUs. Steps whose command is not a known action are skipped. Files are
+    # shuffled every epoch, steps keep their recorded order inside a file.
+    def __init__(self, data_dir, action_manager: ActionManager, batch_size=256, factored_actions=False, seed=0):
+        self.files = sorted(glob.glob(os.path.join(data_dir, "**", "steps_*.jsonl"), recursive=True))
+        self.action_index = action_manager.action_index
+        self.n_actions = len(action_manager.actions)
+        # masked out in GameEnv as well
+        self.return_cmd_index = action_manager.index_of("return")
+        self.factored_actions = FactoredActions(action_manager) if factored_actions else None
+        self.batch_size = batch_size
+        self.seed = seed
+        self.epoch = 0
+
+    def set_epoch(self, epoch):
+        self.epoch = epoch
+
+    def _worker_files(self):
+        files = list(self.files)
+        random.Random(self.seed + self.epoch).shuffle(files)
+        info = get_worker_info()
+        if info is None:
+            return files
+        return files[info.id::info.num_workers]
+
+    def _steps(self):
+        decoder = JsonDecoder()
+        for path in self._worker_files():
+            with open(path, "rb") as f:
+                for line in f:
+                    try:
+                        step = decoder.loads(line)
+                    except ValueError:
+                        # last line of a file still being written
+                        continue
+                    if step.get("command") in self.action_index:
+                        yield step
+
+    def _target(self, command):
+        if self.factored_actions is not None:
+            verb, slot, target = self.factored_actions.parts[command]
+            return [verb, slot, target]
+        return self.action_index[command]
+
+    def _mask(self, available_commands):
+        if self.factored_actions is not None:
+            # mask_from_commands reuses one buffer, copied so batch rows stay distinct
+            return self.factored_actions.mask_from_commands(available_commands).copy()
+        mask = np.zeros(self.n_actions, dtype=bool)
+        mask[[self.action_index[c] for c in available_commands if c in self.action_index]] = True
+        if self.return_cmd_index is not None:
+            mask[self.return_cmd_index] = False
+        return mask
+
+    def _make_batch(self, steps):
+        raws = [step["state"] for step in steps]
+        obs = encode_states(raws)
+        masks = np.stack([self._mask(raw.get("available_commands", [])) for raw in raws]).astype(bool)
+        targets = np.array([self._target(step["command"]) for step in steps], dtype=np.int64)
+        # the recorded command is always selectable, even if the mask would hide it
+        rows = np.arange(len(steps))
+        if self.factored_actions is None:
+            masks[rows, targets] = True
+        else:
+            n_verbs, n_slots, _ = self.factored_actions.nvec
+            masks[rows, targets[:, 0]] = True
+            masks[rows, n_verbs + targets[:, 1]] = True
+            masks[rows, n_verbs + n_slots + targets[:, 2]] = True
+        return th.from_numpy(obs), th.from_numpy(masks), th.from_numpy(targets)
+
+    def __iter__(self):
+        batch = []
+        for step in self._steps():
+            batch.append(step)
+            if len(batch) == self.batch_size:
+                yield self._make_batch(batch)
+                batch = []
+        if batch:
+            yield self._make_batch(batch)
+
+
+def make_loader(dataset: RawStepDataset, num_workers=None):
+    # batches are built by the dataset itself (batch_size=None)
+    if num_workers is None:
+        num_workers = os.cpu_count() or 1
+    return DataLoader(dataset, batch_size=None, num_workers=num_workers,
+                      persistent_workers=False, prefetch_factor=4 if num_workers > 0 else None)
+
+
+def pretrain(policy, dataset: RawStepDataset, epochs=1, num_workers=None, max_grad_norm=0.5, logger=None):
+    # Behaviour cloning: masked cross-entropy between the policy's action
+    # distribution and the recorded commands, with the policy's own optimizer.
+    logger = logger or logging.getLogger("pretrain")
+    loader = make_loader(dataset, num_workers)
+    policy.set_training_mode(True)
+    stats = {}
+    for epoch in range(epochs):
+        dataset.set_epoch(epoch)
+        start = time.perf_counter()
+        total_loss, correct, samples = 0.0, 0, 0
+        for obs, masks, targets in loader:
+            obs, masks, targets = obs.to(policy.device), masks.to(policy.device), targets.to(policy.device)
+            distribution = policy.get_distribution(obs, action_masks=masks)
+            loss = -distribution.log_prob(targets).mean()
+            policy.optimizer.zero_grad()
+            loss.backward()
+            th.nn.utils.clip_grad_norm_(policy.parameters(), max_grad_norm)
+            policy.optimizer.step()
+
+            with th.no_grad():
+                predicted = distribution.mode()
+                hits = predicted == targets
+                correct += int((hits.all(dim=1) if hits.dim() > 1 else hits).sum())
+            total_loss += loss.item() * len(targets)
+            samples += len(targets)
+        elapsed = time.perf_counter() - start
+        stats = {
+            "loss": total_loss / max(samples, 1),
+            "accuracy": correct / max(samples, 1),
+            "samples": samples,
+            "samples_per_s": samples / elapsed if elapsed > 0 else 0.0,
+        }
+        logger.info(f"Epoch {epoch + 1}/{epochs}: loss={stats['loss']:.4f} accuracy={stats['accuracy']:.3f} "
+                    f"({samples} samples, {stats['samples_per_s']:.0f}/s)")
+    policy.set_training_mode(False)
+    return stats
+
+
+class SpacesEnv(gym.Env):
+    # spaces only: lets MaskablePPO be created or loaded without a game
+    def __init__(self, observation_space, action_space):
+        self.observation_space = observation_space
+        self.action_space = action_space
+
+    def reset(self, seed=None, options=None):
+        raise RuntimeError("SpacesEnv can not be played")
+
+    def step(self, action):
+        raise RuntimeError("SpacesEnv can not be played")
+
+
+def main():
+    import main as training
+    from logging_config import setup_logging
+
+    parser = argparse.ArgumentParser(description="Pretrain a character's policy on recorded steps")
+    parser.add_argument("character")
+    parser.add_argument("data_dir", help="directory of steps_*.jsonl files (GameEnv record_raw_dir)")
+    parser.add_argument("--epochs", type=int, default=5)
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    setup_logging()
+    logger = logging.getLogger("pretrain")
+    if training.MAP_FEATURES:
+        raise ValueError("Offline pretraining does not encode the map routing features")
+
+    action_manager = ActionManager(filepath=training.ACTIONS_PATH)
+    if training.FACTORED_ACTIONS:
+        action_space = spaces.MultiDiscrete(FactoredActions(action_manager).nvec)
+    else:
+        action_space = spaces.Discrete(len(action_manager.actions))
+    env = SpacesEnv(spaces.Box(low=0, high=1, shape=(State.get_size(),), dtype=np.float32), action_space)
+    model = training.create_model(args.character, env, logger)
+
+    dataset = RawStepDataset(args.data_dir, action_manager, batch_size=args.batch_size,
+                             factored_actions=training.FACTORED_ACTIONS)
+    logger.info(f"Pretraining {args.character} on {len(dataset.files)} files")
+    pretrain(model.policy, dataset, epochs=args.epochs, num_workers=args.workers, logger=logger)
+    model.save(training.model_path(args.character))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,18 @@
+from stable_baselines3.common.callbacks import BaseCallback
+
+from step_profiler import StepProfiler
+
+class ProfilingCallback(BaseCallback):
+    # Collects the step timings of every env (GameEnv(profile=True)) at the end
+    # of each rollout and records them in the training logs under "profile/".
+    def _on_step(self) -> bool:
+        return True
+
+    def _on_rollout_end(self) -> None:
+        profile = StepProfiler.merged(self.training_env.env_method("take_profile"))
+        if profile.steps == 0:
+            return
+        for key, value in profile.summary().items():
+            self.logger.record(f"profile/{key}", value)
+        if self.verbose > 0:
+            profile.log_summary()
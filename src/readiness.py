@@ -0,0 +1,121 @@
+import time
+from typing import Any, Dict, Optional
+
+from run_seeds import seed_from_string
+
+
+class ReadinessTimeout(TimeoutError):
+    # the game did not reach the awaited state before the deadline
+    pass
+
+
+class GameProcessExited(RuntimeError):
+    # the game process died while it was being waited for
+    pass
+
+
+# predicates on /state responses
+
+def has_commands(state: Dict[str, Any]) -> bool:
+    # the mod answers and accepts commands (main menu or in a run)
+    return bool(state.get("available_commands"))
+
+
+def out_of_run(state: Dict[str, Any]) -> bool:
+    return not state.get("in_game")
+
+
+def in_run(state: Dict[str, Any]) -> bool:
+    # a run is started and the game waits for the agent
+    return bool(state.get("in_game")) and bool(state.get("ready_for_command")) and has_commands(state)
+
+
+def is_death(state: Dict[str, Any]) -> bool:
+    gs = state.get("game_state") or {}
+    return gs.get("screen_name") == "DEATH" or gs.get("screen_type") == "GAME_OVER"
+
+
+def same_seed(value: Any, seed: str) -> bool:
+    # whether game_state.seed (the game's long, or the string given to /start
+    # as SimServer reports it) is the seed string
+    try:
+        expected = seed_from_string(seed)
+        return (seed_from_string(value) if isinstance(value, str) else int(value)) == expected
+    except (TypeError, ValueError):
+        return value == seed
+
+
+def new_run(previous: Optional[Dict[str, Any]] = None, character: Optional[str] = None):
+    # Predicate accepting a playable run of `character` other than the one
+    # `previous` (the /state read just before /reset) belongs to: until the game
+    # has processed /reset and /start, /state keeps showing the old run.
+    prev_gs = (previous or {}).get("game_state") or {}
+    prev_death = bool(prev_gs) and is_death(previous)
+
+    def accept(state: Dict[str, Any]) -> bool:
+        if not in_run(state) or is_death(state):
+            return False
+        gs = state.get("game_state") or {}
+        if character is not None and gs.get("class") != character:
+            return False
+        if not prev_gs or prev_death:
+            return True
+        return (gs.get("class") != prev_gs.get("class") or gs.get("seed") != prev_gs.get("seed")
+                or (gs.get("floor") or 0) < (prev_gs.get("floor") or 0))
+    return accept
+
+
+def same_run_possible(previous: Dict[str, Any], character: str, seed: Optional[str]) -> bool:
+    # True when new_run(previous, character) cannot tell the run /start is
+    # about to begin from the one `previous` shows: a playable run of the same
+    # character on the same seed (a replayed seed after a run left without
+    # dying). The new run is then only recognised after the main menu.
+    gs = previous.get("game_state") or {}
+    return (seed is not None and bool(previous.get("in_game")) and not is_death(previous)
+            and gs.get("class") == character and same_seed(gs.get("seed"), seed))
+
+
+def describe_state(state: Dict[str, Any]) -> str:
+    # short summary for timeout messages
+    return (f"in_game={state.get('in_game')} ready_for_command={state.get('ready_for_command')} "
+            f"commands={state.get('available_commands')}")
+
+
+class Poller:
+    # Exponential backoff between probes, bounded by a deadline. next_delay()
+    # is called after every failed probe: it raises ReadinessTimeout once the
+    # deadline has passed (or GameProcessExited if `process`, a Popen, has
+    # exited) and otherwise returns how long to sleep, never past the deadline.
+    # timeout=None waits forever. last_error is put in the timeout message.
+    def __init__(self, what: str, timeout: Optional[float], initial_delay: float = 0.05, max_delay: float = 1.0,
+                 backoff: float = 2.0, process=None):
+        self.what = what
+        self.timeout = timeout
+        self.start = time.monotonic()
+        self.deadline = None if timeout is None else self.start + timeout
+        self.delay = initial_delay
+        self.max_delay = max_delay
+        self.backoff = backoff
+        self.process = process
+        self.polls = 0
+        self.last_error: Optional[str] = None
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.start
+
+    def remaining(self) -> Optional[float]:
+        return None if self.deadline is None else max(0.0, self.deadline - time.monotonic())
+
+    def next_delay(self) -> float:
+        self.polls += 1
+        if self.process is not None and self.process.poll() is not None:
+            raise GameProcessExited(f"Game process exited with code {self.process.returncode} while waiting for {self.what}")
+        now = time.monotonic()
+        if self.deadline is not None and now >= self.deadline:
+            detail = f": {self.last_error}" if self.last_error else ""
+            raise ReadinessTimeout(f"Timed out after {self.timeout:.1f}s ({self.polls} probes) waiting for {self.what}{detail}")
+        delay = self.delay
+        if self.deadline is not None:
+            delay = min(delay, self.deadline - now)
+        self.delay = min(self.delay * self.backoff, self.max_delay)
+        return delay
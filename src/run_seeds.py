@@ -0,0 +1,70 @@
+import os
+import glob
+import json
+import base64
+from typing import Any, Dict, Iterable, List, Optional
+
+# alphabet of the seeds shown by the game (SeedHelper): base 35, no letter O
+SEED_CHARS = "0123456789ABCDEFGHIJKLMNPQRSTUVWXYZ"
+# key the game XORs its save files with before base64 encoding them
+SAVE_KEY = b"key"
+
+
+def seed_to_string(seed: int) -> str:
+    # SeedHelper.getString: the 64-bit seed read as unsigned, in base 35
+    seed &= (1 << 64) - 1
+    chars = []
+    while True:
+        seed, r = divmod(seed, len(SEED_CHARS))
+        chars.append(SEED_CHARS[r])
+        if seed == 0:
+            return "".join(reversed(chars))
+
+
+def seed_from_string(text: str) -> int:
+    # SeedHelper.getLong, as a signed 64-bit value like the game's long
+    value = 0
+    for c in text.upper().replace("O", "0"):
+        value = (value * len(SEED_CHARS) + SEED_CHARS.index(c)) & ((1 << 64) - 1)
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def read_save(path: str) -> Dict[str, Any]:
+    # <CHARACTER>.autosave files: JSON, usually XORed with SAVE_KEY and base64 encoded
+    with open(path, "rb") as f:
+        data = f.read().strip()
+    if not data.startswith(b"{"):
+        raw = base64.b64decode(data)
+        data = bytes(b ^ SAVE_KEY[i % len(SAVE_KEY)] for i, b in enumerate(raw))
+    return json.loads(data)
+
+
+def saved_run_seeds(saves_dir: str = "ressources/jar/saves", character: Optional[str] = None) -> List[str]:
+    # seeds of the runs saved in the game's saves directory (one per character
+    # with a run in progress), to replay them with GameEnv(seeds=...)
+    seeds = []
+    for path in sorted(glob.glob(os.path.join(saves_dir, "*.autosave*"))):
+        if character is not None and not os.path.basename(path).startswith(character + "."):
+            continue
+        try:
+            save = read_save(path)
+        except (OSError, ValueError):
+            continue
+        if save.get("seed") is not None:
+            seeds.append(seed_to_string(int(save["seed"])))
+    return seeds
+
+
+class RunSeeds:
+    # Seeds handed to /start, cycling through a fixed list so the same runs are
+    # replayed in turn. An empty list gives None: the game picks a random seed.
+    def __init__(self, seeds: Iterable[str] = ()):
+        self.seeds = [str(s).upper() for s in seeds]
+        self.position = 0
+
+    def next(self) -> Optional[str]:
+        if not self.seeds:
+            return None
+        seed = self.seeds[self.position % len(self.seeds)]
+        self.position += 1
+        return seed
@@ -0,0 +1,179 @@
+import os
+import queue
+import signal
+import logging
+import traceback
+import multiprocessing as mp
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from action_manager import ActionManager
+from launcher import GameLauncher
+
+
+@dataclass
+class TrainingJob:
+    # One character trained in its own process on its own games.
+    character: str
+    # games launched for this character (ignored when base_urls is given)
+    instances: int = 1
+    # already running games to use instead of launching some
+    base_urls: List[str] = field(default_factory=list)
+    # torch intra-op threads of the worker, and optionally the CPUs it may run on
+    num_threads: int = 1
+    cpus: Optional[List[int]] = None
+    # timesteps between checkpoints, and in total (None = until stopped)
+    round_timesteps: int = 2048
+    total_timesteps: Optional[int] = None
+    # model file (default: main.model_path(character)) and make_env options
+    model_path: Optional[str] = None
+    env_kwargs: Dict[str, Any] = field(default_factory=dict)
+
+    def game_env_kwargs(self, index: int) -> Dict[str, Any]:
+        # make_env options of the index-th game: one recording directory per game
+        kwargs = dict(self.env_kwargs)
+        for key in ("record_dir", "record_raw_dir"):
+            if kwargs.get(key) is not None:
+                kwargs[key] = os.path.join(kwargs[key], str(index))
+        return kwargs
+
+
+def _apply_budget(job: TrainingJob) -> None:
+    import torch as th
+
+    th.set_num_threads(job.num_threads)
+    if job.cpus and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, job.cpus)
+
+
+def train_worker(job: TrainingJob, actions_path: str, messages, stop) -> None:
+    # Runs in the worker process: learns round_timesteps at a time and, after
+    # every round, saves the model atomically and sends the actions discovered
+    # so far to the scheduler, the only process writing the action files.
+    # Ctrl+C reaches the whole process group: the worker (and the env processes
+    # it starts) ignore it and stop through `stop`, set by the scheduler.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    import main as training
+    from checkpoint import save_model_atomic
+    from env_factory import make_env, collect_discovered_actions
+    from logging_config import setup_logging
+    from stable_baselines3.common.vec_env import DummyVecEnv, SubprocVecEnv
+
+    setup_logging()
+    logger = logging.getLogger(f"Worker[{job.character}]")
+    _apply_budget(job)
+    factories = [make_env(job.character, url, actions_path, **job.game_env_kwargs(i))
+                 for i, url in enumerate(job.base_urls)]
+    env = SubprocVecEnv(factories) if len(factories) > 1 else DummyVecEnv(factories)
+    action_manager = ActionManager(filepath=actions_path)
+    model = None
+    try:
+        model = training.create_model(job.character, env, logger, path=job.model_path)
+        trained = 0
+        while not stop.is_set() and (job.total_timesteps is None or trained < job.total_timesteps):
+            model.learn(total_timesteps=job.round_timesteps, reset_num_timesteps=False)
+            trained += job.round_timesteps
+            save_model_atomic(model, job.model_path)
+            collect_discovered_actions(env, action_manager)
+            messages.put(("checkpoint", job.character, model.num_timesteps, list(action_manager.discovered_actions)))
+        messages.put(("done", job.character, model.num_timesteps, list(action_manager.discovered_actions)))
+    except BaseException:
+        if model is not None:
+            save_model_atomic(model, job.model_path)
+        messages.put(("error", job.character, traceback.format_exc(), []))
+    finally:
+        env.close()
+
+
+class TrainingScheduler:
+    # Trains several characters at the same time, one worker process per
+    # character with its own game instances and CPU/thread budget, instead of
+    # alternating them on one game. Each worker writes only its own model file
+    # (temp file + rename); the discovered actions of all workers are merged
+    # here and saved by this process alone, so no file is written by two
+    # processes. Games are launched for the jobs without base_urls.
+    def __init__(self, jobs: List[TrainingJob], actions_path: str = "ressources/actions/all_actions.json",
+                 launcher: Optional[GameLauncher] = None, boot_timeout: float = 180.0):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.jobs = jobs
+        self.actions_path = actions_path
+        self.action_manager = ActionManager(filepath=actions_path)
+        self.launcher = launcher
+        self.boot_timeout = boot_timeout
+        self.context = mp.get_context("spawn")
+        self.messages = self.context.Queue()
+        self.stop_event = self.context.Event()
+        self.processes: Dict[str, Any] = {}
+        # per character: timesteps trained, checkpoints written, error traceback
+        self.progress: Dict[str, Dict[str, Any]] = {job.character: {"timesteps": 0, "checkpoints": 0, "error": None}
+                                                    for job in jobs}
+
+    def _assign_games(self) -> None:
+        needed = sum(job.instances for job in self.jobs if not job.base_urls)
+        if needed == 0:
+            return
+        if self.launcher is None:
+            self.launcher = GameLauncher()
+        instances = self.launcher.start(needed, timeout=self.boot_timeout)
+        urls = [instance.base_url for instance in instances]
+        for job in self.jobs:
+            if not job.base_urls:
+                job.base_urls, urls = urls[:job.instances], urls[job.instances:]
+
+    def start(self) -> None:
+        import main as training
+
+        self._assign_games()
+        for job in self.jobs:
+            job.model_path = job.model_path or training.model_path(job.character)
+            process = self.context.Process(target=train_worker, name=f"train-{job.character}",
+                                           args=(job, self.actions_path, self.messages, self.stop_event))
+            process.start()
+            self.processes[job.character] = process
+            self.logger.info(f"Training {job.character} on {', '.join(job.base_urls)} "
+                             f"({job.num_threads} threads{f', CPUs {job.cpus}' if job.cpus else ''})")
+
+    def _handle(self, message) -> None:
+        kind, character, value, discovered = message
+        progress = self.progress[character]
+        if kind == "error":
+            progress["error"] = value
+            self.logger.error(f"Training {character} failed:\n{value}")
+            return
+        progress["timesteps"] = value
+        if kind == "checkpoint":
+            progress["checkpoints"] += 1
+        for action in discovered:
+            self.action_manager.mark_discovered(action)
+        self.action_manager.save()
+        self.logger.info(f"{character}: {value} timesteps ({kind})")
+
+    def _running(self) -> bool:
+        return any(p.is_alive() for p in self.processes.values())
+
+    def wait(self, poll_interval: float = 1.0) -> Dict[str, Dict[str, Any]]:
+        # handles worker messages until every worker has exited
+        while self._running() or not self.messages.empty():
+            try:
+                self._handle(self.messages.get(timeout=poll_interval))
+            except queue.Empty:
+                pass
+        for process in self.processes.values():
+            process.join()
+        return self.progress
+
+    def stop(self) -> None:
+        # workers finish their round, save and exit
+        self.stop_event.set()
+
+    def run(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            self.start()
+            return self.wait()
+        except KeyboardInterrupt:
+            self.logger.info("Training stopped by user, waiting for the workers to save")
+            self.stop()
+            return self.wait()
+        finally:
+            if self.launcher is not None:
+                self.launcher.stop()
@@ -0,0 +1,317 @@
+import os
+import json
+import time
+import random
+import logging
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional
+
+FIXTURES_DIR = os.path.join("ressources", "test_json")
+# order the fixtures are replayed in: a fight, its rewards, the map, a shop and events
+DEFAULT_SCENARIO = (
+    "fight.json", "fight_2.json", "fight_3.json", "fight_reward.json", "fight_reward_2.json",
+    "map.json", "shop.json", "map_2.json", "event.json", "event_2.json", "event_3.json", "orbs.json",
+)
+# commands available on the death screen served at the end of a run
+DEATH_COMMANDS = ["proceed"]
+# /state of the main menu, served after /reset until /start
+MENU_PAYLOAD = json.dumps({"available_commands": ["start"], "ready_for_command": True, "in_game": False}).encode("utf-8")
+
+
+class SimHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 so clients can keep the connection alive, like the mod's server
+    protocol_version = "HTTP/1.1"
+    # buffer headers + body into one send and disable Nagle, otherwise
+    # keep-alive clients hit the 40 ms delayed-ACK stall
+    wbufsize = -1
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        self.server.sim.connection_count += 1
+
+    def _send_json(self, payload: bytes):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        sim = self.server.sim
+        time.sleep(sim.latency)
+        if not sim.booted():
+            self.send_error(503)
+        elif self.path == "/health":
+            self._send_json(b'{"status": "ok"}')
+        elif self.path == "/state":
+            self._send_json(sim.state_payload())
+        else:
+            self.send_error(404)
+
+    def do_POST(self):
+        sim = self.server.sim
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        time.sleep(sim.latency)
+        if self.path == "/command":
+            self._send_json(json.dumps(sim.command(body.decode("utf-8"))).encode("utf-8"))
+        elif self.path == "/start":
+            params = json.loads(body) if body else {}
+            if sim.start(params.get("character"), params.get("ascension_level", 0), params.get("seed")):
+                self._send_json(b'{"success": true}')
+            else:
+                self.send_error(500, "Game is resetting")
+        elif self.path == "/reset":
+            sim.request_reset()
+            self._send_json(b'{"success": true}')
+        else:
+            self.send_error(404)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class SimServer:
+    # Local stand-in for HttpCommunicationMod (/health, /state, /command,
+    # /start, /reset) replaying the ressources/test_json fixtures, to benchmark
+    # GameEnv/GameController without the game.
+    # - every accepted command moves to the next fixture of `fixtures` (looping);
+    #   with mutate=True the copy is altered deterministically from `seed`
+    #   (hp lost, monsters damaged, floors climbing on every loop)
+    # - latency (seconds) is added to every request
+    # - for ready_delay seconds after a command, /state reports
+    #   ready_for_command false, like the game playing its animations
+    # - after run_length commands the run ends on a DEATH screen until /start
+    #   or /reset
+    # - validate_commands rejects commands that are not in available_commands
+    # - for boot_delay seconds after start_server every GET answers 503, like a
+    #   game still loading
+    # - with menu_on_reset, /reset leaves the run: /state is the main menu
+    #   (in_game false) until /start
+    # - /reset takes effect after reset_delay seconds: until then /state still
+    #   shows the old run and /start is refused, like the game fading out
+    # - with start_delay, /start is accepted at once, even during a pending
+    #   /reset, and takes effect start_delay seconds later (after that reset):
+    #   until then /state shows the old run, as when the mod queues the start
+    # - /start may pass a seed, reported as game_state.seed of the run
+    def __init__(self, fixtures=DEFAULT_SCENARIO, port=0, latency=0.0, ready_delay=0.0, ready=True, mutate=True,
+                 run_length=None, seed=0, validate_commands=False, fixtures_dir=FIXTURES_DIR, boot_delay=0.0,
+                 menu_on_reset=True, reset_delay=0.0, start_delay=None):
+        self.templates: List[bytes] = []
+        for name in fixtures:
+            with open(os.path.join(fixtures_dir, name), "rb") as f:
+                self.templates.append(f.read())
+        self.latency = latency
+        self.ready_delay = ready_delay
+        self.ready = ready
+        self.mutate = mutate
+        self.run_length = run_length
+        self.seed = seed
+        self.validate_commands = validate_commands
+        self.boot_delay = boot_delay
+        self.booted_at = 0.0
+        self.menu_on_reset = menu_on_reset
+        self.reset_delay = reset_delay
+        self.reset_at = None
+        self.start_delay = start_delay
+        # (time, character, ascension_level, seed) of an accepted /start not applied yet
+        self.pending_start = None
+        self.run_seed = None
+        self.lock = threading.Lock()
+        # request counters, for tests and benchmarks
+        self.connection_count = 0
+        self.state_requests = 0
+        self.commands = 0
+        self.runs = 0
+        self.reset()
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", port), SimHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.sim = self
+        self.thread: Optional[threading.Thread] = None
+
+    # game simulation
+
+    def reset(self, character=None, ascension_level=0, menu=False):
+        with self.lock:
+            self.in_menu = menu
+            self.reset_at = None
+            self.rng = random.Random(self.seed + self.runs)
+            self.character = character
+            self.ascension_level = ascension_level
+            self.position = 0
+            self.run_commands = 0
+            self.floor_offset = 0
+            self.dead = False
+            self.ready_at = 0.0
+            self._load(0)
+
+    def request_reset(self):
+        with self.lock:
+            self.reset_at = time.monotonic() + self.reset_delay
+        self._apply_reset()
+
+    def _apply_reset(self):
+        # performs a requested /reset once its delay has passed, returns True when none is pending
+        if self.reset_at is None:
+            return True
+        if time.monotonic() < self.reset_at:
+            return False
+        self.reset(menu=self.menu_on_reset)
+        return True
+
+    def _apply_pending(self):
+        # performs the requested /reset and /start whose delays have passed,
+        # returns True when no reset is pending
+        if not self._apply_reset():
+            return False
+        pending = self.pending_start
+        if pending is not None and time.monotonic() >= pending[0]:
+            self.pending_start = None
+            self._begin_run(*pending[1:])
+        return True
+
+    def start(self, character, ascension_level=0, seed=None):
+        if self.start_delay is not None:
+            self.pending_start = (time.monotonic() + self.start_delay, character, ascension_level, seed)
+            self._apply_pending()
+            return True
+        if not self._apply_reset():
+            return False
+        self._begin_run(character, ascension_level, seed)
+        return True
+
+    def _begin_run(self, character, ascension_level, seed):
+        self.runs += 1
+        self.run_seed = seed
+        self.reset(character, ascension_level)
+
+    def _load(self, position):
+        # caller holds the lock
+        state = json.loads(self.templates[position])
+        gs = state.get("game_state") or {}
+        if self.character is not None:
+            gs["class"] = self.character
+            gs["ascension_level"] = self.ascension_level
+            # one seed per run, the requested one or a run counter
+            gs["seed"] = self.run_seed if self.run_seed is not None else self.seed * 1000 + self.runs
+        if self.mutate:
+            self._mutate(gs)
+        self.state = state
+        self.payloads = {}
+
+    def _mutate(self, gs):
+        rng = self.rng
+        if gs.get("floor") is not None:
+            gs["floor"] += self.floor_offset
+        player = (gs.get("combat_state") or {}).get("player") or gs
+        if player.get("current_hp"):
+            player["current_hp"] = max(1, player["current_hp"] - rng.randint(0, 5))
+        for monster in (gs.get("combat_state") or {}).get("monsters", []):
+            if monster.get("current_hp"):
+                monster["current_hp"] = max(1, monster["current_hp"] - rng.randint(0, 10))
+
+    def _die(self):
+        gs = self.state.setdefault("game_state", {})
+        gs["screen_name"] = "DEATH"
+        gs["screen_type"] = "GAME_OVER"
+        self.state["available_commands"] = list(DEATH_COMMANDS)
+        self.dead = True
+        self.payloads = {}
+
+    def command(self, cmd):
+        with self.lock:
+            cmd = cmd.strip()
+            if self.in_menu:
+                return {"success": False, "error": "Not in game"}
+            if self.validate_commands and cmd not in self.state.get("available_commands", []):
+                return {"success": False, "error": f"Invalid command: {cmd}"}
+            self.commands += 1
+            self.ready_at = time.monotonic() + self.ready_delay
+            if self.dead:
+                return {"success": True}
+            self.run_commands += 1
+            self.position = (self.position + 1) % len(self.templates)
+            if self.position == 0:
+                self.floor_offset += 1
+            self._load(self.position)
+            if self.run_length is not None and self.run_commands >= self.run_length:
+                self._die()
+            return {"success": True}
+
+    def state_payload(self) -> bytes:
+        # serialized once per (state, readiness), /state is polled far more often than it changes
+        self._apply_pending()
+        with self.lock:
+            self.state_requests += 1
+            if self.in_menu:
+                return MENU_PAYLOAD
+            ready = self.ready and time.monotonic() >= self.ready_at
+            payload = self.payloads.get(ready)
+            if payload is None:
+                self.state["ready_for_command"] = ready
+                payload = self.payloads[ready] = json.dumps(self.state).encode("utf-8")
+            return payload
+
+    # server
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def booted(self):
+        return time.monotonic() >= self.booted_at
+
+    def start_server(self):
+        self.booted_at = time.monotonic() + self.boot_delay
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop_server(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start_server()
+
+    def __exit__(self, *exc):
+        self.stop_server()
+
+
+def main():
+    from logging_config import setup_logging
+
+    parser = argparse.ArgumentParser(description="Simulated game servers replaying the test fixtures")
+    parser.add_argument("--instances", type=int, default=1, help="servers on base-port, base-port + 1, ...")
+    parser.add_argument("--base-port", type=int, default=8080)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--ready-delay", type=float, default=0.0)
+    parser.add_argument("--run-length", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    setup_logging()
+    logger = logging.getLogger("SimServer")
+    servers = [
+        SimServer(port=args.base_port + i, latency=args.latency, ready_delay=args.ready_delay,
+                  run_length=args.run_length, seed=args.seed + i).start_server()
+        for i in range(args.instances)
+    ]
+    for server in servers:
+        logger.info(f"Simulated game on {server.base_url}")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for server in servers:
+            server.stop_server()
+
+
+if __name__ == "__main__":
+    main()
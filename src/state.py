@@ -1,5 +1,6 @@
+from collections import OrderedDict
 from dataclasses import dataclass, field
-from typing import List, Optional, Dict, Any
+from typing import List, NamedTuple, Optional, Dict, Any, Sequence, Tuple
 import numpy as np
 
 # encoding constants (match those in game_env.py)
@@ -19,20 +20,95 @@ ROOM_PHASES = ["COMBAT", "COMPLETE", "EVENT", "SHOP", "REST", "UNKNOWN"]
 ROOM_PHASE_MAP = {v: i for i, v in enumerate(ROOM_PHASES)}
 MAP_SYMBOLS = ["M", "?", "$", "E", "R"]
 MAP_SYMBOL_INDEX = {s: i for i, s in enumerate(MAP_SYMBOLS)}
+# optional routing block (State.encode_state(map_paths=True)): position known flag,
+# number of next choices, then per symbol the nodes reachable, and the most and
+# fewest nodes of that symbol on a path from the next choices to the boss
+MAP_PATH_FEATURES = 2 + 3 * len(MAP_SYMBOLS)
+# floors per act, map row y is floor - 1 - FLOORS_PER_ACT * (act - 1)
+FLOORS_PER_ACT = 17
 
 # additional encoding limits
 MAX_OWNED_RELICS = 10
 MAX_PLAYER_POWERS = 6
 MAX_PLAYER_POTIONS = 3
 MAX_PILE_TOP = 3
+# number of leading player values (hp, max_hp, energy, block) placed next to floor/act
+PLAYER_HEAD_SIZE = 4
+PILE_NAMES = ("draw_pile", "discard_pile", "exhaust_pile")
+
+
+class IdTable:
+    # Interns string identifiers (card/potion/relic ids, monster intents) to
+    # small ints shared by every State. 0 is never used, so an interned id is
+    # truthy exactly when the original string was.
+    def __init__(self):
+        self.ids: Dict[str, int] = {}
+        self.names: List[str] = [""]
+
+    def intern(self, name: Optional[str]) -> Optional[int]:
+        if not name:
+            return None
+        idx = self.ids.get(name)
+        if idx is None:
+            idx = len(self.names)
+            self.ids[name] = idx
+            self.names.append(name)
+        return idx
+
+    def name(self, idx: Optional[int]) -> Optional[str]:
+        return self.names[idx] if idx else None
+
+
+ID_TABLE = IdTable()
+
+
+class CardFeatureCache:
+    # Bounded LRU of encoded card features. A card is identified by its uuid
+    # plus the fields that can change during a run (upgrades, cost, playability,
+    # exhaust/ethereal flags, and damage/block/magic when the game sends them).
+    def __init__(self, maxsize: int = 4096):
+        self.maxsize = maxsize
+        self.entries: "OrderedDict[Tuple[Any, ...], Tuple[float, ...]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
 
-@dataclass
+    @staticmethod
+    def key(card: Dict[str, Any]) -> Tuple[Any, ...]:
+        return (card.get("uuid"), card.get("upgrades"), card.get("cost"), card.get("is_playable"),
+                card.get("exhausts"), card.get("ethereal"), card.get("damage"), card.get("base_damage"), card.get("block"), card.get("magic"))
+
+    def get(self, key: Tuple[Any, ...]) -> Optional[Tuple[float, ...]]:
+        features = self.entries.get(key)
+        if features is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return features
+
+    def put(self, key: Tuple[Any, ...], features: Tuple[float, ...]) -> None:
+        self.entries[key] = features
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "size": len(self.entries), "maxsize": self.maxsize}
+
+
+CARD_FEATURE_CACHE = CardFeatureCache()
+
+@dataclass(slots=True)
 class Monster:
     current_hp: int = 0
     max_hp: int = 0
     block: int = 0
     move_base_damage: int = 0
-    intent: Optional[str] = None
+    intent: Optional[int] = None  # interned in ID_TABLE
     buffs: int = 0
     debuffs: int = 0
     is_gone: bool = False
@@ -46,7 +122,7 @@ class Monster:
             max_hp=data.get("max_hp", 0),
             block=data.get("block", 0),
             move_base_damage=data.get("move_base_damage", 0),
-            intent=data.get("intent") or data.get("intent_name"),
+            intent=ID_TABLE.intern(data.get("intent") or data.get("intent_name")),
             buffs=len(data.get("buffs", [])) if data.get("buffs") is not None else 0,
             debuffs=len(data.get("debuffs", [])) if data.get("debuffs") is not None else 0,
             is_gone=bool(data.get("is_gone", False)),
@@ -60,7 +136,7 @@ class Monster:
         self.max_hp = data.get("max_hp", 0)
         self.block = data.get("block", 0)
         self.move_base_damage = data.get("move_base_damage", 0)
-        self.intent = data.get("intent") or data.get("intent_name")
+        self.intent = ID_TABLE.intern(data.get("intent") or data.get("intent_name"))
         self.buffs = len(data.get("buffs", [])) if data.get("buffs") is not None else 0
         self.debuffs = len(data.get("debuffs", [])) if data.get("debuffs") is not None else 0
         self.is_gone = bool(data.get("is_gone", False))
@@ -71,6 +147,9 @@ class Monster:
         intent_flag = 1.0 if self.intent else 0.0
         return [self.current_hp or 0, self.max_hp or 0, self.block or 0, self.move_base_damage or 0, intent_flag, float(self.buffs or 0), float(self.debuffs or 0), 1.0 if self.is_gone else 0.0, 1.0 if self.half_dead else 0.0, float(self.move_hits or 0)]
 
+    def encode_into(self, out: np.ndarray, offset: int) -> None:
+        out[offset:offset + 10] = (self.current_hp or 0, self.max_hp or 0, self.block or 0, self.move_base_damage or 0, 1.0 if self.intent else 0.0, float(self.buffs or 0), float(self.debuffs or 0), 1.0 if self.is_gone else 0.0, 1.0 if self.half_dead else 0.0, float(self.move_hits or 0))
+
     @staticmethod
     def encode_size() -> int:
         return 10
@@ -81,7 +160,7 @@ class Monster:
         return Monster.encode_size()
 
 
-@dataclass
+@dataclass(slots=True)
 class CombatState:
     monsters: List[Monster] = field(default_factory=list)
 
@@ -103,6 +182,12 @@ class CombatState:
                 vec.extend([0.0] * Monster.encode_size())
         return vec
 
+    def encode_into(self, out: np.ndarray, offset: int) -> None:
+        # buffer is expected to be zeroed: missing monster slots are left untouched
+        size = Monster.encode_size()
+        for i, monster in enumerate(self.monsters[:MAX_MONSTERS]):
+            monster.encode_into(out, offset + i * size)
+
     @staticmethod
     def encode_size() -> int:
         return MAX_MONSTERS * Monster.encode_size()
@@ -112,7 +197,7 @@ class CombatState:
         return CombatState.encode_size()
 
 
-@dataclass
+@dataclass(slots=True)
 class Player:
     current_hp: int = 0
     max_hp: int = 0
@@ -141,6 +226,11 @@ class Player:
     def encode(self) -> List[float]:
         return [self.current_hp or 0, self.max_hp or 0, self.energy or 0, self.block or 0, float(self.powers_count or 0)]
 
+    def encode_into(self, out: np.ndarray, offset: int, powers_offset: Optional[int] = None) -> None:
+        # powers_offset lets State store powers_count apart from the 4 leading player values
+        out[offset:offset + 4] = (self.current_hp or 0, self.max_hp or 0, self.energy or 0, self.block or 0)
+        out[offset + 4 if powers_offset is None else powers_offset] = float(self.powers_count or 0)
+
     @staticmethod
     def encode_size() -> int:
         return 5
@@ -150,7 +240,7 @@ class Player:
         return Player.encode_size()
 
 
-@dataclass
+@dataclass(slots=True)
 class ShopCard:
     price: int = 0
     cost: int = 0
@@ -158,7 +248,7 @@ class ShopCard:
     upgrades: int = 0
     has_target: bool = False
     exhausts: bool = False
-    id: Optional[str] = None
+    id: Optional[int] = None  # interned in ID_TABLE
     uuid: Optional[str] = None
     rarity: Optional[str] = None
     ethereal: bool = False
@@ -173,7 +263,7 @@ class ShopCard:
             upgrades=data.get("upgrades", 0),
             has_target=data.get("has_target", False),
             exhausts=data.get("exhausts", False),
-            id=data.get("id") or data.get("name"),
+            id=ID_TABLE.intern(data.get("id") or data.get("name")),
             uuid=data.get("uuid") or data.get("uuid"),
             rarity=data.get("rarity"),
             ethereal=bool(data.get("ethereal", False)),
@@ -187,7 +277,7 @@ class ShopCard:
         self.upgrades = data.get("upgrades", 0) if "upgrades" in data else self.upgrades
         self.has_target = bool(data.get("has_target", False)) if "has_target" in data else self.has_target
         self.exhausts = bool(data.get("exhausts", False)) if "exhausts" in data else self.exhausts
-        self.id = data.get("id") or data.get("name") if ("id" in data or "name" in data) else self.id
+        self.id = ID_TABLE.intern(data.get("id") or data.get("name")) if ("id" in data or "name" in data) else self.id
         self.uuid = data.get("uuid") if "uuid" in data else self.uuid
         self.rarity = data.get("rarity") if "rarity" in data else self.rarity
         self.ethereal = bool(data.get("ethereal", False)) if "ethereal" in data else self.ethereal
@@ -209,6 +299,22 @@ class ShopCard:
             1.0 if self.uuid else 0.0,
         ]
 
+    def encode_into(self, out: np.ndarray, offset: int) -> None:
+        rarity_idx = RARITY_MAP.get(self.rarity, 0) if self.rarity is not None else 0
+        out[offset:offset + 11] = (
+            self.price or 0,
+            self.cost or 0,
+            CARD_TYPE_MAP.get(self.type, 1),
+            float(self.upgrades or 0),
+            1.0 if self.has_target else 0.0,
+            1.0 if self.exhausts else 0.0,
+            float(rarity_idx),
+            1.0 if self.ethereal else 0.0,
+            1.0 if self.is_playable else 0.0,
+            1.0 if self.id else 0.0,
+            1.0 if self.uuid else 0.0,
+        )
+
     @staticmethod
     def encode_size() -> int:
         return 11
@@ -218,14 +324,14 @@ class ShopCard:
         return ShopCard.encode_size()
 
 
-@dataclass
+@dataclass(slots=True)
 class Potion:
     price: int = 0
-    id: Optional[str] = None
+    id: Optional[int] = None  # interned in ID_TABLE
 
     @staticmethod
     def from_json(data: Dict[str, Any]) -> "Potion":
-        return Potion(price=data.get("price", 0), id=data.get("id") or data.get("name"))
+        return Potion(price=data.get("price", 0), id=ID_TABLE.intern(data.get("id") or data.get("name")))
 
     def update_from_json(self, data: Dict[str, Any]) -> None:
         self.price = data.get("price", 0)
@@ -233,6 +339,9 @@ class Potion:
     def encode(self) -> List[float]:
         return [self.price or 0, 1.0 if self.id else 0.0]
 
+    def encode_into(self, out: np.ndarray, offset: int) -> None:
+        out[offset:offset + 2] = (self.price or 0, 1.0 if self.id else 0.0)
+
     @staticmethod
     def encode_size() -> int:
         return 2
@@ -242,22 +351,25 @@ class Potion:
         return Potion.encode_size()
 
 
-@dataclass
+@dataclass(slots=True)
 class Relic:
     price: int = 0
-    id: Optional[str] = None
+    id: Optional[int] = None  # interned in ID_TABLE
 
     @staticmethod
     def from_json(data: Dict[str, Any]) -> "Relic":
-        return Relic(price=data.get("price", 0), id=data.get("id") or data.get("name"))
+        return Relic(price=data.get("price", 0), id=ID_TABLE.intern(data.get("id") or data.get("name")))
 
     def update_from_json(self, data: Dict[str, Any]) -> None:
         self.price = data.get("price", 0) if "price" in data else self.price
-        self.id = data.get("id") or data.get("name") if ("id" in data or "name" in data) else self.id
+        self.id = ID_TABLE.intern(data.get("id") or data.get("name")) if ("id" in data or "name" in data) else self.id
 
     def encode(self) -> List[float]:
         return [self.price or 0, 1.0 if self.id else 0.0]
 
+    def encode_into(self, out: np.ndarray, offset: int) -> None:
+        out[offset:offset + 2] = (self.price or 0, 1.0 if self.id else 0.0)
+
     @staticmethod
     def encode_size() -> int:
         return 2
@@ -267,7 +379,7 @@ class Relic:
         return Relic.encode_size()
 
 
-@dataclass
+@dataclass(slots=True)
 class ScreenState:
     cards: List[ShopCard] = field(default_factory=list)
     potions: List[Potion] = field(default_factory=list)
@@ -365,6 +477,58 @@ class ScreenState:
         vec.append(float(len(self.options or [])))
         return vec
 
+    def encode_into(self, out: np.ndarray, offset: int, room_type: Optional[str] = None, raw_relics: Optional[List[Dict[str, Any]]] = None) -> None:
+        # Same layout as encode(); empty slots are expected to be zero already.
+        if room_type == "ShopRoom":
+            cards = self.cards
+            potions = self.potions
+            relics = self.relics
+        else:
+            cards = []
+            potions = []
+            relics = raw_relics or []
+
+        card_size = ShopCard.encode_size()
+        for i, card in enumerate(cards[:MAX_SHOP_CARDS]):
+            o = offset + i * card_size
+            if hasattr(card, "encode_into"):
+                card.encode_into(out, o)
+            else:
+                out[o:o + 6] = (
+                    card.get("price", 0),
+                    card.get("cost", 0),
+                    CARD_TYPE_MAP.get(card.get("type", "SKILL"), 1),
+                    float(card.get("upgrades", 0)),
+                    1.0 if card.get("has_target", False) else 0.0,
+                    1.0 if card.get("exhausts", False) else 0.0,
+                )
+        offset += MAX_SHOP_CARDS * card_size
+
+        potion_size = Potion.encode_size()
+        for i, potion in enumerate(potions[:MAX_SHOP_POTIONS]):
+            o = offset + i * potion_size
+            if hasattr(potion, "encode_into"):
+                potion.encode_into(out, o)
+            else:
+                out[o:o + 2] = (potion.get("price", 0), 1.0 if (potion.get("id") or potion.get("name")) else 0.0)
+        offset += MAX_SHOP_POTIONS * potion_size
+
+        relic_size = Relic.encode_size()
+        for i, r in enumerate(relics[:MAX_SHOP_RELICS]):
+            o = offset + i * relic_size
+            if hasattr(r, "encode_into"):
+                r.encode_into(out, o)
+            else:
+                out[o:o + 2] = (r.get("price", 0), 1.0 if (r.get("id") or r.get("name")) else 0.0)
+        offset += MAX_SHOP_RELICS * relic_size
+
+        out[offset:offset + 4] = (
+            1 if self.purge_available else 0,
+            self.purge_cost or 0,
+            1.0 if (self.event_id or self.event_name) else 0.0,
+            float(len(self.options or [])),
+        )
+
     @staticmethod
     def encode_size() -> int:
         # shop cards: ShopCard.encode_size() each, potions: Potion.encode_size(), relics: Relic.encode_size(), purge(2), event(2)
@@ -375,67 +539,239 @@ class ScreenState:
         return ScreenState.encode_size()
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class MapNode:
     symbol: Optional[str] = None
     x: Optional[int] = None
     y: Optional[int] = None
-    children: List[Dict[str, Any]] = field(default_factory=list)
-    parents: List[Dict[str, Any]] = field(default_factory=list)
-
-    @staticmethod
-    def from_json(data: Dict[str, Any]) -> "MapNode":
-        return MapNode(
-            symbol=data.get("symbol"),
-            x=data.get("x"),
-            y=data.get("y"),
-            children=data.get("children", []),
-            parents=data.get("parents", []),
-        )
+    # edges as indices into Map.coords (nodes first, then targets outside the node list, e.g. the boss)
+    children: Tuple[int, ...] = ()
+    parents: Tuple[int, ...] = ()
 
-    def to_dict(self) -> Dict[str, Any]:
+    def to_dict(self, coords: List[Tuple[Any, Any]]) -> Dict[str, Any]:
         return {
             "symbol": self.symbol,
             "x": self.x,
             "y": self.y,
-            "children": self.children,
-            "parents": self.parents,
+            "children": [{"x": coords[i][0], "y": coords[i][1]} for i in self.children],
+            "parents": [{"x": coords[i][0], "y": coords[i][1]} for i in self.parents],
         }
 
 
-@dataclass
+@dataclass(slots=True, eq=False)
 class Map:
-    nodes: List[MapNode] = field(default_factory=list)
+    # Compact map: one symbol per node, int16 coordinates and edges in CSR form
+    # (children of node i are child_idx[child_ptr[i]:child_ptr[i + 1]]).
+    # Edge indices point into coords; targets outside the node list (the boss)
+    # are kept in extra_coords. MapNode views are built on demand by `nodes`.
+    # Only the symbols are read by update_from_json: the arrays are built from
+    # the map JSON (kept by reference, not copied) the first time they are
+    # used, by the routing features or the node views, so states whose map is
+    # never walked do not pay for them.
+    symbols: Tuple[Optional[str], ...] = ()
+    raw_nodes: List[Dict[str, Any]] = field(default_factory=list, repr=False)
+    # (xy, child_ptr, child_idx, parent_ptr, parent_idx, extra_coords), None until first used
+    arrays: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray, Tuple[Tuple[Any, Any], ...]]] = field(
+        default=None, repr=False)
+    # encode() result, computed once: the map does not change after update_from_json
+    encoded: Optional[np.ndarray] = field(default=None, repr=False)
+    # (reach, most, fewest, symbol_masks) built by path_index(), None until first used
+    paths: Optional[Tuple[List[int], np.ndarray, np.ndarray, List[int]]] = field(default=None, repr=False)
 
     @staticmethod
     def from_json(data: List[Dict[str, Any]]) -> "Map":
-        nodes = [MapNode.from_json(n) for n in (data or [])][:MAX_MAP_NODES]
-        return Map(nodes=nodes)
+        m = Map()
+        m.update_from_json(data)
+        return m
 
     def update_from_json(self, data: List[Dict[str, Any]]) -> None:
         # full replace semantics: limit to MAX_MAP_NODES
-        self.nodes = [MapNode.from_json(n) for n in (data or [])][:MAX_MAP_NODES]
+        data = data or []
+        self.raw_nodes = data if len(data) <= MAX_MAP_NODES else data[:MAX_MAP_NODES]
+        self.symbols = tuple(n.get("symbol") for n in self.raw_nodes)
+        self.arrays = None
+        self.encoded = None
+        self.paths = None
+
+    def _build_arrays(self):
+        raw_nodes = self.raw_nodes
+        coord_index: Dict[Tuple[Any, Any], int] = {}
+        for n in raw_nodes:
+            coord_index.setdefault((n.get("x"), n.get("y")), len(coord_index))
+        n_nodes = len(coord_index)
+
+        def csr(key):
+            ptr = [0]
+            idx: List[int] = []
+            for n in raw_nodes:
+                for e in n.get(key, []) or []:
+                    xy = (e.get("x"), e.get("y"))
+                    i = coord_index.get(xy)
+                    if i is None:
+                        i = coord_index[xy] = len(coord_index)
+                    idx.append(i)
+                ptr.append(len(idx))
+            return np.array(ptr, dtype=np.int16), np.array(idx, dtype=np.int16)
+
+        xy = np.array([[-1 if v is None else v for v in (n.get("x"), n.get("y"))] for n in raw_nodes], dtype=np.int16).reshape(-1, 2)
+        child_ptr, child_idx = csr("children")
+        parent_ptr, parent_idx = csr("parents")
+        self.arrays = (xy, child_ptr, child_idx, parent_ptr, parent_idx, tuple(list(coord_index)[n_nodes:]))
+        return self.arrays
+
+    def _array(self, i):
+        return (self.arrays or self._build_arrays())[i]
+
+    @property
+    def xy(self) -> np.ndarray:
+        return self._array(0)
+
+    @property
+    def child_ptr(self) -> np.ndarray:
+        return self._array(1)
+
+    @property
+    def child_idx(self) -> np.ndarray:
+        return self._array(2)
+
+    @property
+    def parent_ptr(self) -> np.ndarray:
+        return self._array(3)
+
+    @property
+    def parent_idx(self) -> np.ndarray:
+        return self._array(4)
+
+    @property
+    def extra_coords(self) -> Tuple[Tuple[Any, Any], ...]:
+        return self._array(5)
+
+    @property
+    def coords(self) -> List[Tuple[Any, Any]]:
+        node_coords = [(None if x < 0 else int(x), None if y < 0 else int(y)) for x, y in self.xy]
+        return node_coords + list(self.extra_coords)
+
+    @property
+    def nodes(self) -> List[MapNode]:
+        coords = self.coords
+        child_ptr, child_idx = self.child_ptr.tolist(), self.child_idx.tolist()
+        parent_ptr, parent_idx = self.parent_ptr.tolist(), self.parent_idx.tolist()
+        return [
+            MapNode(
+                symbol=symbol,
+                x=coords[i][0],
+                y=coords[i][1],
+                children=tuple(child_idx[child_ptr[i]:child_ptr[i + 1]]),
+                parents=tuple(parent_idx[parent_ptr[i]:parent_ptr[i + 1]]),
+            )
+            for i, symbol in enumerate(self.symbols)
+        ]
+
+    def path_index(self) -> Tuple[List[int], np.ndarray, np.ndarray, List[int]]:
+        # Built once per map, then cached until update_from_json. For every node:
+        # - reach[i]: bitmask of the nodes reachable from i (i included)
+        # - most[i] / fewest[i]: per MAP_SYMBOLS symbol, the most / fewest nodes of
+        #   that symbol on a path from i to the last row
+        # plus symbol_masks[s], the bitmask of the nodes with symbol s.
+        if self.paths is not None:
+            return self.paths
+        n = len(self.symbols)
+        n_symbols = len(MAP_SYMBOLS)
+        reach = [0] * n
+        most = np.zeros((n, n_symbols), dtype=np.int16)
+        fewest = np.zeros((n, n_symbols), dtype=np.int16)
+        symbol_masks = [0] * n_symbols
+        child_ptr, child_idx = self.child_ptr.tolist(), self.child_idx.tolist()
+        # children are always on a higher row: visit the rows from the top down
+        for i in np.argsort(-self.xy[:, 1], kind="stable").tolist():
+            own = np.zeros(n_symbols, dtype=np.int16)
+            s = MAP_SYMBOL_INDEX.get(self.symbols[i] or "")
+            if s is not None:
+                own[s] = 1
+                symbol_masks[s] |= 1 << i
+            # edges to targets outside the node list (the boss) end the path
+            children = [c for c in child_idx[child_ptr[i]:child_ptr[i + 1]] if c < n]
+            mask = 1 << i
+            for c in children:
+                mask |= reach[c]
+            reach[i] = mask
+            if children:
+                most[i] = own + most[children].max(axis=0)
+                fewest[i] = own + fewest[children].min(axis=0)
+            else:
+                most[i] = own
+                fewest[i] = own
+        self.paths = (reach, most, fewest, symbol_masks)
+        return self.paths
+
+    def path_features(self, current: Optional[Tuple[int, int]] = None, row: Optional[int] = None,
+                      next_nodes: Optional[List[Tuple[int, int]]] = None) -> np.ndarray:
+        # MAP_PATH_FEATURES values for the next choices after the current node.
+        # `current` is the (x, y) of the current node when the game reports it
+        # (map screen); otherwise `row` (derived from the floor) stands for every
+        # node of that row. When neither is on the map (start of an act, the game
+        # reports a node at y=-1), the choices are the `next_nodes` the game
+        # offers, or the first row without them.
+        out = np.zeros(MAP_PATH_FEATURES, dtype=np.float32)
+        if not self.symbols:
+            return out
+        reach, most, fewest, symbol_masks = self.path_index()
+        n = len(self.symbols)
+        xs, ys = self.xy[:, 0], self.xy[:, 1]
+        starts: List[int] = []
+        if current is not None:
+            starts = np.flatnonzero((xs == current[0]) & (ys == current[1])).tolist()
+            out[0] = 1.0 if starts else 0.0
+        elif row is not None:
+            starts = np.flatnonzero(ys == row).tolist()
+        if starts:
+            child_ptr, child_idx = self.child_ptr, self.child_idx
+            choices = sorted({c for i in starts for c in child_idx[child_ptr[i]:child_ptr[i + 1]].tolist() if c < n})
+        elif next_nodes:
+            wanted = set(next_nodes)
+            choices = [i for i, xy in enumerate(zip(xs.tolist(), ys.tolist())) if xy in wanted]
+        elif current is not None or row is None:
+            choices = np.flatnonzero(ys == ys.min()).tolist()
+        else:
+            # past the last row of the map
+            choices = []
+        out[1] = float(len(choices))
+        if not choices:
+            return out
+        mask = 0
+        for c in choices:
+            mask |= reach[c]
+        n_symbols = len(MAP_SYMBOLS)
+        out[2:2 + n_symbols] = [bin(mask & m).count("1") for m in symbol_masks]
+        out[2 + n_symbols:2 + 2 * n_symbols] = most[choices].max(axis=0)
+        out[2 + 2 * n_symbols:] = fewest[choices].min(axis=0)
+        return out
 
     def to_list(self) -> List[Dict[str, Any]]:
-        return [n.to_dict() for n in self.nodes]
+        coords = self.coords
+        return [n.to_dict(coords) for n in self.nodes]
 
     def encode(self) -> List[float]:
         # encoding: number of nodes, cap flag, and histogram of known symbols
         counts = [0] * len(MAP_SYMBOLS)
-        for n in self.nodes:
-            s = (n.symbol or "")
-            idx = MAP_SYMBOL_INDEX.get(s)
+        for symbol in self.symbols:
+            idx = MAP_SYMBOL_INDEX.get(symbol or "")
             if idx is not None:
                 counts[idx] += 1
-        cap_flag = 1.0 if len(self.nodes) >= MAX_MAP_NODES else 0.0
-        return [float(len(self.nodes)), cap_flag] + [float(c) for c in counts]
+        cap_flag = 1.0 if len(self.symbols) >= MAX_MAP_NODES else 0.0
+        return [float(len(self.symbols)), cap_flag] + [float(c) for c in counts]
+
+    def encode_into(self, out: np.ndarray, offset: int) -> None:
+        if self.encoded is None:
+            self.encoded = np.array(self.encode(), dtype=np.float32)
+        out[offset:offset + len(self.encoded)] = self.encoded
 
     @staticmethod
     def encode_size() -> int:
         return 2 + len(MAP_SYMBOLS)
 
 
-@dataclass
+@dataclass(slots=True)
 class GameState:
     floor: Optional[int] = None
     act: Optional[int] = None
@@ -447,10 +783,13 @@ class GameState:
     player: Player = field(default_factory=Player)
     combat_state: CombatState = field(default_factory=CombatState)
     screen_state: ScreenState = field(default_factory=ScreenState)
+    # JSON the sections were parsed from, compared against by incremental updates
+    raw: Dict[str, Any] = field(default_factory=dict, repr=False, compare=False)
 
     @staticmethod
     def from_json(data: Dict[str, Any]) -> "GameState":
         return GameState(
+            raw=data,
             floor=data.get("floor"),
             act=data.get("act"),
             room_phase=data.get("room_phase"),
@@ -490,6 +829,34 @@ class GameState:
 
         return player_vec_with_gold + map_vec + pile_vec + combat_vec + screen_vec
 
+    def encode_into(self, out: np.ndarray, offset: int, raw_gs: Dict[str, Any], tail_offset: Optional[int] = None) -> None:
+        # Writes the same values as encode(). When tail_offset is given, the first
+        # PLAYER_HEAD_SIZE values go to offset and the remainder starts at tail_offset
+        # (State keeps the player head next to the floor/act block).
+        if tail_offset is None:
+            tail_offset = offset + PLAYER_HEAD_SIZE
+        self.player.encode_into(out, offset, powers_offset=tail_offset)
+        o = tail_offset + Player.encode_size() - PLAYER_HEAD_SIZE
+        out[o] = self.gold or 0
+        o += 1
+
+        self.map.encode_into(out, o)
+        o += Map.encode_size()
+
+        cs = raw_gs.get("combat_state", {}) or {}
+        out[o:o + 3] = (
+            float(len(cs.get("draw_pile", []))),
+            float(len(cs.get("discard_pile", []))),
+            float(len(cs.get("exhaust_pile", []))),
+        )
+        o += 3
+
+        self.combat_state.encode_into(out, o)
+        o += CombatState.encode_size()
+
+        room_type = self.room_type or raw_gs.get("room_type")
+        self.screen_state.encode_into(out, o, room_type=room_type, raw_relics=raw_gs.get("relics", []))
+
     @staticmethod
     def encode_size() -> int:
         # player (3) + gold (1) + map summary + 3 pile counts + combat + screen
@@ -499,28 +866,41 @@ class GameState:
     def get_size() -> int:
         return GameState.encode_size()
 
-    def update_from_json(self, data: Dict[str, Any]) -> None:
-        # Replace all fields; defaults used when keys missing
+    def update_from_json(self, data: Dict[str, Any], incremental: bool = False) -> int:
+        # Replace all fields; defaults used when keys missing.
+        # With incremental=True, a section (map, player, combat_state, screen_state)
+        # whose JSON compares equal to the one it was built from keeps its parsed
+        # object. Returns the number of sections reused.
+        prev = self.raw if incremental else None
+        self.raw = data
         self.floor = data.get("floor")
         self.act = data.get("act")
         self.room_phase = data.get("room_phase")
         self.screen_name = data.get("screen_name")
         self.room_type = data.get("room_type")
         self.gold = data.get("gold", 0)
-        self.map = Map.from_json(data.get("map", []))
 
-        self.player = Player.from_json(data.get("player", {}))
-        self.combat_state = CombatState.from_json(data.get("combat_state", {}))
-        self.screen_state = ScreenState.from_json(data.get("screen_state", {}))
+        reused = 0
+        for name, cls, default in (("map", Map, []), ("player", Player, {}), ("combat_state", CombatState, {}), ("screen_state", ScreenState, {})):
+            section = data.get(name, default)
+            if prev is not None and section == prev.get(name, default):
+                reused += 1
+            else:
+                setattr(self, name, cls.from_json(section))
+        return reused
 
 
-@dataclass
+@dataclass(slots=True)
 class State:
     raw_json: Dict[str, Any] = field(default_factory=dict)
     game_state: GameState = field(default_factory=GameState)
     available_commands: List[str] = field(default_factory=list)
     in_game: bool = False
     ready_for_command: bool = True
+    # number of game state sections kept by incremental updates
+    sections_reused: int = 0
+    # (deck JSON, encoded deck block) of the last encode_state
+    deck_cache: Optional[Tuple[List[Any], np.ndarray]] = field(default=None, repr=False, compare=False)
 
     def __init__(self, json_data: Dict[str, Any]):
         # initialize attributes with defaults before updating
@@ -529,17 +909,25 @@ class State:
         self.available_commands = []
         self.in_game = False
         self.ready_for_command = True
+        self.sections_reused = 0
+        self.deck_cache = None
         self.update_from_json(json_data)
 
-    def update_from_json(self, json_data: Dict[str, Any]) -> None:
+    def update_from_json(self, json_data: Dict[str, Any], incremental: bool = False) -> None:
         # Replace entire state: if a field is not present in the incoming
         # JSON we reset it to its default value to avoid leaking stale data.
+        # incremental=True keeps the parsed sections (and cached encodings) whose
+        # JSON did not change since the previous update; the result is the same
+        # as a full rebuild.
         self.raw_json = json_data or {}
 
         # game_state: fully replace if present, otherwise reset to default
         if "game_state" in self.raw_json:
             gs = self.raw_json.get("game_state") or {}
-            self.game_state = GameState.from_json(gs)
+            if incremental:
+                self.sections_reused += self.game_state.update_from_json(gs, incremental=True)
+            else:
+                self.game_state = GameState.from_json(gs)
         else:
             self.game_state = GameState()
 
@@ -560,10 +948,23 @@ class State:
         else:
             self.ready_for_command = True
 
-    def _encode_card_features(self, card: Any) -> List[float]:
+    @staticmethod
+    def _encode_card_features(card: Any) -> Tuple[float, ...]:
+        # dict cards with a uuid go through CARD_FEATURE_CACHE
+        if isinstance(card, dict) and card.get("uuid"):
+            key = CardFeatureCache.key(card)
+            features = CARD_FEATURE_CACHE.get(key)
+            if features is None:
+                features = State._compute_card_features(card)
+                CARD_FEATURE_CACHE.put(key, features)
+            return features
+        return State._compute_card_features(card)
+
+    @staticmethod
+    def _compute_card_features(card: Any) -> Tuple[float, ...]:
         # produce exactly CARD_FEATURES floats for a card-like dict/object
         if card is None:
-            return [0.0] * CARD_FEATURES
+            return (0.0,) * CARD_FEATURES
         if isinstance(card, dict):
             cost = card.get("cost", 0) or 0
             damage = card.get("damage", 0) or card.get("base_damage", 0) or 0
@@ -592,171 +993,353 @@ class State:
             is_playable = 1.0 if getattr(card, "is_playable", False) else 0.0
             id_present = 1.0 if (getattr(card, "id", None) or getattr(card, "name", None)) else 0.0
             uuid_present = 1.0 if getattr(card, "uuid", None) else 0.0
-        return [
+        return (
             float(cost), float(damage), float(block), float(type_idx), float(misc), float(upgrades), float(has_target), float(exhausts), float(rarity_idx), float(ethereal), float(is_playable), float(id_present), float(uuid_present)
-        ]
+        )
 
     @staticmethod
     def encode_size() -> int:
-        # total full vector size: room one-hot (4) + game_state (player+gold + combat + screen)
-        # plus hand and deck fixed-size encodings
-        game_state_part = GameState.encode_size()
-        hand_part = MAX_HAND * CARD_FEATURES
-        deck_part = MAX_DECK * CARD_FEATURES
-        room_part = 4
-        # room_phase one-hot + floor + act
-        extra_top = len(ROOM_PHASES) + 2
-        # additional blocks we add at State level:
-        # ascension (1) + class one-hot + player potions + owned relics + player powers + top of piles
-        ascension_part = 1
-        player_potions_part = MAX_PLAYER_POTIONS * 4  # id_present, can_use, can_discard, requires_target
-        owned_relics_part = MAX_OWNED_RELICS * 2  # id_present, counter
-        player_powers_part = MAX_PLAYER_POWERS * 2  # id_present, amount
-        # per-pile summary features: rarities + types + avg_cost + avg_upgrades + id_count
-        per_pile_features = len(RARITY_MAP) + len(CARD_TYPE_MAP) + 3
-        top_piles_part = 3 * per_pile_features
-        extra_blocks = ascension_part + player_potions_part + owned_relics_part + player_powers_part + top_piles_part
-        return room_part + extra_top + game_state_part + extra_blocks + hand_part + deck_part
+        # total vector size, computed once by OBSERVATION_LAYOUT
+        return OBSERVATION_LAYOUT.size
 
     @staticmethod
     def get_size() -> int:
         return State.encode_size()
 
-    def encode_state(self) -> np.ndarray:
+    @staticmethod
+    def layout(map_paths: bool = False) -> "ObservationLayout":
+        # named segments of encode_state(map_paths=map_paths)
+        return OBSERVATION_LAYOUT_MAP_PATHS if map_paths else OBSERVATION_LAYOUT
+
+    @staticmethod
+    def _pile_card_stats(card: Any) -> Tuple[int, int, float, float, bool]:
+        # (rarity index or -1, type index, cost, upgrades, id present) for the pile summaries
+        if isinstance(card, dict):
+            r = card.get("rarity")
+            t = card.get("type", "SKILL")
+            cost = float(card.get("cost", 0) or 0)
+            upgrades = float(card.get("upgrades", 0) or 0)
+            has_id = bool(card.get("id") or card.get("name"))
+        else:
+            # object-like card
+            r = getattr(card, "rarity", None)
+            t = getattr(card, "type", "SKILL")
+            cost = float(getattr(card, "cost", 0) or 0)
+            upgrades = float(getattr(card, "upgrades", 0) or 0)
+            has_id = bool(getattr(card, "id", None) or getattr(card, "name", None))
+        rarity_idx = RARITY_MAP.get(r, -1) if r is not None else -1
+        return rarity_idx, CARD_TYPE_MAP.get(t, 1), cost, upgrades, has_id
+
+    def encode_state(self, out: Optional[np.ndarray] = None, map_paths: bool = False) -> np.ndarray:
+        # Writes every block straight into a float32 buffer at the offsets of
+        # State.layout(map_paths). Pass `out` to reuse a preallocated buffer between
+        # steps. map_paths=True appends the MAP_PATH_FEATURES routing block.
+        if out is None:
+            out = np.zeros(State.layout(map_paths).size, dtype=np.float32)
+        else:
+            out.fill(0.0)
         raw_gs = (self.raw_json.get("game_state") or {})
+        self._encode_scalars_into(out, raw_gs)
+        self._encode_cards_into(out, raw_gs)
+        if map_paths:
+            out[OBSERVATION_LAYOUT_MAP_PATHS["map_paths"].slice] = self._map_path_features(raw_gs)
+        return out
+
+    def _map_path_features(self, raw_gs: Dict[str, Any]) -> np.ndarray:
+        # current node from the map screen, else the map row of the current floor;
+        # before the first node of an act is chosen, the nodes offered by the game
+        screen = raw_gs.get("screen_state") or {}
+        current = screen.get("current_node") or {}
+        next_nodes = [(n["x"], n["y"]) for n in screen.get("next_nodes") or []
+                      if n.get("x") is not None and n.get("y") is not None]
+        if screen.get("first_node_chosen") is False:
+            return self.game_state.map.path_features(next_nodes=next_nodes)
+        if current.get("x") is not None and current.get("y") is not None:
+            return self.game_state.map.path_features(current=(current["x"], current["y"]), next_nodes=next_nodes)
+        floor, act = self.game_state.floor, self.game_state.act
+        row = None
+        if floor and act:
+            row = floor - 1 - FLOORS_PER_ACT * (act - 1)
+        return self.game_state.map.path_features(row=row if row is not None and row >= 0 else None)
+
+    def _encode_scalars_into(self, out: np.ndarray, raw_gs: Dict[str, Any]) -> None:
+        # every block except hand, deck and pile summaries
+        off = ENCODE_OFFSETS
 
         # room one-hot
         room_type = self.game_state.room_type or raw_gs.get("room_type", "UnknownRoom")
-        room_vector = [0] * 4
-        room_vector[ROOM_TYPE_MAP.get(room_type, 0)] = 1
+        out[off["room"] + ROOM_TYPE_MAP.get(room_type, 0)] = 1
 
         # room phase one-hot + floor/act
         phase = self.game_state.room_phase or raw_gs.get("room_phase", "UNKNOWN")
-        phase_vector = [0] * len(ROOM_PHASES)
-        phase_vector[ROOM_PHASE_MAP.get(phase, ROOM_PHASE_MAP["UNKNOWN"])] = 1
-        floor = float(self.game_state.floor if self.game_state.floor is not None else raw_gs.get("floor", 0) or 0)
-        act = float(self.game_state.act if self.game_state.act is not None else raw_gs.get("act", 0) or 0)
-
-        game_vec = self.game_state.encode(raw_gs)
-        # game_vec = [player_current_hp, player_max_hp, player_energy, gold, ...combat..., ...screen...]
-        player_part = game_vec[:4]
-        rest_part = game_vec[4:]
-
-        # hand
-        hand = raw_gs.get("hand", [])
-        hand_vector: List[float] = []
-        for i in range(MAX_HAND):
-            if i < len(hand):
-                hand_vector.extend(self._encode_card_features(hand[i]))
-            else:
-                hand_vector.extend([0] * CARD_FEATURES)
-
-        # deck
-        deck = raw_gs.get("deck", [])
-        deck_vector: List[float] = []
-        for i in range(MAX_DECK):
-            if i < len(deck):
-                deck_vector.extend(self._encode_card_features(deck[i]))
-            else:
-                deck_vector.extend([0] * CARD_FEATURES)
+        out[off["phase"] + ROOM_PHASE_MAP.get(phase, ROOM_PHASE_MAP["UNKNOWN"])] = 1
+        o = off["floor_act"]
+        out[o] = float(self.game_state.floor if self.game_state.floor is not None else raw_gs.get("floor", 0) or 0)
+        out[o + 1] = float(self.game_state.act if self.game_state.act is not None else raw_gs.get("act", 0) or 0)
+
+        # game state: player head next to floor/act, the rest at the end of the vector
+        self.game_state.encode_into(out, off["player_head"], raw_gs, tail_offset=off["game_tail"])
 
-        # --- additional blocks: ascension + class + player potions + owned relics + player powers + top of piles
         # ascension
-        ascension = float(raw_gs.get("ascension_level", 0) or 0)
+        out[off["ascension"]] = float(raw_gs.get("ascension_level", 0) or 0)
 
         # player potions (detailed)
-        player_potions_vec: List[float] = []
-        potions_owned = raw_gs.get("potions", []) or []
-        for i in range(MAX_PLAYER_POTIONS):
-            if i < len(potions_owned):
-                p = potions_owned[i]
-                player_potions_vec.extend([
-                    1.0 if (p.get("id") or p.get("name")) else 0.0,
-                    1.0 if p.get("can_use", False) else 0.0,
-                    1.0 if p.get("can_discard", False) else 0.0,
-                    1.0 if p.get("requires_target", False) else 0.0,
-                ])
-            else:
-                player_potions_vec.extend([0.0, 0.0, 0.0, 0.0])
+        o = off["player_potions"]
+        for p in (raw_gs.get("potions", []) or [])[:MAX_PLAYER_POTIONS]:
+            out[o:o + 4] = (
+                1.0 if (p.get("id") or p.get("name")) else 0.0,
+                1.0 if p.get("can_use", False) else 0.0,
+                1.0 if p.get("can_discard", False) else 0.0,
+                1.0 if p.get("requires_target", False) else 0.0,
+            )
+            o += 4
 
         # owned relics (id presence + counter)
-        relics_owned_vec: List[float] = []
-        relics_owned = raw_gs.get("relics", []) or []
-        for i in range(MAX_OWNED_RELICS):
-            if i < len(relics_owned):
-                r = relics_owned[i]
-                relics_owned_vec.extend([
-                    1.0 if (r.get("id") or r.get("name")) else 0.0,
-                    float(r.get("counter", 0) or 0),
-                ])
-            else:
-                relics_owned_vec.extend([0.0, 0.0])
+        o = off["owned_relics"]
+        for r in (raw_gs.get("relics", []) or [])[:MAX_OWNED_RELICS]:
+            out[o:o + 2] = (1.0 if (r.get("id") or r.get("name")) else 0.0, float(r.get("counter", 0) or 0))
+            o += 2
 
         # player powers (presence + amount)
-        player_powers_vec: List[float] = []
+        o = off["player_powers"]
         player_obj = raw_gs.get("player", {}) or {}
-        pows = player_obj.get("powers", []) or []
-        for i in range(MAX_PLAYER_POWERS):
-            if i < len(pows):
-                pw = pows[i]
-                player_powers_vec.extend([
-                    1.0 if (pw.get("id") or pw.get("name")) else 0.0,
-                    float(pw.get("amount", 0) or 0),
-                ])
-            else:
-                player_powers_vec.extend([0.0, 0.0])
+        for pw in (player_obj.get("powers", []) or [])[:MAX_PLAYER_POWERS]:
+            out[o:o + 2] = (1.0 if (pw.get("id") or pw.get("name")) else 0.0, float(pw.get("amount", 0) or 0))
+            o += 2
+
+    def _encode_cards_into(self, out: np.ndarray, raw_gs: Dict[str, Any]) -> None:
+        off = ENCODE_OFFSETS
+
+        # hand / deck
+        o = off["hand"]
+        for card in (raw_gs.get("hand", []) or [])[:MAX_HAND]:
+            out[o:o + CARD_FEATURES] = self._encode_card_features(card)
+            o += CARD_FEATURES
+        # the deck rarely changes between steps: reuse the previous block when equal
+        deck = (raw_gs.get("deck", []) or [])[:MAX_DECK]
+        o = off["deck"]
+        cache = self.deck_cache
+        if cache is not None and cache[0] == deck:
+            out[o:o + len(cache[1])] = cache[1]
+        else:
+            for card in deck:
+                out[o:o + CARD_FEATURES] = self._encode_card_features(card)
+                o += CARD_FEATURES
+            self.deck_cache = (deck, out[off["deck"]:o].copy())
 
         # per-pile summary (draw/discard/exhaust):
         # - counts per rarity (len(RARITY_MAP))
         # - counts per type (len(CARD_TYPE_MAP))
         # - avg_cost, avg_upgrades, id_present_count
-        top_piles_vec: List[float] = []
+        o = off["pile_summary"]
+        type_base = len(RARITY_MAP)
+        avg_base = type_base + len(CARD_TYPE_MAP)
         cs = raw_gs.get("combat_state", {}) or {}
-        for pile_name in ("draw_pile", "discard_pile", "exhaust_pile"):
+        for pile_name in PILE_NAMES:
             pile = cs.get(pile_name, []) or []
-            rarity_counts = [0] * len(RARITY_MAP)
-            type_counts = [0] * len(CARD_TYPE_MAP)
             total_cost = 0.0
             total_upgrades = 0.0
             id_count = 0
             for card in pile:
-                if isinstance(card, dict):
-                    r = card.get("rarity")
-                    if r is not None:
-                        idx = RARITY_MAP.get(r)
-                        if idx is not None:
-                            rarity_counts[idx] += 1
-                    t = card.get("type", "SKILL")
-                    type_counts[CARD_TYPE_MAP.get(t, 1)] += 1
-                    total_cost += float(card.get("cost", 0) or 0)
-                    total_upgrades += float(card.get("upgrades", 0) or 0)
-                    if (card.get("id") or card.get("name")):
-                        id_count += 1
-                else:
-                    # object-like card
-                    r = getattr(card, "rarity", None)
-                    if r is not None:
-                        idx = RARITY_MAP.get(r)
-                        if idx is not None:
-                            rarity_counts[idx] += 1
-                    t = getattr(card, "type", "SKILL")
-                    type_counts[CARD_TYPE_MAP.get(t, 1)] += 1
-                    total_cost += float(getattr(card, "cost", 0) or 0)
-                    total_upgrades += float(getattr(card, "upgrades", 0) or 0)
-                    if (getattr(card, "id", None) or getattr(card, "name", None)):
-                        id_count += 1
-            n = float(len(pile)) if len(pile) > 0 else 0.0
-            avg_cost = (total_cost / n) if n > 0.0 else 0.0
-            avg_upg = (total_upgrades / n) if n > 0.0 else 0.0
-            # append counts (as floats), then averages and id_count
-            top_piles_vec.extend([float(c) for c in rarity_counts])
-            top_piles_vec.extend([float(c) for c in type_counts])
-            top_piles_vec.append(avg_cost)
-            top_piles_vec.append(avg_upg)
-            top_piles_vec.append(float(id_count))
-
-        full = np.array(
-            room_vector + phase_vector + [floor, act] + player_part + [ascension] + player_potions_vec + relics_owned_vec + player_powers_vec + hand_vector + deck_vector + top_piles_vec + rest_part,
-            dtype=np.float32,
-        )
-        return full
+                rarity_idx, type_idx, cost, upgrades, has_id = State._pile_card_stats(card)
+                if rarity_idx >= 0:
+                    out[o + rarity_idx] += 1.0
+                out[o + type_base + type_idx] += 1.0
+                total_cost += cost
+                total_upgrades += upgrades
+                if has_id:
+                    id_count += 1
+            n = float(len(pile))
+            out[o + avg_base] = (total_cost / n) if n > 0.0 else 0.0
+            out[o + avg_base + 1] = (total_upgrades / n) if n > 0.0 else 0.0
+            out[o + avg_base + 2] = float(id_count)
+            o += PILE_SUMMARY_FEATURES
+
+
+# per-pile summary features: rarities + types + avg_cost + avg_upgrades + id_count
+PILE_SUMMARY_FEATURES = len(RARITY_MAP) + len(CARD_TYPE_MAP) + 3
+
+
+class Segment(NamedTuple):
+    name: str
+    offset: int
+    size: int
+
+    @property
+    def end(self) -> int:
+        return self.offset + self.size
+
+    @property
+    def slice(self) -> slice:
+        return slice(self.offset, self.offset + self.size)
+
+
+class ObservationLayout:
+    # Where every named segment of the State.encode_state vector sits, computed
+    # once from the encode_size() chain. `segments` are the leaves, in vector
+    # order and covering it without gaps; `blocks` are the coarser groups the
+    # encoders write (ENCODE_OFFSETS), "game_tail" being everything GameState
+    # writes after the player head. Both kinds of names work with [], slice()
+    # and view(), which also slices batches of observations (..., size).
+    __slots__ = ("map_paths", "segments", "blocks", "size")
+
+    # GameState.encode_into writes these after the player head, in this order
+    GAME_TAIL = ("player_powers_count", "gold", "map", "pile_counts", "monsters",
+                 "shop_cards", "shop_potions", "shop_relics", "purge", "event")
+
+    def __init__(self, map_paths: bool = False):
+        self.map_paths = map_paths
+        sizes = [
+            ("room", len(ROOM_TYPE_MAP)),
+            ("phase", len(ROOM_PHASES)),
+            ("floor_act", 2),
+            ("player_head", PLAYER_HEAD_SIZE),
+            ("ascension", 1),
+            ("player_potions", MAX_PLAYER_POTIONS * 4),
+            ("owned_relics", MAX_OWNED_RELICS * 2),
+            ("player_powers", MAX_PLAYER_POWERS * 2),
+            ("hand", MAX_HAND * CARD_FEATURES),
+            ("deck", MAX_DECK * CARD_FEATURES),
+            ("pile_summary", len(PILE_NAMES) * PILE_SUMMARY_FEATURES),
+            # game tail
+            ("player_powers_count", Player.encode_size() - PLAYER_HEAD_SIZE),
+            ("gold", 1),
+            ("map", Map.encode_size()),
+            ("pile_counts", len(PILE_NAMES)),
+            ("monsters", CombatState.encode_size()),
+            ("shop_cards", MAX_SHOP_CARDS * ShopCard.encode_size()),
+            ("shop_potions", MAX_SHOP_POTIONS * Potion.encode_size()),
+            ("shop_relics", MAX_SHOP_RELICS * Relic.encode_size()),
+            ("purge", 2),
+            ("event", 2),
+        ]
+        if map_paths:
+            sizes.append(("map_paths", MAP_PATH_FEATURES))
+        self.segments: Dict[str, Segment] = {}
+        pos = 0
+        for name, size in sizes:
+            self.segments[name] = Segment(name, pos, size)
+            pos += size
+        self.size = pos
+
+        self.blocks: Dict[str, Segment] = {}
+        for name, seg in self.segments.items():
+            if name not in self.GAME_TAIL:
+                self.blocks[name] = seg
+        tail = [self.segments[name] for name in self.GAME_TAIL]
+        self.blocks["game_tail"] = Segment("game_tail", tail[0].offset, tail[-1].end - tail[0].offset)
+        if PLAYER_HEAD_SIZE + self.blocks["game_tail"].size != GameState.encode_size():
+            raise ValueError(f"Game state segments cover {PLAYER_HEAD_SIZE + self.blocks['game_tail'].size} values, "
+                             f"GameState.encode_size() is {GameState.encode_size()}")
+
+    def __getitem__(self, name: str) -> Segment:
+        seg = self.segments.get(name) or self.blocks.get(name)
+        if seg is None:
+            raise KeyError(f"Unknown observation segment: {name}")
+        return seg
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.segments or name in self.blocks
+
+    def offset(self, name: str) -> int:
+        return self[name].offset
+
+    def slice(self, name: str) -> slice:
+        return self[name].slice
+
+    def view(self, obs: np.ndarray, name: str) -> np.ndarray:
+        # view (not a copy) of a segment of one observation or a batch of them
+        if obs.shape[-1] != self.size:
+            raise ValueError(f"Observation has {obs.shape[-1]} values, layout has {self.size}")
+        return obs[..., self[name].slice]
+
+    def split(self, obs: np.ndarray) -> Dict[str, np.ndarray]:
+        # every leaf segment of obs, by name (for debugging and inspection)
+        return {name: self.view(obs, name) for name in self.segments}
+
+
+OBSERVATION_LAYOUT = ObservationLayout()
+OBSERVATION_LAYOUT_MAP_PATHS = ObservationLayout(map_paths=True)
+# offsets of the blocks written by State.encode_state
+ENCODE_OFFSETS = {name: seg.offset for name, seg in OBSERVATION_LAYOUT.blocks.items()}
+
+
+def _scatter(flat_out: np.ndarray, starts: List[int], counts: List[int], width: int, values: Any) -> None:
+    # writes values (`width` per item: tuples or matrix rows) to consecutive slots:
+    # the counts[k] items of block k go to flat_out[starts[k]:starts[k] + counts[k] * width]
+    if not len(values):
+        return
+    lengths = np.asarray(counts, dtype=np.int64) * width
+    ends = np.cumsum(lengths)
+    flat_idx = np.arange(ends[-1]) + np.repeat(np.asarray(starts, dtype=np.int64) - (ends - lengths), lengths)
+    flat_out[flat_idx] = np.asarray(values, dtype=np.float64).reshape(-1)
+
+
+def encode_states(raw_states: Sequence[Dict[str, Any]], out: Optional[np.ndarray] = None) -> np.ndarray:
+    # Batch version of State(raw).encode_state() for replay/offline processing.
+    # Returns an (N, State.get_size()) float32 matrix whose rows are identical to the
+    # single-state encoder. Per-state scalar and slot blocks are written row by row
+    # by State._encode_scalars_into; the values of every hand, deck and pile card
+    # come from the same State helpers and are written for the whole batch at once
+    # (one flat scatter for hand/deck, bincount reductions for the pile summaries).
+    n = len(raw_states)
+    size = State.encode_size()
+    if out is None:
+        out = np.zeros((n, size), dtype=np.float32)
+    else:
+        if out.shape != (n, size) or not out.flags.c_contiguous:
+            raise ValueError(f"Output buffer must be C-contiguous with shape {(n, size)}, got {out.shape}")
+        out.fill(0.0)
+    if n == 0:
+        return out
+    flat_out = out.reshape(-1)
+
+    # hand/deck cards with the flat start of every non-empty block, and pile
+    # cards with their (state, pile) group
+    cards: List[Any] = []
+    card_starts: List[int] = []
+    card_counts: List[int] = []
+    pile_cards: List[Any] = []
+    pile_groups: List[int] = []
+    blocks = ((ENCODE_OFFSETS["hand"], "hand", MAX_HAND), (ENCODE_OFFSETS["deck"], "deck", MAX_DECK))
+    for i, raw in enumerate(raw_states):
+        state = State(raw)
+        raw_gs = state.raw_json.get("game_state") or {}
+        state._encode_scalars_into(out[i], raw_gs)
+        for base, block, limit in blocks:
+            block_cards = (raw_gs.get(block, []) or [])[:limit]
+            if block_cards:
+                cards.extend(block_cards)
+                card_starts.append(i * size + base)
+                card_counts.append(len(block_cards))
+        cs = raw_gs.get("combat_state", {}) or {}
+        for p, pile_name in enumerate(PILE_NAMES):
+            pile = cs.get(pile_name, []) or []
+            pile_cards.extend(pile)
+            pile_groups.extend([i * len(PILE_NAMES) + p] * len(pile))
+
+    _scatter(flat_out, card_starts, card_counts, CARD_FEATURES, [State._encode_card_features(c) for c in cards])
+
+    # pile summaries: the _pile_card_stats of every pile card grouped by (state, pile)
+    # and reduced with bincount
+    n_groups = n * len(PILE_NAMES)
+    summary = np.zeros((n_groups, PILE_SUMMARY_FEATURES), dtype=np.float64)
+    if pile_cards:
+        g = np.asarray(pile_groups, dtype=np.int64)
+        stats = np.array([State._pile_card_stats(c) for c in pile_cards], dtype=np.float64)
+        rarity_idx = stats[:, 0].astype(np.int64)
+        type_idx = stats[:, 1].astype(np.int64)
+        n_rarity = len(RARITY_MAP)
+        n_type = len(CARD_TYPE_MAP)
+        known = rarity_idx >= 0
+        summary[:, :n_rarity] = np.bincount(g[known] * n_rarity + rarity_idx[known], minlength=n_groups * n_rarity).reshape(n_groups, n_rarity)
+        summary[:, n_rarity:n_rarity + n_type] = np.bincount(g * n_type + type_idx, minlength=n_groups * n_type).reshape(n_groups, n_type)
+        counts = np.bincount(g, minlength=n_groups).astype(np.float64)
+        has_cards = counts > 0
+        for col, values in ((n_rarity + n_type, stats[:, 2]), (n_rarity + n_type + 1, stats[:, 3])):
+            totals = np.bincount(g, weights=values, minlength=n_groups)
+            np.divide(totals, counts, out=summary[:, col], where=has_cards)
+        summary[:, -1] = np.bincount(g, weights=stats[:, 4], minlength=n_groups)
+    o = ENCODE_OFFSETS["pile_summary"]
+    out[:, o:o + len(PILE_NAMES) * PILE_SUMMARY_FEATURES] = summary.reshape(n, -1)
+    return out
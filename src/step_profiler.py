@@ -0,0 +1,146 @@
+import time
+import logging
+from typing import Dict, Iterable, List
+
+# Histogram bucket b holds durations in [2^(b-1), 2^b) microseconds, the last
+# one everything above (~17 s)
+N_BUCKETS = 26
+# phases of a GameEnv step, in order; "decode" is the JSON decoding done
+# inside "fetch" and "wait", "mask" is timed when the policy asks for it
+PHASES = ("fetch", "select", "send", "wait", "decode", "state", "encode", "reward", "mask")
+
+
+class Histogram:
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self):
+        self.counts = [0] * N_BUCKETS
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds: float) -> None:
+        self.counts[min(int(seconds * 1e6).bit_length(), N_BUCKETS - 1)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def merge(self, other: "Histogram") -> None:
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def percentile(self, q: float) -> float:
+        # upper edge of the bucket holding the q-th sample, capped by the max
+        if self.count == 0:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for b, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                return min((1 << b) * 1e-6, self.max)
+        return self.max
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "mean_ms": self.total / self.count * 1e3 if self.count else 0.0,
+            "p50_ms": self.percentile(0.5) * 1e3,
+            "p95_ms": self.percentile(0.95) * 1e3,
+            "max_ms": self.max * 1e3,
+        }
+
+
+class StepProfiler:
+    # Per-phase timing of GameEnv steps. Disabled (the default), clock() and
+    # add() return at once and nothing is recorded. Enabled, every phase
+    # duration goes into a fixed-size Histogram, so the cost per step stays
+    # constant. With log_every=N a summary is logged every N steps.
+    def __init__(self, enabled: bool = False, log_every: int = 0):
+        self.enabled = enabled
+        self.log_every = log_every
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.reset()
+
+    def reset(self) -> None:
+        self.phases: Dict[str, Histogram] = {}
+        self.steps = 0
+        self.polls = 0
+        self.forced_sends = 0
+
+    def clock(self) -> float:
+        return time.perf_counter() if self.enabled else 0.0
+
+    def add(self, phase: str, start: float) -> float:
+        # records the time since `start` (a clock() value), returns now for the next phase
+        if not self.enabled:
+            return 0.0
+        now = time.perf_counter()
+        self.add_duration(phase, now - start)
+        return now
+
+    def add_duration(self, phase: str, seconds: float) -> None:
+        if not self.enabled:
+            return
+        hist = self.phases.get(phase)
+        if hist is None:
+            hist = self.phases[phase] = Histogram()
+        hist.add(seconds)
+
+    def end_step(self, polls: int, forced: bool) -> None:
+        # polls: /state requests of the readiness loop; forced: the loop gave up
+        # and can_send_new_action let a not-ready state through
+        if not self.enabled:
+            return
+        self.steps += 1
+        self.polls += polls
+        self.forced_sends += 1 if forced else 0
+        if self.log_every and self.steps % self.log_every == 0:
+            self.log_summary()
+
+    def take(self) -> "StepProfiler":
+        # snapshot of the data recorded so far, then starts over
+        snapshot = StepProfiler(self.enabled)
+        snapshot.phases, snapshot.steps, snapshot.polls, snapshot.forced_sends = self.phases, self.steps, self.polls, self.forced_sends
+        self.reset()
+        return snapshot
+
+    @staticmethod
+    def merged(profilers: Iterable["StepProfiler"]) -> "StepProfiler":
+        total = StepProfiler(True)
+        for p in profilers:
+            for phase, hist in p.phases.items():
+                total.phases.setdefault(phase, Histogram()).merge(hist)
+            total.steps += p.steps
+            total.polls += p.polls
+            total.forced_sends += p.forced_sends
+        return total
+
+    def summary(self) -> Dict[str, float]:
+        # flat dict: steps, polls_per_step, forced_sends and "<phase>/<stat>" entries
+        out: Dict[str, float] = {
+            "steps": self.steps,
+            "polls_per_step": self.polls / self.steps if self.steps else 0.0,
+            "forced_sends": self.forced_sends,
+        }
+        for phase in self._ordered_phases():
+            for key, value in self.phases[phase].summary().items():
+                out[f"{phase}/{key}"] = value
+        return out
+
+    def _ordered_phases(self) -> List[str]:
+        return [p for p in PHASES if p in self.phases] + sorted(set(self.phases) - set(PHASES))
+
+    def log_summary(self) -> None:
+        self.logger.info(
+            f"{self.steps} steps, {self.polls / max(self.steps, 1):.2f} polls/step, {self.forced_sends} forced sends"
+        )
+        for phase in self._ordered_phases():
+            s = self.phases[phase].summary()
+            self.logger.info(
+                f"  {phase:<7} n={s['count']:<6} mean={s['mean_ms']:.3f}ms p50<={s['p50_ms']:.3f}ms "
+                f"p95<={s['p95_ms']:.3f}ms max={s['max_ms']:.3f}ms"
+            )
@@ -0,0 +1,161 @@
+import os
+import json
+import glob
+from typing import Dict, Iterator, Optional, Tuple
+
+import numpy as np
+
+INDEX_FILE = "index.json"
+FORMAT_VERSION = 1
+
+
+def _field_specs(obs_size: int, mask_size: int, action_shape: Tuple[int, ...]) -> Dict[str, Tuple[Tuple[int, ...], str]]:
+    # per-row shape and dtype of every recorded field
+    return {
+        "obs": ((obs_size,), "float32"),
+        "mask": ((mask_size,), "int8"),
+        "action": (tuple(action_shape), "int64"),
+        "reward": ((), "float32"),
+        "done": ((), "bool"),
+    }
+
+
+def _chunk_file(directory: str, chunk_id: int, name: str) -> str:
+    return os.path.join(directory, f"chunk_{chunk_id:06d}_{name}.npy")
+
+
+def _read_index(directory: str) -> Optional[dict]:
+    path = os.path.join(directory, INDEX_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+class TrajectoryWriter:
+    # Append-only store of (obs, action mask, action, reward, done) rows.
+    # Rows are buffered in preallocated arrays and written every `chunk_size`
+    # rows as one .npy file per field; index.json lists the complete chunks and
+    # is replaced atomically after they are written, so a crash never leaves a
+    # readable but truncated chunk. Opening an existing store appends to it.
+    def __init__(self, directory: str, obs_size: int, mask_size: int, action_shape: Tuple[int, ...] = (),
+                 chunk_size: int = 4096):
+        self.directory = directory
+        self.chunk_size = chunk_size
+        self.specs = _field_specs(obs_size, mask_size, action_shape)
+        os.makedirs(directory, exist_ok=True)
+        index = _read_index(directory)
+        if index is None:
+            index = {
+                "version": FORMAT_VERSION,
+                "obs_size": obs_size,
+                "mask_size": mask_size,
+                "action_shape": list(action_shape),
+                "chunks": [],
+            }
+        elif (index["obs_size"], index["mask_size"], tuple(index["action_shape"])) != (obs_size, mask_size, tuple(action_shape)):
+            raise ValueError(f"Trajectory store {directory} was recorded with other observation/action sizes")
+        self.index = index
+        self.buffers = {name: np.zeros((chunk_size,) + shape, dtype=dtype) for name, (shape, dtype) in self.specs.items()}
+        self.rows = 0
+
+    def append(self, obs, mask, action, reward, done) -> None:
+        # values are copied into the buffers: callers may pass reused arrays
+        # (GameEnv's action mask is overwritten on every step)
+        i = self.rows
+        b = self.buffers
+        b["obs"][i] = obs
+        b["mask"][i] = mask
+        b["action"][i] = action
+        b["reward"][i] = reward
+        b["done"][i] = done
+        self.rows += 1
+        if self.rows == self.chunk_size:
+            self.flush()
+
+    def flush(self) -> None:
+        if self.rows == 0:
+            return
+        chunk_id = len(self.index["chunks"])
+        for name, buf in self.buffers.items():
+            np.save(_chunk_file(self.directory, chunk_id, name), buf[:self.rows])
+        self.index["chunks"].append({"id": chunk_id, "rows": self.rows})
+        tmp = os.path.join(self.directory, INDEX_FILE + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.index, f)
+        os.replace(tmp, os.path.join(self.directory, INDEX_FILE))
+        self.rows = 0
+
+    def close(self) -> None:
+        self.flush()
+
+
+class TrajectoryReader:
+    # Streams a store written by TrajectoryWriter. Chunks are opened as
+    # read-only memory maps, so only the rows actually used are read from disk.
+    def __init__(self, directory: str):
+        self.directory = directory
+        index = _read_index(directory)
+        if index is None:
+            raise FileNotFoundError(f"No trajectory index in {directory}")
+        self.index = index
+        self.obs_size = index["obs_size"]
+        self.mask_size = index["mask_size"]
+        self.action_shape = tuple(index["action_shape"])
+
+    def __len__(self) -> int:
+        return sum(chunk["rows"] for chunk in self.index["chunks"])
+
+    @property
+    def n_chunks(self) -> int:
+        return len(self.index["chunks"])
+
+    def chunk(self, i: int) -> Dict[str, np.ndarray]:
+        chunk_id = self.index["chunks"][i]["id"]
+        return {
+            name: np.load(_chunk_file(self.directory, chunk_id, name), mmap_mode="r")
+            for name in _field_specs(self.obs_size, self.mask_size, self.action_shape)
+        }
+
+    def iter_chunks(self) -> Iterator[Dict[str, np.ndarray]]:
+        for i in range(self.n_chunks):
+            yield self.chunk(i)
+
+    def iter_batches(self, batch_size: int) -> Iterator[Dict[str, np.ndarray]]:
+        # in recording order; batches do not span chunks, so the last batch of
+        # each chunk may be smaller than batch_size
+        for chunk in self.iter_chunks():
+            rows = len(chunk["reward"])
+            for start in range(0, rows, batch_size):
+                yield {name: np.asarray(arr[start:start + batch_size]) for name, arr in chunk.items()}
+
+
+class RawStepWriter:
+    # JSON lines of {"state": raw /state response, "command": command sent},
+    # the input of the offline pretraining (pretrain.py). A new file is started
+    # every `steps_per_file` steps; reopening a directory continues after the
+    # existing files.
+    def __init__(self, directory: str, steps_per_file: int = 1000):
+        self.directory = directory
+        self.steps_per_file = steps_per_file
+        os.makedirs(directory, exist_ok=True)
+        self.file_id = len(glob.glob(os.path.join(directory, "steps_*.jsonl")))
+        self.file = None
+        self.count = 0
+
+    def append(self, raw_state: dict, command: str) -> None:
+        if self.file is None or self.count == self.steps_per_file:
+            self._next_file()
+        self.file.write(json.dumps({"state": raw_state, "command": command}) + "\n")
+        self.count += 1
+
+    def _next_file(self) -> None:
+        self.close()
+        self.file = open(os.path.join(self.directory, f"steps_{self.file_id:06d}.jsonl"), "w", encoding="utf-8")
+        self.file_id += 1
+        self.count = 0
+
+    def close(self) -> None:
+        if self.file is not None:
+            self.file.close()
+            self.file = None
@@ -0,0 +1,74 @@
+import json
+import sys
+import timeit
+from pathlib import Path
+
+import numpy as np
+
+# ensure src/ is importable
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+from action_manager import ActionManager
+from game_controller import GameController
+from game_env import GameEnv
+
+DATA_DIR = ROOT / "ressources" / "test_json"
+ACTIONS_PATH = ROOT / "ressources" / "actions" / "all_actions.json"
+N = 20000
+
+
+class OfflineController(GameController):
+    def wait_for_server(self):
+        pass
+
+
+def legacy_mask(actions, available_commands):
+    # previous implementation: walk every known action for each mask
+    mask = np.zeros(len(actions), dtype=np.int8)
+    available_set = set(available_commands)
+    for i, action in enumerate(actions):
+        if action in available_set:
+            mask[i] = 1
+    mask[125] = 0
+    return mask
+
+
+def legacy_update(actions, discovered, new_actions):
+    for action in new_actions:
+        if action not in actions:
+            pass
+        if action not in discovered:
+            discovered.append(action)
+
+
+def main():
+    commands = []
+    for p in sorted(DATA_DIR.glob("*.json")):
+        with open(p, "r", encoding="utf-8") as fh:
+            commands.append(json.load(fh).get("available_commands", []))
+
+    action_manager = ActionManager(filepath=str(ACTIONS_PATH))
+    env = GameEnv(action_manager, OfflineController())
+    actions = list(action_manager.actions)
+    discovered = list(action_manager.discovered_actions)
+
+    def run_legacy():
+        for cmds in commands:
+            legacy_update(actions, discovered, cmds)
+            legacy_mask(actions, cmds)
+
+    def run_indexed():
+        for cmds in commands:
+            action_manager.update_actions(cmds)
+            env.get_action_mask_from_commands(cmds)
+
+    n = N // len(commands)
+    for name, fn in (("legacy list scans", run_legacy), ("indexed scatter", run_indexed)):
+        best = min(timeit.repeat(fn, number=n, repeat=5))
+        print(f"{name:<18} {best / (n * len(commands)) * 1e6:7.2f} us per step (mask + update_actions)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
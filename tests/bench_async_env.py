@@ -0,0 +1,66 @@
+import sys
+import time
+from contextlib import ExitStack
+from pathlib import Path
+
+import numpy as np
+
+# ensure src/ is importable
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+sys.path.insert(0, str(ROOT / "tests"))
+
+from action_manager import ActionManager
+from async_game_controller import AsyncGameController
+from async_vec_env import AsyncGameEnv, AsyncVecGameEnv
+from game_controller import GameController
+from game_env import GameEnv
+from stub_server import StubServer
+
+ACTIONS_PATH = ROOT / "ressources" / "actions" / "all_actions.json"
+INSTANCE_COUNTS = (1, 2, 4, 8)
+STEPS = 40
+# per-request latency of the stub servers, in seconds
+LATENCY = 0.01
+
+
+def bench_sync(urls, action_manager):
+    # baseline: one synchronous GameEnv per server, stepped one after the other
+    envs = [GameEnv(action_manager, GameController(url)) for url in urls]
+    for env in envs:
+        env.reset()
+    t0 = time.perf_counter()
+    for _ in range(STEPS):
+        for env in envs:
+            env.step(0)
+    return STEPS * len(envs) / (time.perf_counter() - t0)
+
+
+def bench_async(urls, action_manager):
+    vec_env = AsyncVecGameEnv([AsyncGameEnv(action_manager, AsyncGameController(url)) for url in urls])
+    vec_env.reset()
+    actions = np.zeros(len(urls), dtype=np.int64)
+    t0 = time.perf_counter()
+    for _ in range(STEPS):
+        vec_env.step(actions)
+    elapsed = time.perf_counter() - t0
+    vec_env.close()
+    return STEPS * len(urls) / elapsed
+
+
+def main():
+    action_manager = ActionManager(filepath=str(ACTIONS_PATH))
+    print(f"stub latency {LATENCY * 1000:.0f} ms/request, {STEPS} steps per instance")
+    print(f"{'instances':>9} {'sync steps/s':>13} {'async steps/s':>14}")
+    for count in INSTANCE_COUNTS:
+        with ExitStack() as stack:
+            servers = [stack.enter_context(StubServer(latency=LATENCY)) for _ in range(count)]
+            urls = [s.base_url for s in servers]
+            sync_rate = bench_sync(urls, action_manager)
+            async_rate = bench_async(urls, action_manager)
+        print(f"{count:>9} {sync_rate:>13.1f} {async_rate:>14.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,211 @@
+import argparse
+import copy
+import json
+import platform
+import sys
+import timeit
+from pathlib import Path
+
+import numpy as np
+
+# ensure src/ is importable
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+from action_manager import ActionManager
+from game_controller import GameController
+from game_env import GameEnv
+from state import (State, GameState, encode_states, CARD_FEATURE_CACHE, MAX_HAND, MAX_DECK, MAX_MONSTERS, MAX_SHOP_CARDS, MAX_SHOP_POTIONS,
+                   MAX_SHOP_RELICS, MAX_OWNED_RELICS, MAX_PLAYER_POWERS, MAX_PLAYER_POTIONS)
+
+DATA_DIR = ROOT / "ressources" / "test_json"
+ACTIONS_PATH = ROOT / "ressources" / "actions" / "all_actions.json"
+BASELINES = ROOT / "tests" / "bench_baselines.json"
+# a path fails when it is slower than its baseline by more than this fraction
+DEFAULT_THRESHOLD = 0.5
+# the whole suite is run ROUNDS times and the best time of each path kept:
+# on a shared machine single measurements vary by +-30%
+ROUNDS = 3
+# a path over the threshold is measured again this many times before failing
+CONFIRM_ROUNDS = 5
+REPEAT = 9
+# target time of one measurement, in seconds
+TARGET = 0.1
+
+
+class OfflineController(GameController):
+    def wait_for_server(self):
+        pass
+
+
+def load_fixtures():
+    states = {}
+    for p in sorted(DATA_DIR.glob("*.json")):
+        with open(p, "r", encoding="utf-8") as fh:
+            states[p.stem] = json.load(fh)
+    return states
+
+
+def worst_case_state(fixtures):
+    # every encoded block at its limit: full hand, 50-card deck, big piles,
+    # 6 monsters, full shop, all relic/potion/power slots
+    state = copy.deepcopy(fixtures["fight"])
+    gs = state["game_state"]
+    cs = gs["combat_state"]
+    shop = fixtures["shop"]["game_state"]["screen_state"]
+    cards = gs["deck"]
+
+    def card(i):
+        c = dict(cards[i % len(cards)])
+        c["uuid"] = f"{c['uuid'][:-6]}{i:06d}"
+        c["upgrades"] = i % 2
+        return c
+
+    gs["deck"] = [card(i) for i in range(MAX_DECK)]
+    gs["hand"] = cs["hand"] = [card(100 + i) for i in range(MAX_HAND)]
+    for k, pile in enumerate(("draw_pile", "discard_pile", "exhaust_pile")):
+        cs[pile] = [card(200 + 100 * k + i) for i in range(30)]
+    cs["monsters"] = [dict(cs["monsters"][i % len(cs["monsters"])]) for i in range(MAX_MONSTERS)]
+    cs["player"]["powers"] = [{"amount": i, "name": f"Power {i}", "id": f"Power{i}"} for i in range(MAX_PLAYER_POWERS)]
+    gs["relics"] = [{"name": f"Relic {i}", "id": f"Relic{i}", "counter": i} for i in range(MAX_OWNED_RELICS)]
+    gs["potions"] = [{"requires_target": True, "can_use": True, "can_discard": True, "name": f"Potion {i}", "id": f"Potion{i}"}
+                     for i in range(MAX_PLAYER_POTIONS)]
+    gs["screen_state"] = {
+        **shop,
+        "cards": [dict(shop["cards"][i % len(shop["cards"])], uuid=f"shop-{i}") for i in range(MAX_SHOP_CARDS)],
+        "potions": [dict(shop["potions"][i % len(shop["potions"])]) for i in range(MAX_SHOP_POTIONS)],
+        "relics": [dict(shop["relics"][i % len(shop["relics"])]) for i in range(MAX_SHOP_RELICS)],
+    }
+    state["available_commands"] = ([f"play {i + 1}" for i in range(MAX_HAND)]
+                                   + [f"play {i + 1} {t}" for i in range(MAX_HAND) for t in range(MAX_MONSTERS)]
+                                   + [f"potion use {i}" for i in range(MAX_PLAYER_POTIONS)] + ["end"])
+    return state
+
+
+def tracked_paths(workloads):
+    # name -> callable running the path once over every workload
+    action_manager = ActionManager(filepath=str(ACTIONS_PATH))
+    env = GameEnv(action_manager, OfflineController())
+    raws = list(workloads.values())
+    states = [State(raw) for raw in raws]
+    commands = [raw.get("available_commands", []) for raw in raws]
+    # known commands only: unknown ones would be added (and logged) on the first call
+    commands = [[c for c in cmds if c in action_manager.action_index] for cmds in commands]
+    buf = np.zeros(State.get_size(), dtype=np.float32)
+    batch_buf = np.zeros((len(raws), State.get_size()), dtype=np.float32)
+
+    def state_init():
+        for raw in raws:
+            State(raw)
+
+    def game_state_from_json():
+        for raw in raws:
+            GameState.from_json(raw.get("game_state") or {})
+
+    def encode_state():
+        # steady state of a run: deck block and card features come from the caches
+        for state in states:
+            state.encode_state(out=buf)
+
+    def encode_state_cold():
+        # every card encoded again, as after a deck change or on new cards
+        for state in states:
+            CARD_FEATURE_CACHE.clear()
+            state.deck_cache = None
+            state.game_state.map.encoded = None
+            state.encode_state(out=buf)
+
+    def batch_encode():
+        # offline path: the raw states encoded together, no State built
+        encode_states(raws, out=batch_buf)
+
+    def action_mask():
+        for cmds in commands:
+            env.get_action_mask_from_commands(cmds)
+
+    def update_actions():
+        for cmds in commands:
+            action_manager.update_actions(cmds)
+
+    return {
+        "State.__init__": state_init,
+        "GameState.from_json": game_state_from_json,
+        "State.encode_state": encode_state,
+        "State.encode_state (cold caches)": encode_state_cold,
+        "encode_states": batch_encode,
+        "GameEnv.get_action_mask_from_commands": action_mask,
+        "ActionManager.update_actions": update_actions,
+    }
+
+
+def measure(fn):
+    # best of REPEAT runs, in microseconds per call
+    fn()
+    number = max(1, int(TARGET / max(timeit.timeit(fn, number=1), 1e-7)))
+    return min(timeit.repeat(fn, number=number, repeat=REPEAT)) / number * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Hot path benchmarks with regression check")
+    parser.add_argument("--update", action="store_true", help=f"record the results as baselines in {BASELINES.name}")
+    parser.add_argument("--threshold", type=float, default=None, help="allowed slowdown, e.g. 0.5 for +50%%")
+    parser.add_argument("--rounds", type=int, default=ROUNDS)
+    args = parser.parse_args()
+
+    fixtures = load_fixtures()
+    suites = {"fixtures": fixtures, "worst_case": {"worst_case": worst_case_state(fixtures)}}
+    paths = {f"{suite}/{name}": fn for suite, workloads in suites.items() for name, fn in tracked_paths(workloads).items()}
+    results = {}
+    for _ in range(args.rounds):
+        for key, fn in paths.items():
+            us = measure(fn)
+            results[key] = min(us, results.get(key, us))
+
+    baselines = {}
+    if BASELINES.exists():
+        with open(BASELINES, "r", encoding="utf-8") as fh:
+            baselines = json.load(fh)
+    threshold = args.threshold if args.threshold is not None else baselines.get("threshold", DEFAULT_THRESHOLD)
+    recorded = baselines.get("paths", {})
+
+    # noise is one-sided (a busy machine only makes things slower), so a path
+    # only fails if it stays over the threshold when measured again
+    if not args.update:
+        for _ in range(CONFIRM_ROUNDS):
+            slow = [k for k, us in results.items() if recorded.get(k) and us > recorded[k] * (1 + threshold)]
+            if not slow:
+                break
+            for key in slow:
+                results[key] = min(results[key], measure(paths[key]))
+
+    failed = []
+    print(f"{'path':<56} {'us':>10} {'baseline':>10} {'ratio':>7}")
+    for key, us in results.items():
+        base = recorded.get(key)
+        ratio = us / base if base else float("nan")
+        flag = ""
+        if base and ratio > 1 + threshold:
+            failed.append(key)
+            flag = "  REGRESSION"
+        base_text = f"{base:.2f}" if base else "-"
+        print(f"{key:<56} {us:>10.2f} {base_text:>10} {ratio:>7.2f}{flag}")
+
+    if args.update:
+        with open(BASELINES, "w", encoding="utf-8") as fh:
+            json.dump({
+                "threshold": threshold,
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "paths": {k: round(v, 2) for k, v in results.items()},
+            }, fh, indent=2)
+            fh.write("\n")
+        print(f"baselines written to {BASELINES}")
+        return 0
+    if failed:
+        print(f"{len(failed)} path(s) slower than baseline by more than {threshold:.0%}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,57 @@
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import requests
+
+# ensure src/ is importable
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+sys.path.insert(0, str(ROOT / "tests"))
+
+from game_controller import GameController
+from stub_server import StubServer
+
+N = 500
+
+
+def measure(fn, n=N):
+    fn()  # warm-up (opens the pooled connection)
+    samples = []
+    for _ in range(n):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(samples), statistics.quantiles(samples, n=100)[98]
+
+
+def main():
+    with StubServer() as server:
+        base = server.base_url
+        gc = GameController(base)
+        endpoints = {
+            "GET /health": (
+                lambda: requests.get(f"{base}/health", timeout=1),
+                lambda: gc.session.get(f"{base}/health", timeout=gc.timeouts["health"]),
+            ),
+            "GET /state": (
+                lambda: requests.get(f"{base}/state").json(),
+                gc.get_state,
+            ),
+            "POST /command": (
+                lambda: requests.post(f"{base}/command", data="end", timeout=2).json(),
+                lambda: gc.session.post(f"{base}/command", data="end", timeout=gc.timeouts["command"]).json(),
+            ),
+        }
+        print(f"{'endpoint':<15} {'per-call p50':>13} {'p99':>8} {'session p50':>12} {'p99':>8}  speedup")
+        for name, (before, after) in endpoints.items():
+            b50, b99 = measure(before)
+            a50, a99 = measure(after)
+            print(f"{name:<15} {b50:>10.3f} ms {b99:>5.3f} ms {a50:>9.3f} ms {a99:>5.3f} ms  x{b50 / a50:.2f}")
+        gc.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,74 @@
+import sys
+import time
+import tempfile
+import threading
+from pathlib import Path
+
+import numpy as np
+import torch as th
+from gymnasium import spaces
+from sb3_contrib import MaskablePPO
+from sb3_contrib.common.maskable.policies import MaskableActorCriticPolicy
+
+# ensure src/ is importable
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+from action_manager import ActionManager
+from inference_server import PolicyServer
+from pretrain import SpacesEnv
+from state import State
+
+ACTIONS_PATH = ROOT / "ressources" / "actions" / "all_actions.json"
+# predictions per simulated game
+REQUESTS = 200
+GAME_COUNTS = (1, 4, 16)
+MAX_LATENCY = 0.002
+
+
+def games(predict, n_games, obs, masks):
+    # n_games threads asking for one action at a time, returns predictions per second
+    def game():
+        for i in range(REQUESTS):
+            predict(obs[i % len(obs)], masks[i % len(masks)])
+
+    threads = [threading.Thread(target=game) for _ in range(n_games)]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return n_games * REQUESTS / (time.perf_counter() - t0)
+
+
+def main():
+    n_actions = len(ActionManager(filepath=str(ACTIONS_PATH)).actions)
+    env = SpacesEnv(spaces.Box(low=0, high=1, shape=(State.get_size(),), dtype=np.float32), spaces.Discrete(n_actions))
+    model = MaskablePPO(MaskableActorCriticPolicy, env)
+    rng = np.random.default_rng(0)
+    obs = rng.random((32, State.get_size()), dtype=np.float32)
+    masks = rng.random((32, n_actions)) < 0.2
+    masks[:, 0] = True
+    lock = threading.Lock()
+
+    def direct(o, m):
+        # one forward pass per request, as each env does inside learn()
+        with lock, th.no_grad():
+            return model.policy.predict(o, action_masks=m)[0]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = str(Path(tmp) / "model")
+        model.save(path)
+        with PolicyServer(path, max_latency=MAX_LATENCY).start(http=False) as server:
+            print(f"{'games':>6} {'direct/s':>10} {'server/s':>10} {'mean batch':>11}")
+            for n in GAME_COUNTS:
+                rows, batches = server.rows, server.batches
+                direct_rate = games(direct, n, obs, masks)
+                server_rate = games(server.predict, n, obs, masks)
+                mean_batch = (server.rows - rows) / max(server.batches - batches, 1)
+                print(f"{n:>6} {direct_rate:>10.0f} {server_rate:>10.0f} {mean_batch:>11.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
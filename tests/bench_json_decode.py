@@ -0,0 +1,46 @@
+import sys
+import time
+from pathlib import Path
+
+# ensure src/ is importable
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+import json_decoder
+from json_decoder import JsonDecoder
+from state import State
+
+DATA_DIR = ROOT / "ressources" / "test_json"
+N = 200
+
+
+def decode_and_build(decoder, body):
+    # mean microseconds for decoder.loads + State construction
+    start = time.perf_counter()
+    for _ in range(N):
+        State(decoder.loads(body))
+    return (time.perf_counter() - start) / N * 1e6
+
+
+def main():
+    decoders = {"json": JsonDecoder("json"), "json+skip": JsonDecoder("json", skip_fields=True)}
+    if json_decoder.orjson is not None:
+        decoders["orjson"] = JsonDecoder("orjson")
+        decoders["orjson+skip"] = JsonDecoder("orjson", skip_fields=True)
+    else:
+        print("orjson not installed, stdlib only")
+
+    print(f"{'fixture':<20}" + "".join(f"{name:>14}" for name in decoders) + "   (us)")
+    totals = dict.fromkeys(decoders, 0.0)
+    fixtures = sorted(DATA_DIR.glob("*.json"))
+    for path in fixtures:
+        body = path.read_bytes()
+        row = {name: decode_and_build(d, body) for name, d in decoders.items()}
+        for name, t in row.items():
+            totals[name] += t
+        print(f"{path.name:<20}" + "".join(f"{t:>14.1f}" for t in row.values()))
+    print(f"{'mean':<20}" + "".join(f"{t / len(fixtures):>14.1f}" for t in totals.values()))
+
+
+if __name__ == "__main__":
+    main()
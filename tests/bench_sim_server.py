@@ -0,0 +1,76 @@
+import sys
+import time
+from contextlib import ExitStack
+from pathlib import Path
+
+import numpy as np
+
+# ensure src/ is importable
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+from action_manager import ActionManager
+from async_game_controller import AsyncGameController
+from async_vec_env import AsyncGameEnv, AsyncVecGameEnv
+from game_controller import GameController
+from game_env import GameEnv
+from sim_server import SimServer
+
+DATA_DIR = str(ROOT / "ressources" / "test_json")
+ACTIONS_PATH = ROOT / "ressources" / "actions" / "all_actions.json"
+STEPS = 60
+# simulated game: per-request latency and animation time after each command, in seconds
+LATENCY = 0.002
+READY_DELAY = 0.03
+# (initial delay, backoff) of GameController.wait_for_ready
+POLLING = ((0.001, 1.0), (0.005, 1.0), (0.005, 2.0), (0.02, 2.0), (0.05, 1.0))
+INSTANCE_COUNTS = (1, 2, 4, 8)
+
+
+def first_available(env):
+    return int(np.flatnonzero(env.get_action_mask())[0])
+
+
+def bench_polling(action_manager, initial_delay, backoff):
+    with SimServer(fixtures_dir=DATA_DIR, latency=LATENCY, ready_delay=READY_DELAY) as server:
+        controller = GameController(server.base_url, poll_initial_delay=initial_delay, poll_backoff=backoff)
+        env = GameEnv(action_manager, controller)
+        env.reset()
+        polls = 0
+        t0 = time.perf_counter()
+        for _ in range(STEPS):
+            polls += env.step(first_available(env))[4]["polls"]
+        elapsed = time.perf_counter() - t0
+    return STEPS / elapsed, polls / STEPS
+
+
+def bench_instances(action_manager, count):
+    with ExitStack() as stack:
+        servers = [stack.enter_context(SimServer(fixtures_dir=DATA_DIR, latency=LATENCY, ready_delay=READY_DELAY, seed=i))
+                   for i in range(count)]
+        envs = [AsyncGameEnv(action_manager, AsyncGameController(s.base_url)) for s in servers]
+        vec_env = AsyncVecGameEnv(envs)
+        vec_env.reset()
+        t0 = time.perf_counter()
+        for _ in range(STEPS):
+            vec_env.step(np.array([first_available(env) for env in envs]))
+        elapsed = time.perf_counter() - t0
+        vec_env.close()
+    return STEPS * count / elapsed
+
+
+def main():
+    action_manager = ActionManager(filepath=str(ACTIONS_PATH))
+    print(f"simulated game: {LATENCY * 1000:.0f} ms/request, ready {READY_DELAY * 1000:.0f} ms after each command, {STEPS} steps")
+    print(f"{'initial delay':>13} {'backoff':>8} {'steps/s':>9} {'polls/step':>11}")
+    for initial_delay, backoff in POLLING:
+        rate, polls = bench_polling(action_manager, initial_delay, backoff)
+        print(f"{initial_delay * 1000:>11.0f}ms {backoff:>8.1f} {rate:>9.1f} {polls:>11.2f}")
+    print(f"{'instances':>9} {'async steps/s':>14}")
+    for count in INSTANCE_COUNTS:
+        print(f"{count:>9} {bench_instances(action_manager, count):>14.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
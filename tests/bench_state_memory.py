@@ -0,0 +1,59 @@
+import gc
+import json
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+# ensure src/ is importable
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+from state import State
+
+DATA_DIR = ROOT / "ressources" / "test_json"
+N = 200
+K = 100
+
+
+def footprint(raw):
+    # bytes and live blocks per State, measured over K States kept alive at once
+    # so that interpreter free lists (recycled tuples/lists) do not skew the result.
+    # raw_json is shared with the caller and not counted.
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    states = [State(raw) for _ in range(K)]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    diff = after.compare_to(before, "filename")
+    size = sum(stat.size_diff for stat in diff)
+    blocks = sum(stat.count_diff for stat in diff)
+    del states
+    return size // K, blocks // K
+
+
+def construction_time(raw):
+    t0 = time.perf_counter()
+    for _ in range(N):
+        State(raw)
+    return (time.perf_counter() - t0) / N * 1e6
+
+
+def main():
+    print(f"{'fixture':<22} {'bytes':>8} {'blocks':>7} {'build us':>9}")
+    totals = [0, 0, 0.0]
+    files = sorted(DATA_DIR.glob("*.json"))
+    for p in files:
+        with open(p, "r", encoding="utf-8") as fh:
+            raw = json.load(fh)
+        row = (*footprint(raw), construction_time(raw))
+        totals = [t + r for t, r in zip(totals, row)]
+        print(f"{p.name:<22} {row[0]:>8} {row[1]:>7} {row[2]:>9.1f}")
+    n = len(files)
+    print(f"{'mean':<22} {totals[0] / n:>8.0f} {totals[1] / n:>7.0f} {totals[2] / n:>9.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,16 @@
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+DATA_DIR = ROOT / "ressources" / "test_json"
+sys.path.insert(0, str(ROOT / "src"))
+
+from sim_server import SimServer
+
+
+class StubServer(SimServer):
+    # SimServer serving a single fixture, unchanged by commands and resets.
+    # latency (seconds) is added to every request to mimic the game's response time.
+    def __init__(self, fixture="fight.json", port=0, latency=0.0, ready=True):
+        super().__init__(fixtures=[fixture], port=port, latency=latency, ready=ready, mutate=False,
+                         fixtures_dir=str(DATA_DIR), menu_on_reset=False)
@@ -0,0 +1,48 @@
+import sys
+from pathlib import Path
+
+# ensure src/ is importable
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+from action_manager import ActionManager, FactoredActions
+
+ACTIONS_PATH = ROOT / "ressources" / "actions" / "all_actions.json"
+
+
+def test_index_lookup():
+    am = ActionManager(filepath=str(ACTIONS_PATH))
+    assert all(am.index_of(a) == i for i, a in enumerate(am.actions))
+    assert am.index_of("not an action") is None
+    am.update_actions(["end", "end", "choose 99"])
+    assert am.discovered_actions.count("end") == 1
+    assert "choose 99" in am.discovered_set
+
+
+def test_factored_round_trip():
+    am = ActionManager(filepath=str(ACTIONS_PATH))
+    fa = FactoredActions(am)
+    # every flat command has its own (verb, slot, target) triple
+    assert len(set(fa.parts.values())) == len(am.actions) == len(fa.parts)
+    assert sum(fa.nvec) < len(am.actions)
+    for action, parts in fa.parts.items():
+        if action != "return":
+            assert fa.to_command(parts, [action, "end"]) == action
+
+
+def test_factored_mask_and_fallback():
+    fa = FactoredActions(ActionManager(filepath=str(ACTIONS_PATH)))
+    play = fa.verbs.index("play")
+    n_verbs, n_slots = len(fa.verbs), fa.n_slots
+    mask = fa.mask_from_commands(["play 2 0", "play 5", "return"])
+    assert mask.nonzero()[0].tolist() == [play, n_verbs + 2, n_verbs + 5, n_verbs + n_slots, n_verbs + n_slots + 1]
+    # slot 5 + target 0 only exists as separate commands: keep the slot
+    assert fa.to_command((play, 5, 1), ["play 2 0", "play 5"]) == "play 5"
+    assert fa.to_command((play, 2, 0), ["play 2 0", "play 5"]) == "play 2 0"
+
+
+if __name__ == "__main__":
+    test_index_lookup()
+    test_factored_round_trip()
+    test_factored_mask_and_fallback()
+    print("OK")
@@ -0,0 +1,39 @@
+import sys
+from contextlib import ExitStack
+from pathlib import Path
+
+import numpy as np
+
+# ensure src/ is importable
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+sys.path.insert(0, str(ROOT / "tests"))
+
+from action_manager import ActionManager
+from async_game_controller import AsyncGameController
+from async_vec_env import AsyncGameEnv, AsyncVecGameEnv
+from state import State
+from stub_server import StubServer
+
+ACTIONS_PATH = ROOT / "ressources" / "actions" / "all_actions.json"
+
+
+def test_async_vec_env_steps_all_servers():
+    action_manager = ActionManager(filepath=str(ACTIONS_PATH))
+    with ExitStack() as stack:
+        servers = [stack.enter_context(StubServer(fixture=f)) for f in ("fight_2.json", "shop.json", "map.json")]
+        vec_env = AsyncVecGameEnv([AsyncGameEnv(action_manager, AsyncGameController(s.base_url)) for s in servers])
+        obs = vec_env.reset()
+        assert obs.shape == (3, State.get_size())
+        masks = np.stack(vec_env.env_method("action_masks"))
+        assert masks.shape == (3, len(action_manager.actions))
+        obs, rewards, dones, infos = vec_env.step(np.zeros(3, dtype=np.int64))
+        assert obs.shape == (3, State.get_size())
+        assert rewards.shape == dones.shape == (3,)
+        assert all(info["polls"] == 1 for info in infos)
+        vec_env.close()
+
+
+if __name__ == "__main__":
+    test_async_vec_env_steps_all_servers()
+    print("OK")
@@ -0,0 +1,58 @@
+import json
+import sys
+from pathlib import Path
+
+# ensure src/ is importable
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+from state import State, CardFeatureCache, CARD_FEATURE_CACHE
+
+
+DATA_DIR = ROOT / "ressources" / "test_json"
+
+
+def deck():
+    with open(DATA_DIR / "fight.json", "r", encoding="utf-8") as fh:
+        return json.load(fh)["game_state"]["deck"]
+
+
+def test_cached_features_match_uncached():
+    CARD_FEATURE_CACHE.clear()
+    cards = deck()
+    first = [State._encode_card_features(c) for c in cards]
+    assert CARD_FEATURE_CACHE.misses == len(cards)
+    second = [State._encode_card_features(c) for c in cards]
+    assert CARD_FEATURE_CACHE.hits == len(cards)
+    assert first == second == [State._compute_card_features(c) for c in cards]
+
+
+def test_changed_card_is_a_new_entry():
+    CARD_FEATURE_CACHE.clear()
+    card = dict(deck()[0])
+    before = State._encode_card_features(card)
+    card["cost"] = 0
+    card["upgrades"] = 1
+    after = State._encode_card_features(card)
+    assert CARD_FEATURE_CACHE.misses == 2
+    assert after == State._compute_card_features(card) != before
+
+
+def test_cache_is_bounded():
+    cache = CardFeatureCache(maxsize=2)
+    for i in range(3):
+        cache.put(("uuid", i), (float(i),))
+    assert cache.stats()["size"] == 2
+    assert cache.get(("uuid", 0)) is None
+    assert cache.get(("uuid", 1)) == (1.0,)
+    # 1 is now the most recently used, 2 gets evicted
+    cache.put(("uuid", 3), (3.0,))
+    assert cache.get(("uuid", 2)) is None and cache.get(("uuid", 1)) == (1.0,)
+    assert (cache.hits, cache.misses) == (2, 2)
+
+
+if __name__ == "__main__":
+    test_cached_features_match_uncached()
+    test_changed_card_is_a_new_entry()
+    test_cache_is_bounded()
+    print("OK")
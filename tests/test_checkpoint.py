@@ -0,0 +1,102 @@
+import sys
+import shutil
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import torch as th
+from gymnasium import spaces
+from sb3_contrib import MaskablePPO
+from sb3_contrib.common.maskable.policies import MaskableActorCriticPolicy
+from sb3_contrib.common.wrappers import ActionMasker
+
+# ensure src/ is importable
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+from action_manager import ActionManager
+from checkpoint import CheckpointWriter, ModelSnapshot, model_file
+from checkpoint_callback import AsyncCheckpointCallback
+from env_factory import mask_fn
+from game_controller import GameController
+from game_env import GameEnv
+from pretrain import SpacesEnv
+from sim_server import SimServer
+from state import State
+
+DATA_DIR = str(ROOT / "ressources" / "test_json")
+ACTIONS_PATH = ROOT / "ressources" / "actions" / "all_actions.json"
+
+
+def small_model(n_actions=20):
+    env = SpacesEnv(spaces.Box(low=0, high=1, shape=(State.get_size(),), dtype=np.float32), spaces.Discrete(n_actions))
+    return MaskablePPO(MaskableActorCriticPolicy, env, seed=0, policy_kwargs={"net_arch": [16]})
+
+
+def same_parameters(a, b):
+    return all(th.equal(x, y) for x, y in zip(a.policy.state_dict().values(), b.policy.state_dict().values()))
+
+
+def test_snapshot_is_a_loadable_copy():
+    model = small_model()
+    with tempfile.TemporaryDirectory() as tmp:
+        snapshot = ModelSnapshot(model)
+        model.save(str(Path(tmp) / "reference"))
+        # training going on after the snapshot does not change it
+        with th.no_grad():
+            for p in model.policy.parameters():
+                p.add_(1.0)
+        path = str(Path(tmp) / "snapshot.zip")
+        snapshot.write(path)
+        loaded = MaskablePPO.load(path)
+        assert same_parameters(loaded, MaskablePPO.load(str(Path(tmp) / "reference")))
+        assert not same_parameters(loaded, model)
+        assert loaded.num_timesteps == model.num_timesteps
+
+
+def test_writer_rotates_checkpoints():
+    model = small_model()
+    with tempfile.TemporaryDirectory() as tmp:
+        prefix = str(Path(tmp) / "checkpoints" / "model")
+        latest = str(Path(tmp) / "model")
+        writer = CheckpointWriter(prefix, keep_last=2, latest_path=latest)
+        for timesteps in (100, 200, 1000):
+            model.num_timesteps = timesteps
+            writer.submit(model)
+            assert writer.flush(timeout=30)
+        assert [Path(p).name for p in writer.checkpoints()] == ["model_200_steps.zip", "model_1000_steps.zip"]
+        assert MaskablePPO.load(latest).num_timesteps == 1000
+        stats = writer.stats()
+        assert stats["saved"] == 3 and stats["errors"] == 0
+        assert stats["snapshot_max_ms"] > 0 and stats["write_max_ms"] > 0
+        writer.close()
+        assert not writer.thread.is_alive()
+        assert not list(Path(tmp).rglob("*.tmp-*"))
+
+
+def test_callback_checkpoints_during_training():
+    with tempfile.TemporaryDirectory() as tmp, SimServer(fixtures_dir=DATA_DIR, run_length=20) as game:
+        actions_path = Path(tmp) / "all_actions.json"
+        shutil.copy(ACTIONS_PATH, actions_path)
+        action_manager = ActionManager(filepath=str(actions_path))
+        env = ActionMasker(GameEnv(action_manager, GameController(game.base_url), character="IRONCLAD"), mask_fn)
+        model = MaskablePPO(MaskableActorCriticPolicy, env, n_steps=64, batch_size=32, n_epochs=1, seed=0,
+                            policy_kwargs={"net_arch": [16]})
+        prefix = str(Path(tmp) / "model")
+        callback = AsyncCheckpointCallback(prefix, save_freq=64, keep_last=2, latest_path=prefix,
+                                           action_manager=action_manager)
+        model.learn(total_timesteps=256, callback=callback)
+        callback.close()
+        checkpoints = callback.writer.checkpoints()
+        assert [Path(p).name for p in checkpoints] == ["model_192_steps.zip", "model_256_steps.zip"]
+        assert MaskablePPO.load(model_file(prefix)).num_timesteps == 256
+        assert Path(tmp, "all_actions_discovered.json").exists()
+        # one snapshot every 64 timesteps, a snapshot still waiting is replaced by the next one
+        assert callback.writer.saved + callback.writer.skipped == 4
+
+
+if __name__ == "__main__":
+    test_snapshot_is_a_loadable_copy()
+    test_writer_rotates_checkpoints()
+    test_callback_checkpoints_during_training()
+    print("OK")
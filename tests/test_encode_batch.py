@@ -0,0 +1,99 @@
+import copy
+import json
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# ensure src/ is importable
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+from state import State, encode_states, MAX_HAND
+
+
+DATA_DIR = ROOT / "ressources" / "test_json"
+
+
+def load_fixtures():
+    fixtures = []
+    for p in sorted(DATA_DIR.glob("*.json")):
+        with open(p, "r", encoding="utf-8") as fh:
+            fixtures.append(json.load(fh))
+    return fixtures
+
+
+def with_hand(raw):
+    # fixtures keep the hand under combat_state, fill game_state.hand to exercise that block
+    raw = copy.deepcopy(raw)
+    gs = raw.setdefault("game_state", {})
+    gs["hand"] = list(gs.get("deck", []))[:MAX_HAND]
+    return raw
+
+
+def check_rows(raws):
+    batch = encode_states(raws)
+    assert batch.shape == (len(raws), State.get_size())
+    assert batch.dtype == np.float32
+    for i, raw in enumerate(raws):
+        single = State(raw).encode_state()
+        assert np.array_equal(batch[i].view(np.uint32), single.view(np.uint32)), i
+
+
+def test_batch_matches_single_encoder():
+    check_rows(load_fixtures())
+
+
+def test_batch_with_hand_and_empty_states():
+    fixtures = load_fixtures()
+    check_rows([with_hand(r) for r in fixtures] + [{}, {"game_state": {}}] + fixtures)
+
+
+def edge_cases(fixtures):
+    # values and shapes the raw reader must handle like the State classes do
+    fights = [r for r in fixtures if "combat_state" in r["game_state"]]
+    raws = []
+    fight = copy.deepcopy(fights[0])
+    gs = fight["game_state"]
+    cs = gs["combat_state"]
+    gs["hand"] = [None, {}, {"type": None, "rarity": "UNKNOWN", "cost": -1, "base_damage": 6, "damage": 0}]
+    gs["deck"] = [dict(c, upgrades=None, magic=None) for c in gs["deck"]]
+    cs["draw_pile"] = [{"rarity": None, "type": "CURSE", "cost": 2.5}, {}] + list(cs.get("draw_pile", []))
+    cs["discard_pile"] = [None, {"rarity": "RARE", "upgrades": 2, "name": "x"}] + list(cs.get("discard_pile", []))
+    cs["monsters"][0].update(buffs=None, debuffs=[1, 2], intent="", intent_name="ATTACK", is_gone=1)
+    gs["player"] = {"current_hp": 5, "block": 0, "current_block": 7, "powers": None}
+    gs.update(floor=None, act=None, gold=None, room_phase=None, room_type="", ascension_level=None)
+    gs["relics"] = [{"name": "A", "counter": None, "price": 3}, {"id": "B"}, {}]
+    gs["map"] = [{"symbol": s, "x": i, "y": 0} for i, s in enumerate(["M", "T", None, "R", "R"])]
+    raws.append(fight)
+    for raw in fixtures:
+        shop = copy.deepcopy(raw)
+        shop["game_state"]["room_type"] = "ShopRoom"
+        screen = shop["game_state"].setdefault("screen_state", {})
+        screen.setdefault("cards", []).append({"price": None, "type": None, "rarity": None})
+        screen.update(purge_available=None, options=None, event_name="x")
+        raws.append(shop)
+    big = copy.deepcopy(fights[-1])
+    big["game_state"]["map"] = [{"symbol": "M", "x": i % 7, "y": i // 7} for i in range(100)]
+    raws.append(big)
+    return raws
+
+
+def test_batch_edge_cases():
+    check_rows(edge_cases(load_fixtures()))
+
+
+def test_batch_reuses_buffer():
+    fixtures = load_fixtures()
+    buf = np.full((len(fixtures), State.get_size()), 5.0, dtype=np.float32)
+    assert encode_states(fixtures, out=buf) is buf
+    assert np.array_equal(buf, encode_states(fixtures))
+    assert encode_states([]).shape == (0, State.get_size())
+
+
+if __name__ == "__main__":
+    test_batch_matches_single_encoder()
+    test_batch_with_hand_and_empty_states()
+    test_batch_edge_cases()
+    test_batch_reuses_buffer()
+    print("OK")
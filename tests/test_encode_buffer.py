@@ -0,0 +1,58 @@
+import json
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# ensure src/ is importable
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+from state import State, ENCODE_OFFSETS
+
+
+DATA_DIR = ROOT / "ressources" / "test_json"
+# vectors produced by the list-concatenation encoder, before encode_state wrote into a buffer
+EXPECTED = DATA_DIR / "expected_encodings.npz"
+
+
+def load_fixtures():
+    fixtures = {}
+    for p in sorted(DATA_DIR.glob("*.json")):
+        with open(p, "r", encoding="utf-8") as fh:
+            fixtures[p.stem] = json.load(fh)
+    return fixtures
+
+
+def test_offsets_cover_vector():
+    offsets = sorted(ENCODE_OFFSETS.values())
+    assert offsets[0] == 0
+    assert offsets == sorted(set(offsets))
+    assert max(offsets) < State.get_size()
+
+
+def test_encode_state_bit_identical():
+    expected = np.load(EXPECTED)
+    fixtures = load_fixtures()
+    assert set(fixtures) == set(expected.files)
+    for name, raw in fixtures.items():
+        vec = State(raw).encode_state()
+        assert vec.dtype == np.float32
+        assert np.array_equal(vec.view(np.uint32), expected[name].view(np.uint32)), name
+
+
+def test_preallocated_buffer_is_reset():
+    expected = np.load(EXPECTED)
+    buf = np.full(State.get_size(), 123.0, dtype=np.float32)
+    # encode every fixture into the same buffer: leftovers from the previous state must not leak
+    for name, raw in load_fixtures().items():
+        vec = State(raw).encode_state(out=buf)
+        assert vec is buf
+        assert np.array_equal(buf.view(np.uint32), expected[name].view(np.uint32)), name
+
+
+if __name__ == "__main__":
+    test_offsets_cover_vector()
+    test_encode_state_bit_identical()
+    test_preallocated_buffer_is_reset()
+    print("OK")
@@ -0,0 +1,63 @@
+import sys
+from pathlib import Path
+
+# ensure src/ is importable
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+sys.path.insert(0, str(ROOT / "tests"))
+
+from game_controller import GameController, DEFAULT_TIMEOUTS
+from stub_server import StubServer
+
+
+class ScriptedController(GameController):
+    # serves a fixed sequence of /state payloads instead of calling the game
+    def __init__(self, states, **kwargs):
+        super().__init__(**kwargs)
+        self.states = list(states)
+
+    def get_state(self):
+        return self.states.pop(0) if len(self.states) > 1 else self.states[0]
+
+
+def not_ready():
+    return {"ready_for_command": False, "available_commands": ["end"]}
+
+
+def ready():
+    return {"ready_for_command": True, "available_commands": ["end"]}
+
+
+def test_wait_for_ready_returns_first_ready_state():
+    gc = ScriptedController([not_ready(), not_ready(), ready()], poll_initial_delay=0.001)
+    state = gc.wait_for_ready()
+    assert state["ready_for_command"]
+    assert gc.last_poll_count == 3
+    assert 0.0 < gc.last_wait_time < 0.5
+
+
+def test_wait_for_ready_forces_after_limit():
+    gc = ScriptedController([not_ready()], not_ready_limit=4, poll_initial_delay=0.001, poll_max_delay=0.002)
+    state = gc.wait_for_ready()
+    assert not state["ready_for_command"]
+    assert gc.last_poll_count == 4
+
+
+def test_session_reuses_connection():
+    with StubServer() as server:
+        gc = GameController(server.base_url, timeouts={"state": 3})
+        assert gc.timeouts["state"] == 3
+        assert gc.timeouts["command"] == DEFAULT_TIMEOUTS["command"]
+        assert gc.get_state()["in_game"]
+        assert gc.send_command("end")
+        assert gc.get_state()["in_game"]
+        # every call went through the same keep-alive connection
+        assert server.connection_count == 1
+        gc.close()
+
+
+if __name__ == "__main__":
+    test_wait_for_ready_returns_first_ready_state()
+    test_wait_for_ready_forces_after_limit()
+    test_session_reuses_connection()
+    print("OK")
@@ -0,0 +1,62 @@
+import sys
+from pathlib import Path
+
+# ensure src/ is importable
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+sys.path.insert(0, str(ROOT / "tests"))
+
+from action_manager import ActionManager
+from game_controller import GameController
+from game_env import GameEnv
+from stub_server import StubServer
+
+ACTIONS_PATH = ROOT / "ressources" / "actions" / "all_actions.json"
+
+
+def make_env(server):
+    return GameEnv(ActionManager(filepath=str(ACTIONS_PATH)), GameController(server.base_url))
+
+
+def test_action_mask_from_commands():
+    with StubServer() as server:
+        env = make_env(server)
+        actions = env.action_manager.actions
+        mask = env.get_action_mask_from_commands(["choose 0", "return", "cancel", "unknown cmd"])
+        assert mask.dtype.name == "int8"
+        assert {actions[i] for i in mask.nonzero()[0]} == {"choose 0", "cancel"}
+        # the buffer is reused and fully cleared between calls
+        assert env.get_action_mask_from_commands(["end"]) is mask
+        assert {actions[i] for i in mask.nonzero()[0]} == {"end"}
+
+
+def test_step_reuses_observed_state():
+    with StubServer(fixture="fight_2.json") as server:
+        env = make_env(server)
+        env.reset()
+        before = server.state_requests
+        for _ in range(3):
+            _, _, _, _, info = env.step(0)
+        # one /state per step (the readiness poll), no pre-step fetch
+        assert server.state_requests - before == 3
+        assert env.state_fetches_saved == info["fetches_saved"] == 3
+
+
+def test_step_refetches_after_external_reset():
+    with StubServer(fixture="fight_2.json") as server:
+        env = make_env(server)
+        env.reset()
+        env.game_controller.reset_run()
+        assert env.is_state_stale()
+        before = server.state_requests
+        env.step(0)
+        assert server.state_requests - before == 2
+        assert env.state_fetches_saved == 0
+        assert not env.is_state_stale()
+
+
+if __name__ == "__main__":
+    test_action_mask_from_commands()
+    test_step_reuses_observed_state()
+    test_step_refetches_after_external_reset()
+    print("OK")
@@ -0,0 +1,124 @@
+import sys
+import time
+import tempfile
+import threading
+from pathlib import Path
+
+import numpy as np
+from gymnasium import spaces
+from sb3_contrib import MaskablePPO
+from sb3_contrib.common.maskable.policies import MaskableActorCriticPolicy
+
+# ensure src/ is importable
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+from action_manager import ActionManager
+from game_controller import GameController
+from game_env import GameEnv
+from inference_server import PolicyServer, PolicyClient, play
+from pretrain import SpacesEnv
+from sim_server import SimServer
+from state import State
+
+DATA_DIR = str(ROOT / "ressources" / "test_json")
+ACTIONS_PATH = ROOT / "ressources" / "actions" / "all_actions.json"
+
+
+def save_model(path, n_actions, seed):
+    env = SpacesEnv(spaces.Box(low=0, high=1, shape=(State.get_size(),), dtype=np.float32), spaces.Discrete(n_actions))
+    model = MaskablePPO(MaskableActorCriticPolicy, env, seed=seed, policy_kwargs={"net_arch": [16]})
+    model.save(path)
+    return model
+
+
+def sample(n, n_actions, seed=0):
+    rng = np.random.default_rng(seed)
+    obs = rng.random((n, State.get_size()), dtype=np.float32)
+    masks = rng.random((n, n_actions)) < 0.3
+    masks[:, 0] = True
+    return obs, masks
+
+
+def test_batches_concurrent_requests():
+    n_actions = 20
+    with tempfile.TemporaryDirectory() as tmp:
+        path = str(Path(tmp) / "model")
+        model = save_model(path, n_actions, seed=0)
+        obs, masks = sample(16, n_actions)
+        expected, _ = model.policy.predict(obs, deterministic=True, action_masks=masks)
+        with PolicyServer(path, max_batch=8, max_latency=0.05, deterministic=True) as server:
+            results = [None] * len(obs)
+
+            def worker(i):
+                results[i] = server.predict(obs[i], masks[i])
+
+            threads = [threading.Thread(target=worker, args=(i,)) for i in range(len(obs))]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            assert [int(a) for a in results] == expected.tolist()
+            # 16 single-row requests in a few forward passes
+            assert server.rows == 16 and server.batches < 16
+            assert all(masks[i, a] for i, a in enumerate(results))
+
+            # rows of one request stay together, over HTTP as well
+            client = PolicyClient(server.base_url)
+            assert client.predict(obs, masks).tolist() == expected.tolist()
+            assert int(client.predict(obs[3], masks[3])) == expected[3]
+            assert client.stats()["rows"] == 16 + 17
+            client.close()
+
+
+def test_lone_request_waits_at_most_max_latency():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = str(Path(tmp) / "model")
+        save_model(path, 10, seed=0)
+        obs, masks = sample(1, 10)
+        with PolicyServer(path, max_batch=64, max_latency=0.02) as server:
+            server.predict(obs[0], masks[0])
+            start = time.perf_counter()
+            server.predict(obs[0], masks[0])
+            assert time.perf_counter() - start < 0.2
+
+
+def test_hot_reload():
+    n_actions = 30
+    with tempfile.TemporaryDirectory() as tmp:
+        path = str(Path(tmp) / "model")
+        save_model(path, n_actions, seed=0)
+        obs, masks = sample(64, n_actions, seed=1)
+        masks[:] = True
+        with PolicyServer(path + ".zip", reload_interval=0.05, deterministic=True) as server:
+            before = server.predict(obs, masks)
+            new_model = save_model(path, n_actions, seed=1)
+            deadline = time.monotonic() + 10
+            while server.model_version < 2 and time.monotonic() < deadline:
+                time.sleep(0.05)
+            assert server.model_version == 2 and server.reloads == 1
+            after = server.predict(obs, masks)
+            expected, _ = new_model.policy.predict(obs, deterministic=True, action_masks=masks)
+            assert after.tolist() == expected.tolist()
+            assert after.tolist() != before.tolist()
+
+
+def test_plays_a_game():
+    action_manager = ActionManager(filepath=str(ACTIONS_PATH))
+    with tempfile.TemporaryDirectory() as tmp, SimServer(fixtures_dir=DATA_DIR, run_length=4) as game:
+        path = str(Path(tmp) / "model")
+        save_model(path, len(action_manager.actions), seed=0)
+        with PolicyServer(path) as server:
+            env = GameEnv(action_manager, GameController(game.base_url), character="IRONCLAD")
+            client = PolicyClient(server.base_url)
+            assert play(env, client, steps=8) == 2
+            client.close()
+        assert game.runs == 3
+
+
+if __name__ == "__main__":
+    test_batches_concurrent_requests()
+    test_lone_request_waits_at_most_max_latency()
+    test_hot_reload()
+    test_plays_a_game()
+    print("OK")
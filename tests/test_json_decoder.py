@@ -0,0 +1,52 @@
+import json
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+# ensure src/ is importable
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+import json_decoder
+from json_decoder import JsonDecoder
+from state import State
+
+
+DATA_DIR = ROOT / "ressources" / "test_json"
+
+
+def fixtures():
+    return {p.stem: p.read_bytes() for p in sorted(DATA_DIR.glob("*.json"))}
+
+
+def backends():
+    return ["json", "orjson"] if json_decoder.orjson is not None else ["json"]
+
+
+def test_backends_decode_like_stdlib():
+    for backend in backends():
+        decoder = JsonDecoder(backend)
+        for name, body in fixtures().items():
+            assert decoder.loads(body) == json.loads(body), (backend, name)
+
+
+def test_skipped_fields_do_not_change_encoding():
+    decoder = JsonDecoder(skip_fields=True)
+    for name, body in fixtures().items():
+        pruned = decoder.loads(body)
+        assert "body_text" not in json.dumps(pruned), name
+        full = State(json.loads(body)).encode_state()
+        assert np.array_equal(State(pruned).encode_state().view(np.uint32), full.view(np.uint32)), name
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        JsonDecoder("yaml")
+
+
+if __name__ == "__main__":
+    test_backends_decode_like_stdlib()
+    test_skipped_fields_do_not_change_encoding()
+    print("OK")
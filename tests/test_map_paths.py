@@ -0,0 +1,115 @@
+import json
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# ensure src/ is importable
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+from state import State, Map, MAP_SYMBOLS, MAP_PATH_FEATURES
+
+
+DATA_DIR = ROOT / "ressources" / "test_json"
+
+
+def load(name):
+    with open(DATA_DIR / f"{name}.json", "r", encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+def brute_force(raw_map, choices):
+    # enumerate every path from the choices on the raw JSON
+    nodes = {(n["x"], n["y"]): n for n in raw_map}
+    reachable = set()
+    paths = []
+
+    def walk(xy, path):
+        reachable.add(xy)
+        path = path + [nodes[xy]["symbol"]]
+        children = [(c["x"], c["y"]) for c in nodes[xy]["children"] if (c["x"], c["y"]) in nodes]
+        if not children:
+            paths.append(path)
+        for c in children:
+            walk(c, path)
+
+    for xy in choices:
+        walk(xy, [])
+    n = len(MAP_SYMBOLS)
+    out = np.zeros(MAP_PATH_FEATURES, dtype=np.float32)
+    out[1] = len(choices)
+    for s, symbol in enumerate(MAP_SYMBOLS):
+        out[2 + s] = sum(1 for xy in reachable if nodes[xy]["symbol"] == symbol)
+        out[2 + n + s] = max(p.count(symbol) for p in paths)
+        out[2 + 2 * n + s] = min(p.count(symbol) for p in paths)
+    return out
+
+
+def test_features_match_path_enumeration():
+    for name in ("map", "map_2"):
+        raw = load(name)
+        gs = raw["game_state"]
+        current = gs["screen_state"]["current_node"]
+        expected = brute_force(gs["map"], [(n["x"], n["y"]) for n in gs["screen_state"]["next_nodes"]])
+        expected[0] = 1.0
+        got = Map.from_json(gs["map"]).path_features(current=(current["x"], current["y"]))
+        assert np.array_equal(got, expected), name
+        # start of the act: the choices are the first row
+        first_row = [(n["x"], n["y"]) for n in gs["map"] if n["y"] == 0]
+        assert np.array_equal(Map.from_json(gs["map"]).path_features(), brute_force(gs["map"], first_row)), name
+
+
+def test_act_start_uses_offered_nodes():
+    raw = load("map")
+    gs = raw["game_state"]
+    first_row = [n for n in gs["map"] if n["y"] == 0]
+    offered = [(n["x"], n["y"]) for n in first_row[:2]]
+    # the game reports a dummy node below the first row until one is chosen
+    gs["screen_state"].update(first_node_chosen=False, current_node={"x": 0, "y": -1},
+                              next_nodes=[{"symbol": "M", "x": x, "y": y} for x, y in offered])
+    features = State(raw).encode_state(map_paths=True)[State.get_size():]
+    assert np.array_equal(features, brute_force(gs["map"], offered))
+    assert features[1] == len(offered) and features[2:].any()
+    # without next_nodes, every node of the first row is a choice
+    gs["screen_state"]["next_nodes"] = []
+    features = State(raw).encode_state(map_paths=True)[State.get_size():]
+    assert np.array_equal(features, brute_force(gs["map"], [(n["x"], n["y"]) for n in first_row]))
+    # a current node that is not on the map falls back to the offered nodes as well
+    got = Map.from_json(gs["map"]).path_features(current=(0, -1), next_nodes=offered)
+    assert np.array_equal(got[1:], brute_force(gs["map"], offered)[1:]) and got[0] == 0
+
+
+def test_encode_state_appends_block():
+    for name in ("map", "fight", "event", "shop"):
+        state = State(load(name))
+        base = state.encode_state()
+        full = state.encode_state(map_paths=True)
+        assert full.shape == (State.get_size() + MAP_PATH_FEATURES,)
+        assert np.array_equal(full[:State.get_size()], base), name
+
+
+def test_index_cached_until_map_changes():
+    state = State(load("fight"))
+    # the map arrays are only built when the routing features need them
+    state.encode_state()
+    assert state.game_state.map.arrays is None
+    state.encode_state(map_paths=True)
+    assert state.game_state.map.arrays is not None
+    paths = state.game_state.map.paths
+    assert paths is not None
+    state.update_from_json(load("fight"), incremental=True)
+    state.encode_state(map_paths=True)
+    assert state.game_state.map.paths is paths
+    changed = load("fight")
+    changed["game_state"]["map"] = changed["game_state"]["map"][:-1]
+    state.update_from_json(changed, incremental=True)
+    assert state.game_state.map.paths is None
+
+
+if __name__ == "__main__":
+    test_features_match_path_enumeration()
+    test_act_start_uses_offered_nodes()
+    test_encode_state_appends_block()
+    test_index_cached_until_map_changes()
+    print("OK")
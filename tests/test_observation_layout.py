@@ -0,0 +1,114 @@
+import json
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# ensure src/ is importable
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+from state import (State, ObservationLayout, ENCODE_OFFSETS, MAP_PATH_FEATURES, MAX_HAND, CARD_FEATURES,
+                   ROOM_TYPE_MAP, encode_states)
+
+
+DATA_DIR = ROOT / "ressources" / "test_json"
+
+
+def load_fixtures():
+    fixtures = {}
+    for p in sorted(DATA_DIR.glob("*.json")):
+        with open(p, "r", encoding="utf-8") as fh:
+            fixtures[p.stem] = json.load(fh)
+    return fixtures
+
+
+def test_segments_cover_the_vector():
+    for layout in (State.layout(), State.layout(map_paths=True)):
+        pos = 0
+        for name, seg in layout.segments.items():
+            assert seg.name == name
+            assert seg.offset == pos and seg.size > 0, name
+            pos = seg.end
+        assert pos == layout.size
+    assert State.layout().size == State.get_size()
+    assert State.layout(map_paths=True).size == State.get_size() + MAP_PATH_FEATURES
+    assert State.layout(map_paths=True)["map_paths"].offset == State.get_size()
+    # computed once
+    assert State.layout() is State.layout()
+    assert ENCODE_OFFSETS == {name: seg.offset for name, seg in State.layout().blocks.items()}
+    assert ObservationLayout().segments == State.layout().segments
+
+
+def test_segments_match_component_encoders():
+    layout = State.layout()
+    for name, raw in load_fixtures().items():
+        state = State(raw)
+        gs = state.game_state
+        raw_gs = raw.get("game_state") or {}
+        vec = state.encode_state()
+        seg = layout.split(vec)
+
+        player = gs.player.encode()
+        assert np.array_equal(seg["player_head"], player[:4]), name
+        assert np.array_equal(seg["player_powers_count"], player[4:]), name
+        assert seg["gold"][0] == (gs.gold or 0), name
+        assert np.array_equal(seg["map"], gs.map.encode()), name
+        assert np.array_equal(seg["monsters"], np.array(gs.combat_state.encode(), dtype=np.float32)), name
+        screen = np.concatenate([seg[k] for k in ("shop_cards", "shop_potions", "shop_relics", "purge", "event")])
+        expected_screen = gs.screen_state.encode(room_type=gs.room_type or raw_gs.get("room_type"),
+                                                 raw_relics=raw_gs.get("relics", []))
+        assert np.array_equal(screen, np.array(expected_screen, dtype=np.float32)), name
+        cs = raw_gs.get("combat_state") or {}
+        piles = [len(cs.get(p, [])) for p in ("draw_pile", "discard_pile", "exhaust_pile")]
+        assert np.array_equal(seg["pile_counts"], piles), name
+
+        hand = np.zeros(MAX_HAND * CARD_FEATURES, dtype=np.float32)
+        cards = [State._encode_card_features(c) for c in (raw_gs.get("hand") or [])[:MAX_HAND]]
+        if cards:
+            hand[:len(cards) * CARD_FEATURES] = np.concatenate(cards)
+        assert np.array_equal(seg["hand"], hand), name
+        room = ROOM_TYPE_MAP.get(gs.room_type or raw_gs.get("room_type", "UnknownRoom"), 0)
+        assert seg["room"].argmax() == room and seg["room"].sum() == 1, name
+
+        # game_tail block spans its leaves
+        tail = layout.view(vec, "game_tail")
+        assert np.array_equal(tail, vec[layout["player_powers_count"].offset:layout["event"].end]), name
+
+
+def test_view_on_batches_and_map_paths():
+    fixtures = load_fixtures()
+    raws = list(fixtures.values())
+    batch = encode_states(raws)
+    layout = State.layout()
+    hands = layout.view(batch, "hand")
+    assert hands.shape == (len(raws), MAX_HAND * CARD_FEATURES)
+    assert np.shares_memory(hands, batch)
+
+    full_layout = State.layout(map_paths=True)
+    for name, raw in fixtures.items():
+        state = State(raw)
+        full = state.encode_state(map_paths=True)
+        assert full.shape == (full_layout.size,)
+        paths = full_layout.view(full, "map_paths")
+        assert np.array_equal(paths, state._map_path_features(raw.get("game_state") or {})), name
+
+    try:
+        layout.view(np.zeros(full_layout.size), "hand")
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("view accepted an observation of the wrong size")
+    try:
+        layout["map_paths"]
+    except KeyError:
+        pass
+    else:
+        raise AssertionError("map_paths segment without map_paths")
+
+
+if __name__ == "__main__":
+    test_segments_cover_the_vector()
+    test_segments_match_component_encoders()
+    test_view_on_batches_and_map_paths()
+    print("OK")
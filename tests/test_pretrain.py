@@ -0,0 +1,100 @@
+import json
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import torch as th
+from gymnasium import spaces
+from sb3_contrib.common.maskable.policies import MaskableActorCriticPolicy
+
+# ensure src/ is importable
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+from action_manager import ActionManager, FactoredActions
+from pretrain import RawStepDataset, pretrain
+from state import State, encode_states
+from trajectory_store import RawStepWriter
+
+DATA_DIR = ROOT / "ressources" / "test_json"
+ACTIONS_PATH = ROOT / "ressources" / "actions" / "all_actions.json"
+
+
+def record(directory, action_manager, repeat=8):
+    # every fixture with its first known, non-"return" command, split over several files
+    writer = RawStepWriter(directory, steps_per_file=10)
+    steps = []
+    for path in sorted(DATA_DIR.glob("*.json")):
+        raw = json.loads(path.read_text(encoding="utf-8"))
+        commands = [c for c in raw["available_commands"] if c in action_manager.action_index and c != "return"]
+        if commands:
+            steps.append((raw, commands[0]))
+    for _ in range(repeat):
+        for raw, command in steps:
+            writer.append(raw, command)
+    writer.close()
+    return steps
+
+
+def test_dataset_batches_match_recorded_steps():
+    action_manager = ActionManager(filepath=str(ACTIONS_PATH))
+    with tempfile.TemporaryDirectory() as tmp:
+        steps = record(tmp, action_manager, repeat=1)
+        dataset = RawStepDataset(tmp, action_manager, batch_size=4)
+        batches = list(dataset)
+        obs = th.cat([b[0] for b in batches]).numpy()
+        masks = th.cat([b[1] for b in batches]).numpy()
+        targets = th.cat([b[2] for b in batches]).numpy()
+        assert len(obs) == len(steps)
+        # a single file, so recorded order is kept
+        assert np.array_equal(obs, encode_states([raw for raw, _ in steps]))
+        assert targets.tolist() == [action_manager.action_index[c] for _, c in steps]
+        assert masks[np.arange(len(targets)), targets].all()
+        assert not masks[:, action_manager.index_of("return")].any()
+
+
+def test_factored_dataset_masks_each_row():
+    action_manager = ActionManager(filepath=str(ACTIONS_PATH))
+    factored = FactoredActions(action_manager)
+    raw = json.loads((DATA_DIR / "fight.json").read_text(encoding="utf-8"))
+    play = next(c for c in raw["available_commands"] if c.startswith("play"))
+    only_end = dict(raw, available_commands=["end"])
+    with_play = dict(raw, available_commands=["end", play])
+    with tempfile.TemporaryDirectory() as tmp:
+        writer = RawStepWriter(tmp, steps_per_file=10)
+        writer.append(only_end, "end")
+        writer.append(with_play, play)
+        writer.close()
+        dataset = RawStepDataset(tmp, action_manager, batch_size=2, factored_actions=True)
+        (_, masks, targets), = list(dataset)
+        masks = masks.numpy()
+        play_verb = factored.parts[play][0]
+        assert not masks[0, play_verb] and masks[1, play_verb]
+        assert np.array_equal(masks[0], factored.mask_from_commands(["end"]))
+        assert np.array_equal(masks[1], factored.mask_from_commands(["end", play]))
+        assert targets.tolist() == [list(factored.parts["end"]), list(factored.parts[play])]
+
+
+def test_pretrain_lowers_loss_with_workers():
+    action_manager = ActionManager(filepath=str(ACTIONS_PATH))
+    with tempfile.TemporaryDirectory() as tmp:
+        steps = record(tmp, action_manager)
+        policy = MaskableActorCriticPolicy(
+            spaces.Box(low=0, high=1, shape=(State.get_size(),), dtype=np.float32),
+            spaces.Discrete(len(action_manager.actions)),
+            lr_schedule=lambda _: 1e-3,
+        )
+        dataset = RawStepDataset(tmp, action_manager, batch_size=16)
+        first = pretrain(policy, dataset, epochs=1, num_workers=2)
+        last = pretrain(policy, dataset, epochs=5, num_workers=2)
+        # every recorded step is seen exactly once per epoch across the workers
+        assert first["samples"] == last["samples"] == 8 * len(steps)
+        assert last["loss"] < first["loss"]
+
+
+if __name__ == "__main__":
+    test_dataset_batches_match_recorded_steps()
+    test_factored_dataset_masks_each_row()
+    test_pretrain_lowers_loss_with_workers()
+    print("OK")
@@ -0,0 +1,126 @@
+import sys
+import time
+import asyncio
+from pathlib import Path
+
+# ensure src/ is importable
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+from async_game_controller import AsyncGameController
+from game_controller import GameController
+from launcher import GameLauncher, GameInstance
+from readiness import Poller, ReadinessTimeout, GameProcessExited, in_run, out_of_run
+from sim_server import SimServer
+
+DATA_DIR = str(ROOT / "ressources" / "test_json")
+
+
+class ExitedProcess:
+    # stands in for the Popen of a game that crashed during boot
+    returncode = 1
+
+    def poll(self):
+        return self.returncode
+
+
+def expect(exc_type, fn, *args):
+    try:
+        fn(*args)
+    except exc_type as e:
+        return e
+    raise AssertionError(f"{exc_type.__name__} not raised")
+
+
+def test_poller_backoff_and_deadline():
+    poller = Poller("nothing", timeout=0.2, initial_delay=0.01, max_delay=0.04)
+    delays = [poller.next_delay() for _ in range(4)]
+    assert delays == [0.01, 0.02, 0.04, 0.04]
+    time.sleep(0.2)
+    e = expect(ReadinessTimeout, poller.next_delay)
+    assert "nothing" in str(e)
+    assert isinstance(e, TimeoutError)
+    # never sleeps past the deadline
+    assert Poller("x", timeout=0.05, initial_delay=1.0).next_delay() <= 0.05
+    expect(GameProcessExited, Poller("x", timeout=None, process=ExitedProcess()).next_delay)
+
+
+def test_wait_for_server_returns_once_booted():
+    with SimServer(fixtures_dir=DATA_DIR, boot_delay=0.3) as server:
+        gc = GameController(server.base_url, probe_initial_delay=0.01, probe_max_delay=0.05)
+        start = time.perf_counter()
+        state = gc.wait_for_game(timeout=5)
+        # ready shortly after the boot, not on a 1 s polling grid
+        assert 0.25 <= time.perf_counter() - start < 0.8
+        assert state["available_commands"]
+        gc.close()
+
+
+def test_wait_for_server_deadline():
+    with SimServer(fixtures_dir=DATA_DIR, boot_delay=10) as server:
+        gc = GameController(server.base_url, probe_initial_delay=0.01, probe_max_delay=0.05)
+        start = time.perf_counter()
+        e = expect(ReadinessTimeout, gc.wait_for_server, 0.3)
+        assert time.perf_counter() - start < 1.5
+        assert "health" in str(e)
+        expect(GameProcessExited, gc.wait_for_server, 5, ExitedProcess())
+        gc.close()
+
+
+def test_start_run_probes_instead_of_sleeping():
+    with SimServer(fixtures_dir=DATA_DIR, ready_delay=0.05) as server:
+        gc = GameController(server.base_url, probe_initial_delay=0.01)
+        start = time.perf_counter()
+        state = gc.start_run("THE_SILENT", 0)
+        assert time.perf_counter() - start < 1.0
+        assert in_run(state)
+        assert state["game_state"]["class"] == "THE_SILENT"
+        assert server.runs == 1
+        # /reset alone leaves the run
+        gc.reset_run()
+        assert out_of_run(gc.get_state())
+        assert not gc.send_command("end")
+        gc.close()
+
+    with SimServer(fixtures_dir=DATA_DIR, ready=False) as server:
+        gc = GameController(server.base_url, probe_initial_delay=0.01, start_timeout=0.3)
+        e = expect(ReadinessTimeout, gc.start_run, "IRONCLAD", 0)
+        assert "ready_for_command=False" in str(e)
+        gc.close()
+
+
+def test_async_start_run():
+    async def run(url):
+        gc = AsyncGameController(url, probe_initial_delay=0.01)
+        try:
+            await gc.wait_for_game(timeout=5)
+            return await gc.start_run("IRONCLAD", 0)
+        finally:
+            await gc.close()
+
+    with SimServer(fixtures_dir=DATA_DIR, boot_delay=0.1) as server:
+        state = asyncio.run(run(server.base_url))
+        assert in_run(state)
+        assert server.runs == 1
+
+
+def test_launcher_waits_for_every_instance():
+    with SimServer(fixtures_dir=DATA_DIR, boot_delay=0.1) as a, SimServer(fixtures_dir=DATA_DIR, boot_delay=0.2) as b:
+        launcher = GameLauncher()
+        launcher.instances = [GameInstance(index=i, port=s.httpd.server_address[1], workdir="")
+                              for i, s in enumerate((a, b))]
+        states = launcher.wait_ready(timeout=5)
+        assert len(states) == 2 and all(s["available_commands"] for s in states)
+
+    launcher.instances = [GameInstance(index=0, port=1, workdir="", process=ExitedProcess())]
+    expect(GameProcessExited, launcher.wait_ready, 5)
+
+
+if __name__ == "__main__":
+    test_poller_backoff_and_deadline()
+    test_wait_for_server_returns_once_booted()
+    test_wait_for_server_deadline()
+    test_start_run_probes_instead_of_sleeping()
+    test_async_start_run()
+    test_launcher_waits_for_every_instance()
+    print("OK")
@@ -0,0 +1,93 @@
+import os
+import sys
+import json
+import signal
+import shutil
+import tempfile
+from pathlib import Path
+
+# ensure src/ is importable
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+from checkpoint import model_file, save_model_atomic
+from scheduler import TrainingJob, TrainingScheduler
+from sim_server import SimServer
+
+DATA_DIR = str(ROOT / "ressources" / "test_json")
+ACTIONS_PATH = ROOT / "ressources" / "actions" / "all_actions.json"
+
+
+class FailingModel:
+    def save(self, path):
+        with open(path, "w") as f:
+            f.write("partial")
+        raise OSError("disk full")
+
+
+def test_atomic_save_keeps_previous_model():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = str(Path(tmp) / "model")
+        assert model_file(path) == f"{path}.zip"
+        Path(model_file(path)).write_text("previous")
+        try:
+            save_model_atomic(FailingModel(), path)
+            assert False, "the save error must be raised"
+        except OSError:
+            pass
+        assert Path(model_file(path)).read_text() == "previous"
+        assert [p.name for p in Path(tmp).iterdir()] == ["model.zip"]
+
+
+def test_trains_characters_concurrently():
+    with tempfile.TemporaryDirectory() as tmp, \
+            SimServer(fixtures_dir=DATA_DIR, run_length=20, seed=1) as ironclad, \
+            SimServer(fixtures_dir=DATA_DIR, run_length=20, seed=2) as silent:
+        actions_path = Path(tmp) / "all_actions.json"
+        shutil.copy(ACTIONS_PATH, actions_path)
+        jobs = [
+            TrainingJob("IRONCLAD", base_urls=[ironclad.base_url], round_timesteps=256, total_timesteps=512,
+                        model_path=str(Path(tmp) / "model_IRONCLAD")),
+            TrainingJob("THE_SILENT", base_urls=[silent.base_url], round_timesteps=256, total_timesteps=256,
+                        model_path=str(Path(tmp) / "model_THE_SILENT")),
+        ]
+        progress = TrainingScheduler(jobs, actions_path=str(actions_path)).run()
+
+        assert progress["IRONCLAD"] == {"timesteps": 512, "checkpoints": 2, "error": None}
+        assert progress["THE_SILENT"] == {"timesteps": 256, "checkpoints": 1, "error": None}
+        # each character played its own game, the two ran side by side
+        assert ironclad.character == "IRONCLAD" and silent.character == "THE_SILENT"
+        assert ironclad.commands >= 512 and silent.commands >= 256
+        for job in jobs:
+            assert Path(model_file(job.model_path)).exists()
+        # the discovered actions of both workers were merged into one file
+        discovered = json.loads((Path(tmp) / "all_actions_discovered.json").read_text())
+        assert discovered and len(discovered) == len(set(discovered))
+        assert not list(Path(tmp).glob("*.tmp-*"))
+
+
+def test_ctrl_c_stops_workers_after_their_round():
+    with tempfile.TemporaryDirectory() as tmp, SimServer(fixtures_dir=DATA_DIR, run_length=20) as game:
+        actions_path = Path(tmp) / "all_actions.json"
+        shutil.copy(ACTIONS_PATH, actions_path)
+        job = TrainingJob("IRONCLAD", base_urls=[game.base_url], round_timesteps=128,
+                          model_path=str(Path(tmp) / "model_IRONCLAD"))
+        scheduler = TrainingScheduler([job], actions_path=str(actions_path))
+        scheduler.start()
+        while scheduler.progress["IRONCLAD"]["checkpoints"] == 0:
+            scheduler._handle(scheduler.messages.get(timeout=120))
+        # Ctrl+C in the terminal signals the workers too, then run() stops them
+        os.kill(scheduler.processes["IRONCLAD"].pid, signal.SIGINT)
+        scheduler.stop()
+        progress = scheduler.wait()
+        assert progress["IRONCLAD"]["error"] is None
+        assert progress["IRONCLAD"]["timesteps"] % 128 == 0 and progress["IRONCLAD"]["timesteps"] >= 128
+        assert scheduler.processes["IRONCLAD"].exitcode == 0
+        assert Path(model_file(job.model_path)).exists()
+
+
+if __name__ == "__main__":
+    test_atomic_save_keeps_previous_model()
+    test_trains_characters_concurrently()
+    test_ctrl_c_stops_workers_after_their_round()
+    print("OK")
@@ -0,0 +1,74 @@
+import sys
+import time
+from pathlib import Path
+
+# ensure src/ is importable
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+from action_manager import ActionManager
+from game_controller import GameController
+from game_env import GameEnv
+from sim_server import SimServer, DEFAULT_SCENARIO
+
+DATA_DIR = str(ROOT / "ressources" / "test_json")
+ACTIONS_PATH = ROOT / "ressources" / "actions" / "all_actions.json"
+
+
+def play(server, steps):
+    controller = GameController(server.base_url)
+    states = [controller.get_state()]
+    for _ in range(steps):
+        assert controller.send_command(states[-1]["available_commands"][0])
+        states.append(controller.wait_for_ready())
+    controller.close()
+    return states
+
+
+def test_replays_scenario_deterministically():
+    n = len(DEFAULT_SCENARIO)
+    with SimServer(fixtures_dir=DATA_DIR, seed=3) as a, SimServer(fixtures_dir=DATA_DIR, seed=3) as b:
+        states_a, states_b = play(a, n + 2), play(b, n + 2)
+    assert states_a == states_b
+    assert all(s["ready_for_command"] for s in states_a)
+    # the scenario loops, one floor higher
+    assert states_a[n]["game_state"]["floor"] == states_a[0]["game_state"]["floor"] + 1
+    with SimServer(fixtures_dir=DATA_DIR, seed=4) as c:
+        assert play(c, n + 2) != states_a
+
+
+def test_ready_delay_and_validation():
+    with SimServer(fixtures_dir=DATA_DIR, ready_delay=0.05, validate_commands=True) as server:
+        controller = GameController(server.base_url)
+        assert not controller.send_command("not a command")
+        assert controller.send_command(controller.get_state()["available_commands"][0])
+        assert not controller.get_state()["ready_for_command"]
+        start = time.perf_counter()
+        state = controller.wait_for_ready()
+        assert state["ready_for_command"]
+        assert time.perf_counter() - start >= 0.03
+        assert controller.last_poll_count > 1
+        controller.close()
+
+
+def test_run_ends_on_death_screen():
+    with SimServer(fixtures_dir=DATA_DIR, run_length=3) as server:
+        env = GameEnv(ActionManager(filepath=str(ACTIONS_PATH)), GameController(server.base_url),
+                      character="IRONCLAD")
+        env.reset()
+        dones = []
+        for _ in range(3):
+            action = int(env.get_action_mask().nonzero()[0][0])
+            dones.append(env.step(action)[2])
+        assert dones == [False, False, True]
+        assert env.state.game_state.screen_name == "DEATH"
+        env.reset()
+        assert server.runs == 2
+        assert env.state.raw_json["game_state"]["class"] == "IRONCLAD"
+
+
+if __name__ == "__main__":
+    test_replays_scenario_deterministically()
+    test_ready_delay_and_validation()
+    test_run_ends_on_death_screen()
+    print("OK")
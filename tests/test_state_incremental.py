@@ -0,0 +1,80 @@
+import copy
+import dataclasses
+import json
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# ensure src/ is importable
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+from state import State
+
+
+DATA_DIR = ROOT / "ressources" / "test_json"
+# a run-like sequence: combat steps, rewards, shop, events, and back into a fight
+SEQUENCE = [
+    "fight", "fight_2", "fight_3", "fight_3", "fight_reward", "fight_reward_2",
+    "map", "map_2", "shop", "shop", "event", "event_2", "event_3", "orbs", "fight",
+]
+
+
+def load(name):
+    with open(DATA_DIR / f"{name}.json", "r", encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+def assert_same(incremental, raw, label):
+    full = State(raw)
+    for f in dataclasses.fields(full.game_state):
+        if f.name not in ("map", "raw"):
+            assert getattr(incremental.game_state, f.name) == getattr(full.game_state, f.name), (label, f.name)
+    assert incremental.game_state.map.to_list() == full.game_state.map.to_list(), label
+    assert incremental.available_commands == full.available_commands, label
+    assert incremental.in_game == full.in_game and incremental.ready_for_command == full.ready_for_command, label
+    a, b = incremental.encode_state(), full.encode_state()
+    assert np.array_equal(a.view(np.uint32), b.view(np.uint32)), label
+
+
+def test_replay_matches_full_rebuild():
+    state = State({})
+    for name in SEQUENCE + SEQUENCE[::-1]:
+        raw = load(name)
+        state.update_from_json(raw, incremental=True)
+        assert_same(state, raw, name)
+    # repeated fixtures and consecutive combat steps share sections
+    assert state.sections_reused > 0
+
+
+def test_unchanged_sections_are_kept():
+    state = State(load("fight"))
+    game_map = state.game_state.map
+    state.encode_state()
+    state.update_from_json(load("fight"), incremental=True)
+    assert state.game_state.map is game_map
+    assert state.sections_reused == 4
+
+
+def test_changed_sections_are_rebuilt():
+    raw = load("fight")
+    state = State(raw)
+    state.encode_state()
+    changed = copy.deepcopy(raw)
+    gs = changed["game_state"]
+    gs["combat_state"]["monsters"][0]["current_hp"] = 1
+    gs["deck"][0]["cost"] = 3
+    gs["map"] = gs["map"][:-1]
+    state.update_from_json(changed, incremental=True)
+    assert_same(state, changed, "changed")
+    # dropping game_state entirely resets it
+    state.update_from_json({"available_commands": []}, incremental=True)
+    assert_same(state, {"available_commands": []}, "empty")
+
+
+if __name__ == "__main__":
+    test_replay_matches_full_rebuild()
+    test_unchanged_sections_are_kept()
+    test_changed_sections_are_rebuilt()
+    print("OK")
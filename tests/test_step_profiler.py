@@ -0,0 +1,93 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+from stable_baselines3.common.logger import Logger
+from stable_baselines3.common.vec_env import DummyVecEnv
+
+# ensure src/ is importable
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+from action_manager import ActionManager
+from game_controller import GameController
+from game_env import GameEnv
+from profiling_callback import ProfilingCallback
+from sim_server import SimServer
+from step_profiler import Histogram, StepProfiler
+
+DATA_DIR = str(ROOT / "ressources" / "test_json")
+ACTIONS_PATH = ROOT / "ressources" / "actions" / "all_actions.json"
+
+
+def test_histogram_percentiles():
+    hist = Histogram()
+    for us in [1] * 90 + [1000] * 10:
+        hist.add(us * 1e-6)
+    s = hist.summary()
+    assert s["count"] == 100
+    assert s["p50_ms"] <= 0.002
+    # 1000 us falls in the [512, 1024) bucket, capped by the max
+    assert s["p95_ms"] == s["max_ms"] == 1.0
+
+
+def test_disabled_profiler_records_nothing():
+    profiler = StepProfiler()
+    t = profiler.clock()
+    profiler.add("send", t)
+    profiler.end_step(3, True)
+    assert profiler.summary() == {"steps": 0, "polls_per_step": 0.0, "forced_sends": 0}
+
+
+def make_env(server):
+    return GameEnv(ActionManager(filepath=str(ACTIONS_PATH)), GameController(server.base_url), profile=True)
+
+
+def test_step_phases_are_recorded():
+    with SimServer(fixtures_dir=DATA_DIR, ready_delay=0.02) as server:
+        env = make_env(server)
+        env.reset()
+        for _ in range(4):
+            env.step(int(np.flatnonzero(env.get_action_mask())[0]))
+        summary = env.take_profile().summary()
+    assert summary["steps"] == 4
+    assert summary["polls_per_step"] > 1
+    for phase in ("select", "send", "wait", "decode", "state", "encode", "reward", "mask"):
+        assert summary[f"{phase}/count"] >= 4, phase
+    # the readiness delay dominates the step
+    assert summary["wait/mean_ms"] >= 15
+    assert summary["wait/mean_ms"] > summary["decode/mean_ms"]
+    # take() starts over
+    assert env.take_profile().steps == 0
+
+
+class FakeModel:
+    def __init__(self, env):
+        self.env = env
+        self.logger = Logger(folder=None, output_formats=[])
+        self.num_timesteps = 0
+
+    def get_env(self):
+        return self.env
+
+
+def test_callback_records_merged_profiles():
+    with SimServer(fixtures_dir=DATA_DIR) as a, SimServer(fixtures_dir=DATA_DIR) as b:
+        vec_env = DummyVecEnv([lambda: make_env(a), lambda: make_env(b)])
+        vec_env.reset()
+        for _ in range(3):
+            vec_env.step(np.array([int(np.flatnonzero(e.get_action_mask())[0]) for e in vec_env.envs]))
+        model = FakeModel(vec_env)
+        callback = ProfilingCallback()
+        callback.init_callback(model)
+        callback.on_rollout_end()
+        assert model.logger.name_to_value["profile/steps"] == 6
+        assert model.logger.name_to_value["profile/wait/count"] == 6
+
+
+if __name__ == "__main__":
+    test_histogram_percentiles()
+    test_disabled_profiler_records_nothing()
+    test_step_phases_are_recorded()
+    test_callback_records_merged_profiles()
+    print("OK")
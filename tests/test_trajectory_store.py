@@ -0,0 +1,88 @@
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+# ensure src/ is importable
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+sys.path.insert(0, str(ROOT / "tests"))
+
+from action_manager import ActionManager
+from game_controller import GameController
+from game_env import GameEnv
+from stub_server import StubServer
+from trajectory_store import TrajectoryReader, TrajectoryWriter
+
+ACTIONS_PATH = ROOT / "ressources" / "actions" / "all_actions.json"
+
+
+def rows(n, start=0):
+    for i in range(start, start + n):
+        yield np.full(4, i, dtype=np.float32), np.array([i % 2, 1, 0], dtype=np.int8), i, float(i) / 2, i % 5 == 4
+
+
+def test_roundtrip_across_chunks_and_reopen():
+    with tempfile.TemporaryDirectory() as tmp:
+        writer = TrajectoryWriter(tmp, obs_size=4, mask_size=3, chunk_size=4)
+        mask = np.zeros(3, dtype=np.int8)
+        for obs, m, action, reward, done in rows(10):
+            # the same mask buffer is reused between appends, like GameEnv's
+            mask[:] = m
+            writer.append(obs, mask, action, reward, done)
+        writer.close()
+        # reopening appends after the existing chunks
+        writer = TrajectoryWriter(tmp, obs_size=4, mask_size=3, chunk_size=4)
+        for row in rows(3, start=10):
+            writer.append(*row)
+        writer.close()
+
+        reader = TrajectoryReader(tmp)
+        assert len(reader) == 13
+        assert reader.n_chunks == 4
+        assert isinstance(reader.chunk(0)["obs"], np.memmap)
+        batches = list(reader.iter_batches(3))
+        got = {name: np.concatenate([b[name] for b in batches]) for name in batches[0]}
+        expected = list(zip(*rows(13)))
+        assert np.array_equal(got["obs"], np.stack(expected[0]))
+        assert np.array_equal(got["mask"], np.stack(expected[1]))
+        assert got["action"].tolist() == list(expected[2])
+        assert got["reward"].tolist() == list(expected[3])
+        assert got["done"].tolist() == list(expected[4])
+
+
+def test_unflushed_rows_are_not_indexed():
+    with tempfile.TemporaryDirectory() as tmp:
+        writer = TrajectoryWriter(tmp, obs_size=4, mask_size=3, chunk_size=4)
+        for row in rows(6):
+            writer.append(*row)
+        assert len(TrajectoryReader(tmp)) == 4
+        with pytest.raises(ValueError):
+            TrajectoryWriter(tmp, obs_size=5, mask_size=3)
+
+
+def test_game_env_records_steps():
+    with tempfile.TemporaryDirectory() as tmp, StubServer(fixture="fight_2.json") as server:
+        env = GameEnv(ActionManager(filepath=str(ACTIONS_PATH)), GameController(server.base_url), record_dir=tmp)
+        first, _ = env.reset()
+        mask = env.get_action_mask().copy()
+        action = int(np.flatnonzero(mask)[0])
+        obs = [first]
+        for _ in range(3):
+            obs.append(env.step(action)[0])
+        env.close()
+
+        chunk = TrajectoryReader(tmp).chunk(0)
+        assert len(chunk["obs"]) == 3
+        assert np.array_equal(chunk["obs"], np.stack(obs[:3]))
+        assert np.array_equal(chunk["mask"][0], mask)
+        assert chunk["action"].tolist() == [action] * 3
+
+
+if __name__ == "__main__":
+    test_roundtrip_across_chunks_and_reopen()
+    test_unflushed_rows_are_not_indexed()
+    test_game_env_records_steps()
+    print("OK")
@@ -0,0 +1,158 @@
+import sys
+import time
+import base64
+import asyncio
+import tempfile
+from pathlib import Path
+
+# ensure src/ is importable
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+from action_manager import ActionManager
+from async_game_controller import AsyncGameController
+from game_controller import GameController
+from game_env import GameEnv
+from readiness import in_run, new_run, same_run_possible
+from run_seeds import RunSeeds, SAVE_KEY, read_save, saved_run_seeds, seed_from_string, seed_to_string
+from sim_server import SimServer
+
+DATA_DIR = str(ROOT / "ressources" / "test_json")
+ACTIONS_PATH = ROOT / "ressources" / "actions" / "all_actions.json"
+
+
+def run_state(seed, floor, screen_name="MAP", character="IRONCLAD"):
+    return {"in_game": True, "ready_for_command": True, "available_commands": ["proceed"],
+            "game_state": {"seed": seed, "floor": floor, "screen_name": screen_name, "class": character}}
+
+
+def test_seed_strings():
+    assert seed_to_string(0) == "0"
+    for value in (1, 35, 123456789, -1, -(1 << 63), (1 << 63) - 1):
+        assert seed_from_string(seed_to_string(value)) == value
+    # the game reads O as 0
+    assert seed_from_string("1O") == seed_from_string("10") == 35
+    assert RunSeeds().next() is None
+    seeds = RunSeeds(["abc", "D3"])
+    assert [seeds.next() for _ in range(3)] == ["ABC", "D3", "ABC"]
+
+
+def test_seeds_from_saves():
+    with tempfile.TemporaryDirectory() as saves:
+        payload = b'{"seed": 123456789, "floor_num": 4}'
+        obfuscated = bytes(b ^ SAVE_KEY[i % len(SAVE_KEY)] for i, b in enumerate(payload))
+        (Path(saves) / "IRONCLAD.autosave").write_bytes(base64.b64encode(obfuscated))
+        (Path(saves) / "THE_SILENT.autosave").write_bytes(b'{"seed": -1}')
+        (Path(saves) / "DEFECT.autosave").write_bytes(b"not a save")
+        assert read_save(str(Path(saves) / "IRONCLAD.autosave"))["floor_num"] == 4
+        assert saved_run_seeds(saves) == [seed_to_string(123456789), seed_to_string(-1)]
+        assert saved_run_seeds(saves, character="THE_SILENT") == [seed_to_string(-1)]
+
+
+def test_new_run_predicate():
+    dead = run_state(1, 3, "DEATH")
+    alive = run_state(1, 3)
+    accept = new_run(dead)
+    assert not accept(dead) and accept(run_state(1, 3)) and accept(run_state(2, 0))
+    accept = new_run(alive)
+    assert not accept(alive) and accept(run_state(2, 3)) and accept(run_state(1, 0))
+    assert not new_run()({"in_game": False, "available_commands": ["start"], "ready_for_command": True})
+    # the run of another character is never the requested one
+    accept = new_run(alive, "THE_SILENT")
+    assert not accept(alive) and not accept(run_state(2, 0)) and accept(run_state(1, 3, character="THE_SILENT"))
+    assert not new_run(None, "THE_SILENT")(alive) and new_run({}, "IRONCLAD")(alive)
+    # a replayed seed is only ambiguous while the old run is still playable
+    assert same_run_possible(run_state(seed_from_string("S1"), 0), "IRONCLAD", "S1")
+    assert same_run_possible(run_state("S1", 0), "IRONCLAD", "s1")
+    assert not same_run_possible(run_state("S1", 0, "DEATH"), "IRONCLAD", "S1")
+    assert not same_run_possible(run_state("S1", 0), "THE_SILENT", "S1")
+    assert not same_run_possible(run_state("S1", 0), "IRONCLAD", None)
+
+
+def test_restart_run_pipelines_reset_and_start():
+    with SimServer(fixtures_dir=DATA_DIR, reset_delay=0.15) as server:
+        gc = GameController(server.base_url, probe_initial_delay=0.01, probe_max_delay=0.05)
+        previous = gc.get_state()
+        start = time.perf_counter()
+        state = gc.restart_run("IRONCLAD", 0, seed="ABC123", previous=previous)
+        elapsed = time.perf_counter() - start
+        # /start was refused until the reset went through, then retried
+        assert 0.15 <= elapsed < 1.0
+        assert in_run(state)
+        assert state["game_state"]["seed"] == "ABC123"
+        assert server.runs == 1
+        gc.close()
+
+
+def test_restart_run_with_queued_start():
+    # /reset and /start both accepted at once and applied later: /state shows the
+    # old run meanwhile, restart_run must not take it for the new one
+    with SimServer(fixtures_dir=DATA_DIR, reset_delay=0.3, start_delay=0.3) as server:
+        gc = GameController(server.base_url, probe_initial_delay=0.01, probe_max_delay=0.05)
+        state = gc.start_run("THE_SILENT", 0, seed="1")
+        assert state["game_state"]["class"] == "THE_SILENT" and server.runs == 1
+        # no previous state given: the running THE_SILENT run is read from /state
+        state = gc.restart_run("IRONCLAD", 0)
+        assert server.runs == 2 and server.pending_start is None
+        assert state["game_state"]["class"] == "IRONCLAD" and state["game_state"]["seed"] == 2
+        # an empty previous state (first reset of an env) is read from /state as well
+        state = gc.restart_run("IRONCLAD", 0, previous={})
+        assert server.runs == 3 and state["game_state"]["seed"] == 3
+        gc.close()
+
+
+def test_restart_run_replays_single_seed():
+    # the run left without dying on the seed that is replayed: old and new runs
+    # look the same, the restart waits for the main menu in between
+    with SimServer(fixtures_dir=DATA_DIR, reset_delay=0.1, start_delay=0.1) as server:
+        gc = GameController(server.base_url, probe_initial_delay=0.01, probe_max_delay=0.05,
+                            reset_timeout=3, start_timeout=3)
+        for runs in (1, 2, 3):
+            state = gc.restart_run("IRONCLAD", 0, seed="S1")
+            assert server.runs == runs and server.pending_start is None
+            assert state["game_state"]["seed"] == "S1" and in_run(state)
+        gc.close()
+
+
+def test_async_restart_run():
+    async def run(url):
+        gc = AsyncGameController(url, probe_initial_delay=0.01)
+        try:
+            return await gc.restart_run("THE_SILENT", 0, seed="XYZ")
+        finally:
+            await gc.close()
+
+    with SimServer(fixtures_dir=DATA_DIR, reset_delay=0.05) as server:
+        state = asyncio.run(run(server.base_url))
+        assert in_run(state) and state["game_state"]["seed"] == "XYZ"
+        assert state["game_state"]["class"] == "THE_SILENT"
+
+
+def test_env_reports_turnover():
+    for warm_restart in (True, False):
+        with SimServer(fixtures_dir=DATA_DIR, run_length=2) as server:
+            env = GameEnv(ActionManager(filepath=str(ACTIONS_PATH)), GameController(server.base_url),
+                          character="IRONCLAD", warm_restart=warm_restart, seeds=["S1", "S2"])
+            _, info = env.reset()
+            assert "turnover_time" not in info and info["restart_time"] >= 0
+            done = False
+            while not done:
+                done = env.step(int(env.get_action_mask().nonzero()[0][0]))[2]
+            _, info = env.reset()
+            assert 0 <= info["restart_time"] <= info["turnover_time"] < 1.0
+            assert env.state.raw_json["game_state"]["seed"] == "S2"
+            stats = env.turnover_stats()
+            assert stats["restarts"] == 1 and stats["max_s"] == info["turnover_time"]
+            assert server.runs == 2
+
+
+if __name__ == "__main__":
+    test_seed_strings()
+    test_seeds_from_saves()
+    test_new_run_predicate()
+    test_restart_run_pipelines_reset_and_start()
+    test_restart_run_with_queued_start()
+    test_restart_run_replays_single_seed()
+    test_async_restart_run()
+    test_env_reports_turnover()
+    print("OK")